@@ -0,0 +1,94 @@
+"""
+CPU cost vs. bytes saved of the response compression on game set boards.
+
+    python benchmarks/compression.py [--pawns 10 100 1000] [--repeat 50]
+"""
+import argparse
+import random
+import time
+
+from dnd.models.game_set import GameSetModel
+from dnd.utils.compression import BrotliCompressor, GZipCompressor, brotli
+
+
+def make_board(pawns: int) -> bytes:
+    users = [
+        {"username": f"player{i}", "full_name": None, "email": f"{i}@dnd"}
+        for i in range(8)
+    ]
+    game_set = GameSetModel.parse_obj(
+        {
+            "name": "benchmark",
+            "short_url": "b3nchm",
+            "version": 1,
+            "owner": users[0],
+            "meta": {
+                "map": {
+                    "name": "map",
+                    "meta": {
+                        "image_short_url": None,
+                        "len_x": 1000,
+                        "len_y": 1000,
+                    },
+                }
+            },
+            "pawns": [
+                {
+                    "name": f"pawn{i}",
+                    "version": 1,
+                    "user": random.choice(users),
+                    "meta": {
+                        "visibility": True,
+                        "type": "movable",
+                        "size_x": 2,
+                        "size_y": 2,
+                        "x": random.randint(0, 998),
+                        "y": random.randint(0, 998),
+                        "color": f"#{random.randrange(1 << 24):06x}",
+                    },
+                }
+                for i in range(pawns)
+            ],
+            "users_in_game": [{"user": user} for user in users],
+        }
+    )
+    return game_set.json().encode()
+
+
+def measure(factory, data: bytes, repeat: int) -> tuple[float, int]:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        compressor = factory()
+        out = compressor.compress(data) + compressor.flush(final=True)
+    return (time.perf_counter() - start) / repeat, len(out)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--pawns", type=int, nargs="+", default=[10, 100, 1000]
+    )
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(0)
+    codecs = {f"gzip-{x}": (lambda x=x: GZipCompressor(x)) for x in (1, 6, 9)}
+    if brotli is not None:
+        codecs.update(
+            {f"br-{x}": (lambda x=x: BrotliCompressor(x)) for x in (1, 4, 11)}
+        )
+
+    print(f"{'pawns':>6} {'codec':>8} {'bytes':>9} {'ratio':>6} {'ms':>8}")
+    for pawns in args.pawns:
+        data = make_board(pawns)
+        print(f"{pawns:>6} {'raw':>8} {len(data):>9}")
+        for name, factory in codecs.items():
+            seconds, size = measure(factory, data, args.repeat)
+            print(
+                f"{pawns:>6} {name:>8} {size:>9} "
+                f"{len(data) / size:>6.1f} {seconds * 1000:>8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Import time budgets of the service entry points.
+
+    python benchmarks/importtime.py [--scale 2]
+
+Every module is imported ``--repeat`` times in a fresh interpreter with
+``python -X importtime``, the median cumulative time is compared with
+its budget in milliseconds (multiplied by ``--scale`` on slow machines).
+Modules which must stay lazy are checked too, they don't depend on the
+machine. Importing the service needs ``DB_URL`` set, the database isn't
+used. The run fails if a budget is exceeded or a lazy module is imported.
+``tests/test_importtime.py`` checks the lazy modules, the budgets are
+checked with ``pytest -m benchmark`` multiplied by ``IMPORT_TIME_SCALE``.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# module -> (budget in ms, modules it must not import)
+BUDGETS = {
+    # alembic and the CLI tools
+    "dnd.settings": (250, {"sqlalchemy", "fastapi", "yaml"}),
+    "dnd.database.schemas": (
+        900,
+        {
+            "colour",
+            "fastapi",
+            "httpx",
+            "jose",
+            "passlib",
+            "PIL",
+            "sqlalchemy_utils",
+            "yaml",
+        },
+    ),
+    # spawned image decoding workers
+    "dnd.utils.imaging": (100, {"PIL", "pydantic", "sqlalchemy", "fastapi"}),
+    "dnd.app": (
+        1300,
+        {
+            "bcrypt",
+            "colour",
+            "httpx",
+            "jose",
+            "numpy",
+            "passlib",
+            "PIL",
+            "sqlalchemy_utils",
+            "yaml",
+        },
+    ),
+}
+
+
+def import_times(module: str) -> dict[str, float]:
+    """Cumulative milliseconds by imported module"""
+    res = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+    )
+    if res.returncode:
+        raise RuntimeError(f"import {module} failed:\n{res.stderr}")
+    times = {}
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def check(
+    repeat: int = 5, scale: float = 1.0, budgets: bool = True
+) -> list[str]:
+    """
+    Print the times, returns the exceeded budgets and eager imports.
+    Without ``budgets`` only the lazy modules are checked.
+    """
+    failures = []
+    print(f"{'module':>22} {'ms':>8} {'budget':>8}")
+    for module, (budget, lazy) in BUDGETS.items():
+        runs = [import_times(module) for _ in range(repeat)]
+        ms = statistics.median(x[module] for x in runs)
+        line = f"{module:>22} {ms:>8.1f} {budget * scale:>8.0f}"
+        if budgets and ms > budget * scale:
+            line += " OVER"
+            failures.append(f"{module} takes {ms:.0f} ms")
+        print(line)
+        if imported := sorted(lazy & runs[0].keys()):
+            failures.append(f"{module} imports {', '.join(imported)} eagerly")
+            print(failures[-1])
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0)
+    args = parser.parse_args()
+    sys.exit(1 if check(args.repeat, args.scale) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Load test of the core game flows against a running service.
+
+    docker compose up -d postgres
+    pdm run migrate && pdm run start-dev
+    python benchmarks/load.py [--url http://localhost:8080/api/v1]
+        [--pawns 10 100 1000] [--players 1 50 500] [--duration 30]
+
+Every scale seeds its own users, map and game set (prefixed by
+``--run``, random by default) through the API: the seeding requests are
+reported as register/login/create_game_set/join/create_pawn. Then every
+player reads the board, moves its pawns and reads single pawns in a loop
+for ``--duration`` seconds. Latencies are in milliseconds.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+import httpx
+
+PAWN_SIZE = (2, 2)
+MAP_SIZE = 1000
+# weights of the operations in the players loop
+MIX = {"read_board": 6, "move_pawn": 3, "read_pawn": 1}
+
+
+@dataclass
+class Stats:
+    latencies: dict[str, list[float]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    async def call(self, name: str, request) -> httpx.Response | None:
+        start = time.perf_counter()
+        try:
+            res = await request
+        except httpx.HTTPError:
+            self.errors[name] += 1
+            return None
+        self.latencies[name].append((time.perf_counter() - start) * 1000)
+        if res.status_code >= 400:
+            self.errors[name] += 1
+        return res
+
+    async def require(self, name: str, request) -> httpx.Response:
+        """Seeding request the rest of the scale depends on"""
+        res = await self.call(name, request)
+        if res is None or res.status_code >= 400:
+            detail = "no response" if res is None else res.text
+            raise RuntimeError(f"{name} failed: {detail}")
+        return res
+
+
+@dataclass
+class Player:
+    username: str
+    headers: dict[str, str] = field(default_factory=dict)
+    pawns: list[str] = field(default_factory=list)
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def gather_limited(coros, limit: int):
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(coro) for coro in coros))
+
+
+async def sign_up(client: httpx.AsyncClient, stats: Stats, player: Player):
+    password = "load-test"
+    await stats.call(
+        "register",
+        client.put(
+            "/register/",
+            json={
+                "username": player.username,
+                "email": f"{player.username}@example.com",
+                "password": password,
+            },
+        ),
+    )
+    res = await stats.require(
+        "login",
+        client.post(
+            "/login/token",
+            data={"username": player.username, "password": password},
+        ),
+    )
+    token = res.json()["access_token"]
+    player.headers["Authorization"] = f"Bearer {token}"
+
+
+async def seed(
+    client: httpx.AsyncClient,
+    stats: Stats,
+    prefix: str,
+    pawns: int,
+    players: int,
+    concurrency: int,
+) -> tuple[str, list[Player]]:
+    owner = Player(username=f"{prefix}-owner")
+    crowd = [Player(username=f"{prefix}-{i}") for i in range(players)]
+    await gather_limited(
+        (sign_up(client, stats, x) for x in (owner, *crowd)), concurrency
+    )
+
+    map_name = f"{prefix}-map"
+    await stats.call(
+        "create_map",
+        client.put(
+            f"/map/{map_name}/",
+            data={"len_x": MAP_SIZE, "len_y": MAP_SIZE},
+            headers=owner.headers,
+        ),
+    )
+    res = await stats.require(
+        "create_game_set",
+        client.put(
+            "/game_set/",
+            json={"name": prefix, "map_name": map_name},
+            headers=owner.headers,
+        ),
+    )
+    short_url = res.json()["short_url"]
+    await gather_limited(
+        (
+            stats.call(
+                "join",
+                client.post(
+                    f"/game_set/join/{short_url}/", headers=player.headers
+                ),
+            )
+            for player in crowd
+        ),
+        concurrency,
+    )
+
+    for i in range(pawns):
+        crowd[i % players].pawns.append(f"p{i}")
+    await gather_limited(
+        (
+            stats.call(
+                "create_pawn",
+                client.put(
+                    f"/pawn/{short_url}/{name}",
+                    json={
+                        "position": random_position(),
+                        "color": f"#{random.randrange(1 << 24):06x}",
+                        "size": PAWN_SIZE,
+                    },
+                    headers=player.headers,
+                ),
+            )
+            for player in crowd
+            for name in player.pawns
+        ),
+        concurrency,
+    )
+    return short_url, crowd
+
+
+def random_position() -> list[int]:
+    return [random.randint(1, MAP_SIZE - PAWN_SIZE[0]) for _ in range(2)]
+
+
+async def play(
+    client: httpx.AsyncClient,
+    stats: Stats,
+    short_url: str,
+    player: Player,
+    deadline: float,
+    rng: random.Random,
+):
+    operations, weights = zip(*MIX.items())
+    while time.perf_counter() < deadline:
+        operation = rng.choices(operations, weights)[0]
+        if operation != "read_board" and not player.pawns:
+            operation = "read_board"
+        if operation == "read_board":
+            request = client.get(
+                f"/game_set/{short_url}/", headers=player.headers
+            )
+        elif operation == "move_pawn":
+            request = client.post(
+                f"/pawn/{short_url}/{rng.choice(player.pawns)}",
+                json={"new_position": random_position()},
+                headers=player.headers,
+            )
+        else:
+            request = client.get(
+                f"/pawn/{short_url}/{rng.choice(player.pawns)}",
+                headers=player.headers,
+            )
+        await stats.call(operation, request)
+
+
+def report(stats: Stats, elapsed: dict[str, float]) -> list[dict]:
+    rows = []
+    for name, values in stats.latencies.items():
+        rows.append(
+            {
+                "operation": name,
+                "count": len(values),
+                "errors": stats.errors[name],
+                "p50": percentile(values, 0.5),
+                "p99": percentile(values, 0.99),
+                "rps": len(values) / elapsed[name] if elapsed[name] else 0,
+            }
+        )
+    return rows
+
+
+async def run_scale(args, pawns: int, players: int) -> list[dict]:
+    prefix = f"{args.run}-{pawns}-{players}"
+    limits = httpx.Limits(max_connections=max(players, args.concurrency))
+    async with httpx.AsyncClient(
+        base_url=args.url, limits=limits, timeout=60.0
+    ) as client:
+        stats = Stats()
+        start = time.perf_counter()
+        short_url, crowd = await seed(
+            client, stats, prefix, pawns, players, args.concurrency
+        )
+        seeded = time.perf_counter() - start
+        seed_ops = set(stats.latencies)
+
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(
+            *(
+                play(
+                    client,
+                    stats,
+                    short_url,
+                    player,
+                    deadline,
+                    random.Random(f"{args.seed}-{i}"),
+                )
+                for i, player in enumerate(crowd)
+            )
+        )
+    elapsed = {
+        name: seeded if name in seed_ops else args.duration
+        for name in stats.latencies
+    }
+    return report(stats, elapsed)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8080/api/v1")
+    parser.add_argument(
+        "--pawns", type=int, nargs="+", default=[10, 100, 1000]
+    )
+    parser.add_argument("--players", type=int, nargs="+", default=[1, 50, 500])
+    parser.add_argument("--duration", type=float, default=30.0)
+    # parallel requests while seeding
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--run", default=uuid.uuid4().hex[:8])
+    parser.add_argument("--json", help="write the results to the file")
+    args = parser.parse_args()
+
+    results = []
+    print(
+        f"{'pawns':>6} {'players':>7} {'operation':>16} {'count':>7} "
+        f"{'errors':>6} {'p50':>8} {'p99':>8} {'rps':>8}"
+    )
+    for pawns in args.pawns:
+        for players in args.players:
+            random.seed(f"{args.seed}-{pawns}-{players}")
+            for row in await run_scale(args, pawns, players):
+                row.update(pawns=pawns, players=players)
+                results.append(row)
+                print(
+                    f"{pawns:>6} {players:>7} {row['operation']:>16} "
+                    f"{row['count']:>7} {row['errors']:>6} "
+                    f"{row['p50']:>8.1f} {row['p99']:>8.1f} "
+                    f"{row['rps']:>8.1f}"
+                )
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
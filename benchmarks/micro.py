@@ -0,0 +1,168 @@
+"""
+Micro-benchmarks of the serialization, auth and ORM hot paths.
+
+    python benchmarks/micro.py --save      # record the baseline
+    python benchmarks/micro.py             # compare with the baseline
+
+Timings are machine specific, record the baseline on the machine the
+comparison runs on. The run fails if any benchmark is slower than the
+baseline by more than ``--threshold`` or if the SQL of a query changed.
+Importing the service needs ``DB_URL`` set, the database isn't used.
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import timeit
+from pathlib import Path
+from typing import Callable
+
+from colour import Color
+from sqlalchemy.dialects import postgresql
+
+from dnd.database.schemas.game_sets import GameSet, GameSetMeta
+from dnd.database.schemas.maps import Map, MapMeta
+from dnd.database.schemas.pawns import Pawn, PawnMeta, PawnTypeEnum
+from dnd.database.schemas.users import User, UserInGameset
+from dnd.models.game_set import GameSetModel
+from dnd.utils.crypto import Hasher, hashids
+
+BASELINE = Path(__file__).parent / "baselines" / "micro.json"
+
+
+class RecordingSession:
+    """Session stub keeping the executed statement"""
+
+    statement = None
+
+    async def execute(self, statement):
+        self.statement = statement
+        return self
+
+    def scalar_one_or_none(self):
+        return None
+
+
+def make_game_set(pawns: int) -> GameSet:
+    users = [
+        User(username=f"player{i}", email=f"{i}@dnd", full_name=None)
+        for i in range(8)
+    ]
+    return GameSet(
+        name="benchmark",
+        short_url="b3nchm",
+        version=1,
+        owner=users[0],
+        meta=GameSetMeta(
+            map=Map(
+                name="map",
+                meta=MapMeta(len_x=1000, len_y=1000, image_short_url=None),
+            )
+        ),
+        pawns=[
+            Pawn(
+                name=f"pawn{i}",
+                version=1,
+                user=random.choice(users),
+                meta=PawnMeta(
+                    visibility=True,
+                    type=PawnTypeEnum.movable,
+                    size_x=2,
+                    size_y=2,
+                    x=random.randint(0, 998),
+                    y=random.randint(0, 998),
+                    _color=Color(f"#{random.randrange(1 << 24):06x}"),
+                ),
+            )
+            for i in range(pawns)
+        ],
+        users_in_game=[UserInGameset(user=user) for user in users],
+    )
+
+
+def pawn_query_sql() -> str:
+    session = RecordingSession()
+    query = Pawn.get_by_name_and_game_set_id(
+        session=session, name="pawn0", game_set_id=1
+    )
+    # the stub never suspends, run the coroutine without an event loop
+    try:
+        query.send(None)
+    except StopIteration:
+        pass
+    return str(session.statement.compile(dialect=postgresql.dialect()))
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    """Median seconds per call"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return statistics.median(
+        x / number for x in timer.repeat(repeat=repeat, number=number)
+    )
+
+
+def benchmarks(pawns: int) -> dict[str, Callable[[], object]]:
+    game_set = make_game_set(pawns)
+    pawn_metas = [pawn.meta for pawn in game_set.pawns]
+    token = Hasher.generate_jwt(username="player0")
+    return {
+        f"game_set_from_orm[{pawns}]": lambda: GameSetModel.from_orm(game_set),
+        "generate_jwt": lambda: Hasher.generate_jwt(username="player0"),
+        "decode_jwt": lambda: Hasher.decode_jwt(token=token),
+        f"pawn_meta_color[{pawns}]": lambda: [x.color for x in pawn_metas],
+        "hashids_encode": lambda: hashids.encode(123456789),
+        "pawn_query_sql": pawn_query_sql,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pawns", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save", action="store_true")
+    args = parser.parse_args()
+
+    random.seed(0)
+    results = {
+        name: measure(func, args.repeat)
+        for name, func in benchmarks(args.pawns).items()
+    }
+    current = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+        "sql": {"pawn_by_name_and_game_set_id": pawn_query_sql()},
+    }
+    if args.save:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(current, indent=2) + "\n")
+
+    baseline = {"results": {}, "sql": {}}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+
+    failed = False
+    print(f"{'benchmark':>28} {'us':>10} {'baseline':>10} {'change':>8}")
+    for name, seconds in results.items():
+        line = f"{name:>28} {seconds * 1e6:>10.2f}"
+        if (base := baseline["results"].get(name)) is not None:
+            change = seconds / base - 1
+            line += f" {base * 1e6:>10.2f} {change:>+8.1%}"
+            if change > args.threshold:
+                line += " SLOWER"
+                failed = True
+        print(line)
+    for name, sql in current["sql"].items():
+        if (base := baseline["sql"].get(name)) is not None and base != sql:
+            print(f"{name} SQL changed:\n{base}\n->\n{sql}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,16 @@
-import asyncio
-import logging
+import os
 
-from hypercorn.asyncio import serve
-from hypercorn.config import Config
+from dnd.server import tls_files
+from dnd.settings import bootstrap, settings
+from dnd.supervisor import Supervisor, run_worker
+from dnd.utils.sharding import Shard
 
-from dnd.app import create_app
-from dnd.settings import settings
+bootstrap()
+# before the workers start, they share the self-signed certificate
+tls_files()
 
-logger = logging.getLogger(__name__)
-
-config = Config()
-config.workers = settings.WORKERS
-config.debug = settings.DEBUG
-config.bind = settings.BIND
-config.accesslog = logger
-
-asyncio.run(serve(create_app(), config, mode="asgi"))
+workers = settings.WORKERS or os.cpu_count()
+if workers > 1:
+    Supervisor(workers=workers).run()
+else:
+    run_worker(Shard())
@@ -1,10 +1,35 @@
+from functools import partial
+
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
-from dnd.routes import game_sets, health, login, maps, pawns, register, users
-from dnd.settings import settings
+from dnd.database.db import engine
+from dnd.lifecycle import warm_up
+from dnd.procedures.maps import image_decoder
+from dnd.routes import (
+    areas,
+    board,
+    campaigns,
+    dice,
+    game_sets,
+    health,
+    history,
+    initiatives,
+    login,
+    maps,
+    pawns,
+    register,
+    users,
+)
+from dnd.settings import bootstrap, settings
+from dnd.storages.board import move_buffer
+from dnd.storages.dice import dice_roller
 from dnd.storages.glossary import glossary
-from dnd.storages.images import images
+from dnd.storages.history import event_log
+from dnd.storages.images import image_collector, images
+from dnd.storages.initiative import initiative
+from dnd.utils.compression import CompressionMiddleware
+from dnd.utils.sharding import Shard, ShardMiddleware
 
 SERVICE_NAME = "DND Viewer"
 API_VERSION = "0.0.1"
@@ -12,7 +37,9 @@ API_VERSION = "0.0.1"
 origins = ["*"]
 
 
-def create_app():
+def create_app(shard: Shard = Shard()):
+    bootstrap()
+    v1 = "/api/v1"
     app = FastAPI(
         debug=settings.DEBUG,
         title=SERVICE_NAME,
@@ -26,8 +53,26 @@ def create_app():
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+    app.add_middleware(ShardMiddleware, shard=shard, prefix=v1)
+
+    app.add_event_handler("startup", partial(warm_up, shard))
+    app.add_event_handler("startup", glossary.load)
+    app.add_event_handler("startup", image_collector.start)
+    app.add_event_handler("shutdown", image_collector.stop)
+    app.add_event_handler("shutdown", image_decoder.close)
+    app.add_event_handler("shutdown", move_buffer.close)
+    app.add_event_handler("shutdown", event_log.close)
+    app.add_event_handler("shutdown", initiative.close)
+    app.add_event_handler("shutdown", dice_roller.close)
+    # the handlers above may still write
+    app.add_event_handler("shutdown", engine.dispose)
 
-    v1 = "/api/v1"
     app.mount("/storge/maps", images, name="maps")
     app.mount("/glossary", glossary, name="glossary")
     app.include_router(health.router)
@@ -35,6 +80,12 @@ def create_app():
     app.include_router(login.router, prefix=v1)
     app.include_router(users.router, prefix=v1)
     app.include_router(game_sets.router, prefix=v1)
+    app.include_router(campaigns.router, prefix=v1)
+    app.include_router(history.router, prefix=v1)
+    app.include_router(areas.router, prefix=v1)
+    app.include_router(initiatives.router, prefix=v1)
+    app.include_router(dice.router, prefix=v1)
+    app.include_router(board.router, prefix=v1)
     app.include_router(maps.router, prefix=v1)
     app.include_router(pawns.router, prefix=v1)
     return app
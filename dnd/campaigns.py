@@ -0,0 +1,129 @@
+"""
+Export and import campaign archives, see ``dnd.procedures.campaigns``.
+
+    python -m dnd.campaigns export [SHORT_URL ...] [--all] [--output DIR]
+    python -m dnd.campaigns import ARCHIVE ... [--owner USERNAME]
+
+``--jobs`` archives are processed at a time, every import is a
+transaction of its own. Archives given to the CLI are trusted: the image
+variants are stored as they are, without decoding, the members and the
+users of pawns are kept. Game sets get new short urls on import, the
+owner defaults to the user with the username of the exported owner.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import AsyncIterator
+
+from dnd.database.db import async_session, engine
+from dnd.database.schemas.game_sets import GameSet
+from dnd.database.schemas.users import User
+from dnd.procedures.campaigns import export_campaign, import_campaign
+from dnd.settings import bootstrap
+from dnd.storages.images import image_backend
+from dnd.utils.crypto import hashids
+
+logger = logging.getLogger("dnd.campaigns")
+
+CHUNK_SIZE = 1024 * 1024
+
+
+async def read_file(path: Path) -> AsyncIterator[bytes]:
+    with path.open("rb") as file:
+        while chunk := await asyncio.to_thread(file.read, CHUNK_SIZE):
+            yield chunk
+
+
+async def export_one(short_url: str, output: Path) -> None:
+    target = output / f"{short_url}.tar"
+    temporary = target.with_suffix(".tmp")
+    try:
+        with temporary.open("wb") as file:
+            async for chunk in export_campaign(short_url):
+                await asyncio.to_thread(file.write, chunk)
+        os.replace(temporary, target)
+    finally:
+        temporary.unlink(missing_ok=True)
+    logger.info(f"Exported {short_url} to {target}")
+
+
+async def import_one(path: Path, owner_id: int | None) -> None:
+    async with async_session() as session:
+        short_url = await import_campaign(
+            read_file(path),
+            session=session,
+            shortcut=hashids,
+            owner_id=owner_id,
+            trusted=True,
+            max_size=sys.maxsize,
+        )
+        await session.commit()
+    logger.info(f"Imported {path} as {short_url}")
+
+
+async def run(args) -> int:
+    jobs = []
+    try:
+        if args.command == "export":
+            args.output.mkdir(parents=True, exist_ok=True)
+            short_urls = list(args.short_urls)
+            if args.all:
+                async with async_session() as session:
+                    short_urls += await GameSet.get_short_urls(session=session)
+            jobs = [export_one(x, args.output) for x in short_urls]
+        else:
+            owner_id = None
+            if args.owner:
+                async with async_session() as session:
+                    owner = await User.get_by_username(
+                        session=session, username=args.owner
+                    )
+                if owner is None:
+                    logger.error(f"User {args.owner} doesn't exist")
+                    return 1
+                owner_id = owner.id
+            jobs = [import_one(x, owner_id) for x in args.archives]
+
+        semaphore = asyncio.Semaphore(args.jobs)
+
+        async def limited(job):
+            async with semaphore:
+                return await job
+
+        results = await asyncio.gather(
+            *map(limited, jobs), return_exceptions=True
+        )
+    finally:
+        await image_backend.close()
+        await engine.dispose()
+    failed = 0
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"{type(result).__name__}: {result}")
+            failed += 1
+    logger.info(f"Done {len(jobs) - failed} of {len(jobs)}")
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m dnd.campaigns")
+    parser.add_argument("--jobs", type=int, default=4)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export")
+    export.add_argument("short_urls", nargs="*")
+    export.add_argument("--all", action="store_true")
+    export.add_argument("--output", type=Path, default=Path("."))
+    load = commands.add_parser("import")
+    load.add_argument("archives", nargs="+", type=Path)
+    load.add_argument("--owner", help="username, the exported one if unset")
+    args = parser.parse_args()
+
+    bootstrap()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,8 @@ engine = create_async_engine(
     settings.DB_URL,
     echo=settings.DEBUG,
     pool_pre_ping=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
 )
 
 async_session = async_sessionmaker(
@@ -1,4 +1,15 @@
-from . import base, game_sets, maps, pawns, users
+from . import (
+    base,
+    dice,
+    game_sets,
+    history,
+    images,
+    initiative,
+    maps,
+    pawns,
+    rate_limits,
+    users,
+)
 
 __all__ = [
     "base",
@@ -6,4 +17,9 @@ __all__ = [
     "pawns",
     "users",
     "game_sets",
+    "images",
+    "rate_limits",
+    "history",
+    "initiative",
+    "dice",
 ]
@@ -27,6 +27,13 @@ class Base(DeclarativeBase):
             )
         ).scalar_one_or_none()
 
+    @staticmethod
+    async def _driver_connection(session: AsyncSession):
+        """asyncpg connection of the session transaction, e.g. for COPY"""
+        connection = await session.connection()
+        raw = await connection.get_raw_connection()
+        return raw.driver_connection
+
     @classmethod
     async def get(cls, session: AsyncSession, id: int):
         result = await session.get(cls, id)
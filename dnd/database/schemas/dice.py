@@ -0,0 +1,134 @@
+from datetime import datetime
+from secrets import randbits
+from typing import Any
+
+from sqlalchemy import BigInteger, ForeignKey, Numeric, Row, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+from dnd.database.schemas.base import Base
+from dnd.database.schemas.users import User
+
+
+class DiceStream(Base):
+    """
+    Seed of the rolls of a game set. Roll indexes are reserved in blocks,
+    indexes of a block unused before a restart are skipped.
+    """
+
+    __tablename__ = "dice_streams"
+
+    game_set_id = mapped_column(
+        ForeignKey("game_sets.id", ondelete="CASCADE"), primary_key=True
+    )
+    # 128 bits, see ``dnd.utils.dice.stream``
+    seed = mapped_column(Numeric(39, 0), nullable=False)
+    # the indexes below are taken
+    reserved = mapped_column(BigInteger, nullable=False)
+
+    @classmethod
+    async def reserve(
+        cls, session: AsyncSession, game_set_id: int, block: int
+    ) -> tuple[int, int]:
+        """The seed and the first of ``block`` indexes for the worker"""
+        statement = insert(cls).values(
+            game_set_id=game_set_id, seed=randbits(128), reserved=block
+        )
+        res = await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[cls.game_set_id],
+                set_={"reserved": cls.reserved + block},
+            ).returning(cls.seed, cls.reserved)
+        )
+        seed, reserved = res.one()
+        return int(seed), reserved - block
+
+    @classmethod
+    async def get_seed(
+        cls, session: AsyncSession, game_set_id: int
+    ) -> int | None:
+        res = await session.execute(
+            select(cls.seed).where(cls.game_set_id == game_set_id)
+        )
+        seed = res.scalar_one_or_none()
+        return None if seed is None else int(seed)
+
+
+class DiceRoll(Base):
+    """The log of the rolls, a roll is replayed from its index"""
+
+    __tablename__ = "dice_rolls"
+
+    game_set_id = mapped_column(
+        ForeignKey("game_sets.id", ondelete="CASCADE"), primary_key=True
+    )
+    index = mapped_column(BigInteger, primary_key=True)
+    user_id = mapped_column(ForeignKey("users.id", ondelete="SET NULL"))
+    expression: Mapped[str]
+    total = mapped_column(BigInteger, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(server_default=func.now())
+
+    COPY_COLUMNS = (
+        "game_set_id",
+        "index",
+        "user_id",
+        "expression",
+        "total",
+        "created_at",
+    )
+
+    @classmethod
+    async def append(
+        cls, session: AsyncSession, records: list[tuple[Any, ...]]
+    ) -> None:
+        """Write ``COPY_COLUMNS`` tuples with one COPY"""
+        connection = await cls._driver_connection(session)
+        await connection.copy_records_to_table(
+            cls.__tablename__, records=records, columns=cls.COPY_COLUMNS
+        )
+
+    @classmethod
+    def _entries(cls):
+        return select(
+            cls.index,
+            User.username,
+            cls.expression,
+            cls.total,
+            cls.created_at,
+        ).outerjoin(User, User.id == cls.user_id)
+
+    @classmethod
+    async def get_page(
+        cls,
+        session: AsyncSession,
+        game_set_id: int,
+        before: int | None = None,
+        limit: int = 50,
+    ) -> list[Row]:
+        """
+        ``index, username, expression, total, created_at`` of the latest
+        rolls before the index ``before``
+        """
+        condition = [cls.game_set_id == game_set_id]
+        if before is not None:
+            condition.append(cls.index < before)
+        res = await session.execute(
+            cls._entries()
+            .where(*condition)
+            .order_by(cls.index.desc())
+            .limit(limit)
+        )
+        return list(res)
+
+    @classmethod
+    async def get_by_index(
+        cls, session: AsyncSession, game_set_id: int, index: int
+    ) -> Row | None:
+        """The roll like in ``get_page``"""
+        res = await session.execute(
+            cls._entries().where(
+                cls.game_set_id == game_set_id, cls.index == index
+            )
+        )
+        return res.one_or_none()
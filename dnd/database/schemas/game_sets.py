@@ -1,15 +1,19 @@
-from typing import TYPE_CHECKING, Optional, Self
+from typing import TYPE_CHECKING, Iterable, Optional, Self
 
-from sqlalchemy import ForeignKey, select, text
+from sqlalchemy import ForeignKey, exists, func, or_, select, text, update
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.sql.base import ExecutableOption
 
 from dnd.database.schemas.base import BaseSchema
+from dnd.database.schemas.maps import MapMeta
+from dnd.database.schemas.pawns import Pawn, PawnMeta
+from dnd.database.schemas.users import UserInGameset
 
 if TYPE_CHECKING:
     from dnd.database.schemas.maps import Map
-    from dnd.database.schemas.pawns import Pawn
-    from dnd.database.schemas.users import User, UserInGameset
+    from dnd.database.schemas.users import User
 
 
 class GameSet(BaseSchema):
@@ -17,6 +21,8 @@ class GameSet(BaseSchema):
     name: Mapped[str]
     short_url: Mapped[str] = mapped_column(unique=True, index=True)
     owner_id = mapped_column(ForeignKey("users.id"))
+    # bumped by every update, see ``update``
+    version: Mapped[int] = mapped_column(default=1, server_default="1")
 
     owner: Mapped["User"] = relationship(
         back_populates="game_sets", lazy="joined"
@@ -53,20 +59,103 @@ class GameSet(BaseSchema):
         )
 
     @classmethod
-    async def update(cls, session: AsyncSession, id: int, name: str):
-        return await cls._update(
-            session=session, condition=(cls.id == id), name=name
+    async def update(
+        cls,
+        session: AsyncSession,
+        id: int,
+        name: str | None = None,
+        version: int | None = None,
+    ) -> int | None:
+        """
+        Compare-and-swap of the game set version, returns the new version
+        or None if the game set has another ``version``.
+        """
+        condition = [cls.id == id]
+        if version is not None:
+            condition.append(cls.version == version)
+        values = {"version": cls.version + 1}
+        if name:
+            values["name"] = name
+        res = await session.execute(
+            update(cls)
+            .where(*condition)
+            .values(**values)
+            .returning(cls.version)
+            .execution_options(synchronize_session=False)
         )
+        return res.scalar_one_or_none()
 
     @classmethod
     async def get_by_short_url(
-        cls, session: AsyncSession, short_url: str
+        cls,
+        session: AsyncSession,
+        short_url: str,
+        options: Iterable[ExecutableOption] = (),
     ) -> Self | None:
         res = await session.execute(
-            select(cls).filter(cls.short_url == short_url)
+            select(cls).options(*options).filter(cls.short_url == short_url)
         )
         return res.scalar_one_or_none()
 
+    @classmethod
+    async def get_header(
+        cls, session: AsyncSession, id: int, short_url: str
+    ) -> Row | None:
+        """Columns of the game set and its map bounds, without relationships"""
+        res = await session.execute(
+            select(
+                cls.id,
+                cls.short_url,
+                cls.owner_id,
+                cls.version,
+                GameSetMeta.map_id,
+                MapMeta.len_x.label("map_len_x"),
+                MapMeta.len_y.label("map_len_y"),
+            )
+            .outerjoin(GameSetMeta, GameSetMeta.game_set_id == cls.id)
+            .outerjoin(MapMeta, MapMeta.map_id == GameSetMeta.map_id)
+            .where(cls.id == id, cls.short_url == short_url)
+        )
+        return res.one_or_none()
+
+    @classmethod
+    async def has_member(
+        cls, session: AsyncSession, id: int, user_id: int
+    ) -> bool:
+        """Whether the user owns or joined the game set, one EXISTS query"""
+        res = await session.execute(
+            select(
+                or_(
+                    exists().where(cls.id == id, cls.owner_id == user_id),
+                    exists().where(
+                        UserInGameset.game_set_id == id,
+                        UserInGameset.user_id == user_id,
+                    ),
+                )
+            )
+        )
+        return res.scalar_one()
+
+    @classmethod
+    async def get_active_short_urls(
+        cls, session: AsyncSession, limit: int
+    ) -> list[str]:
+        """Game sets with the latest changed pawns first"""
+        res = await session.execute(
+            select(cls.short_url)
+            .join(Pawn, Pawn.game_set_id == cls.id)
+            .join(PawnMeta, PawnMeta.pawn_id == Pawn.id)
+            .group_by(cls.id)
+            .order_by(func.max(PawnMeta.updated_at).desc())
+            .limit(limit)
+        )
+        return list(res.scalars())
+
+    @classmethod
+    async def get_short_urls(cls, session: AsyncSession) -> list[str]:
+        res = await session.execute(select(cls.short_url).order_by(cls.id))
+        return list(res.scalars())
+
     @classmethod
     async def get_next_id(cls, session: AsyncSession) -> int:
         res = await session.execute(
@@ -0,0 +1,145 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any, Self
+
+from sqlalchemy import (
+    BigInteger,
+    ForeignKey,
+    Index,
+    Row,
+    Sequence,
+    func,
+    select,
+    text,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+from dnd.database.schemas.base import Base, BaseSchema
+
+board_events_id_seq = Sequence("board_events_id_seq")
+
+
+class BoardEventKind(Enum):
+    add = "add"
+    move = "move"
+    remove = "remove"
+
+
+class BoardEvent(Base):
+    """
+    Append-only log of pawn positions, hash partitioned by the game set.
+    Ids order the events of a game set, a replay goes up to an id.
+    """
+
+    __tablename__ = "board_events"
+    __table_args__ = {"postgresql_partition_by": "HASH (game_set_id)"}
+
+    game_set_id = mapped_column(
+        ForeignKey("game_sets.id", ondelete="CASCADE"), primary_key=True
+    )
+    # rows are written by COPY, the id comes from the server default
+    id = mapped_column(
+        BigInteger,
+        board_events_id_seq,
+        server_default=board_events_id_seq.next_value(),
+        primary_key=True,
+    )
+    pawn_id = mapped_column(BigInteger, nullable=False)
+    kind: Mapped[BoardEventKind]
+    x: Mapped[int] = mapped_column(nullable=True)
+    y: Mapped[int] = mapped_column(nullable=True)
+    created_at: Mapped[datetime] = mapped_column(server_default=func.now())
+
+    COPY_COLUMNS = ("game_set_id", "pawn_id", "kind", "x", "y", "created_at")
+
+    @classmethod
+    async def append(
+        cls, session: AsyncSession, records: list[tuple[Any, ...]]
+    ) -> None:
+        """Write ``COPY_COLUMNS`` tuples with one COPY"""
+        connection = await cls._driver_connection(session)
+        await connection.copy_records_to_table(
+            cls.__tablename__, records=records, columns=cls.COPY_COLUMNS
+        )
+
+    @classmethod
+    async def get_range(
+        cls,
+        session: AsyncSession,
+        game_set_id: int,
+        after: int,
+        until: int | None = None,
+    ) -> list[Row]:
+        """``id, pawn_id, kind, x, y`` of the events in ``(after, until]``"""
+        condition = [cls.game_set_id == game_set_id, cls.id > after]
+        if until is not None:
+            condition.append(cls.id <= until)
+        res = await session.execute(
+            select(cls.id, cls.pawn_id, cls.kind, cls.x, cls.y)
+            .where(*condition)
+            .order_by(cls.id)
+        )
+        return list(res)
+
+
+class BoardSnapshot(BaseSchema):
+    """Positions of the pawns by ``Pawn.id`` after the event ``event_id``"""
+
+    __tablename__ = "board_snapshots"
+    __table_args__ = (
+        Index("ix_board_snapshots_game_set_event", "game_set_id", "event_id"),
+    )
+
+    game_set_id = mapped_column(
+        ForeignKey("game_sets.id", ondelete="CASCADE"), nullable=False
+    )
+    event_id = mapped_column(BigInteger, nullable=False)
+    # {"<pawn id>": [x, y]}
+    positions: Mapped[dict[str, list[int | None]]] = mapped_column(JSONB)
+
+    @classmethod
+    async def create(
+        cls,
+        session: AsyncSession,
+        game_set_id: int,
+        event_id: int,
+        positions: dict[str, list[int | None]],
+    ) -> Self:
+        return await cls._create(
+            session=session,
+            game_set_id=game_set_id,
+            event_id=event_id,
+            positions=positions,
+        )
+
+    @classmethod
+    async def get_nearest(
+        cls, session: AsyncSession, game_set_id: int, at: int | None = None
+    ) -> Self | None:
+        """The latest snapshot taken at or before the event ``at``"""
+        query = select(cls).where(cls.game_set_id == game_set_id)
+        if at is not None:
+            query = query.where(cls.event_id <= at)
+        res = await session.execute(
+            query.order_by(cls.event_id.desc()).limit(1)
+        )
+        return res.scalar_one_or_none()
+
+    @classmethod
+    async def capture(
+        cls, session: AsyncSession, game_set_id: int, event_id: int = 0
+    ) -> None:
+        """Snapshot the current positions, e.g. of pawns added in bulk"""
+        await session.execute(
+            text(
+                "INSERT INTO board_snapshots "
+                "(game_set_id, event_id, positions, created_at) "
+                "SELECT :game_set_id, :event_id, coalesce(jsonb_object_agg("
+                "p.id::text, jsonb_build_array(m.x, m.y)), '{}'), now() "
+                "FROM pawns p JOIN pawns_meta m ON m.pawn_id = p.id "
+                "WHERE p.game_set_id = :game_set_id"
+            ),
+            {"game_set_id": game_set_id, "event_id": event_id},
+        )
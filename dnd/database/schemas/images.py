@@ -0,0 +1,96 @@
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import Row, String, delete, func, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+from dnd.database.schemas.base import BaseSchema
+
+
+class Image(BaseSchema):
+    """Stored image with the count of ``MapMeta`` rows referring to it"""
+
+    __tablename__ = "images"
+    short_url: Mapped[str] = mapped_column(unique=True, index=True)
+    refcount: Mapped[int] = mapped_column(default=0)
+    width: Mapped[Optional[int]]
+    height: Mapped[Optional[int]]
+    # stored variants by preference, the last one is the fallback,
+    # NULL until the variants are stored
+    formats: Mapped[Optional[list[str]]] = mapped_column(ARRAY(String))
+
+    @classmethod
+    async def acquire(cls, session: AsyncSession, short_url: str) -> Row:
+        """Add a reference, returns ``width``, ``height`` and ``formats``"""
+        res = await session.execute(
+            insert(cls)
+            .values(short_url=short_url, refcount=1)
+            .on_conflict_do_update(
+                index_elements=[cls.short_url],
+                set_={"refcount": cls.refcount + 1, "updated_at": func.now()},
+            )
+            .returning(cls.width, cls.height, cls.formats)
+        )
+        return res.one()
+
+    @classmethod
+    async def set_variants(
+        cls,
+        session: AsyncSession,
+        short_url: str,
+        width: int,
+        height: int,
+        formats: list[str],
+    ) -> None:
+        await session.execute(
+            update(cls)
+            .where(cls.short_url == short_url)
+            .values(width=width, height=height, formats=formats)
+        )
+
+    @classmethod
+    async def get_formats(
+        cls, session: AsyncSession, short_url: str
+    ) -> list[str] | None:
+        res = await session.execute(
+            select(cls.formats).where(cls.short_url == short_url)
+        )
+        return res.scalar_one_or_none()
+
+    @classmethod
+    async def release(cls, session: AsyncSession, short_url: str) -> None:
+        await session.execute(
+            update(cls)
+            .where(cls.short_url == short_url)
+            .values(refcount=cls.refcount - 1, updated_at=func.now())
+        )
+
+    @classmethod
+    async def delete_unused(
+        cls, session: AsyncSession, grace: timedelta, limit: int = 100
+    ) -> list[str]:
+        """
+        Delete rows without references for longer than ``grace``, rows
+        stay locked until the commit so the files can be removed first.
+        """
+        unused = (
+            select(cls.id)
+            .where(cls.refcount <= 0, cls.updated_at < func.now() - grace)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        res = await session.execute(
+            delete(cls).where(cls.id.in_(unused)).returning(cls.short_url)
+        )
+        return list(res.scalars())
+
+    @classmethod
+    async def existing(
+        cls, session: AsyncSession, short_urls: list[str]
+    ) -> set[str]:
+        res = await session.execute(
+            select(cls.short_url).where(cls.short_url.in_(short_urls))
+        )
+        return set(res.scalars())
@@ -0,0 +1,68 @@
+from datetime import datetime
+from typing import Any, Iterable, Self
+
+from sqlalchemy import ForeignKey, delete, func, select
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+from dnd.database.schemas.base import Base
+
+
+class Initiative(Base):
+    """Turn order of a game set in combat, written behind the tracker"""
+
+    __tablename__ = "initiatives"
+
+    game_set_id = mapped_column(
+        ForeignKey("game_sets.id", ondelete="CASCADE"), primary_key=True
+    )
+    # [{"pawn_id": ..., "name": ..., "user_id": ..., "initiative": ...}]
+    # in the turn order
+    entries: Mapped[list[dict[str, Any]]] = mapped_column(JSONB)
+    turn: Mapped[int]
+    round: Mapped[int]
+    turn_seconds: Mapped[int] = mapped_column(nullable=True)
+    # the turn is passed on after it
+    deadline: Mapped[datetime] = mapped_column(nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(), onupdate=datetime.utcnow
+    )
+
+    @classmethod
+    async def get_by_game_set_id(
+        cls, session: AsyncSession, game_set_id: int
+    ) -> Self | None:
+        res = await session.execute(
+            select(cls).where(cls.game_set_id == game_set_id)
+        )
+        return res.scalar_one_or_none()
+
+    @classmethod
+    async def save(
+        cls, session: AsyncSession, rows: list[dict[str, Any]]
+    ) -> None:
+        """Upsert the trackers, ``rows`` have every column"""
+        statement = insert(cls)
+        await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[cls.game_set_id],
+                set_={
+                    "entries": statement.excluded.entries,
+                    "turn": statement.excluded.turn,
+                    "round": statement.excluded.round,
+                    "turn_seconds": statement.excluded.turn_seconds,
+                    "deadline": statement.excluded.deadline,
+                    "updated_at": func.now(),
+                },
+            ),
+            rows,
+        )
+
+    @classmethod
+    async def delete_many(
+        cls, session: AsyncSession, game_set_ids: Iterable[int]
+    ) -> None:
+        await session.execute(
+            delete(cls).where(cls.game_set_id.in_(list(game_set_ids)))
+        )
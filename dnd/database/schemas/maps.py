@@ -63,6 +63,8 @@ class MapMeta(BaseSchema):
     len_x: Mapped[int]
     len_y: Mapped[int]
     image_short_url: Mapped[Optional[str]]
+    image_width: Mapped[Optional[int]]
+    image_height: Mapped[Optional[int]]
 
     map: Mapped["Map"] = relationship(back_populates="meta", lazy="joined")
 
@@ -74,18 +76,29 @@ class MapMeta(BaseSchema):
         len_x: int,
         len_y: int,
         image_short_url: Optional[str] = None,
+        image_width: Optional[int] = None,
+        image_height: Optional[int] = None,
     ) -> Self:
         return await cls._create(
             map_id=map_id,
             len_x=len_x,
             len_y=len_y,
             image_short_url=image_short_url,
+            image_width=image_width,
+            image_height=image_height,
             session=session,
         )
 
     @classmethod
     async def update(
-        cls, session: AsyncSession, id: int, len_x: int, len_y, image_short_url
+        cls,
+        session: AsyncSession,
+        id: int,
+        len_x: int,
+        len_y,
+        image_short_url,
+        image_width: Optional[int] = None,
+        image_height: Optional[int] = None,
     ):
         return await cls._update(
             session=session,
@@ -93,4 +106,6 @@ class MapMeta(BaseSchema):
             len_x=len_x,
             len_y=len_y,
             image_short_url=image_short_url,
+            image_width=image_width,
+            image_height=image_height,
         )
@@ -1,14 +1,21 @@
 from enum import Enum
-from typing import TYPE_CHECKING, Self
+from typing import TYPE_CHECKING, AsyncIterable, BinaryIO, Iterable, Self
 
-from colour import Color
-from sqlalchemy import ForeignKey, UniqueConstraint, select
+from sqlalchemy import (
+    ForeignKey,
+    Row,
+    UniqueConstraint,
+    select,
+    text,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy_utils import ColorType
+from sqlalchemy.sql.base import ExecutableOption
 
 from dnd.database.schemas.base import BaseSchema
+from dnd.database.types import ColorType
 
 if TYPE_CHECKING:
     from dnd.database.schemas.game_sets import GameSet
@@ -25,6 +32,8 @@ class Pawn(BaseSchema):
     user_id = mapped_column(ForeignKey("users.id"))
     game_set_id = mapped_column(ForeignKey("game_sets.id"))
     name: Mapped[str]
+    # bumped by every update, see ``update``
+    version: Mapped[int] = mapped_column(default=1, server_default="1")
 
     game_set: Mapped["GameSet"] = relationship(
         back_populates="pawns", lazy="joined"
@@ -55,23 +64,149 @@ class Pawn(BaseSchema):
 
     @classmethod
     async def get_by_name_and_game_set_id(
-        cls, session: AsyncSession, name: str, game_set_id: int
+        cls,
+        session: AsyncSession,
+        name: str,
+        game_set_id: int,
+        options: Iterable[ExecutableOption] = (),
     ) -> Self | None:
         return (
             await session.execute(
-                select(cls).where(
-                    (cls.name == name), (cls.game_set_id == game_set_id)
-                )
+                select(cls)
+                .options(*options)
+                .where((cls.name == name), (cls.game_set_id == game_set_id))
             )
         ).scalar_one_or_none()
 
     @classmethod
-    async def update(cls, session: AsyncSession, id: int, name: str):
-        return await cls._update(
-            session=session,
-            condition=(cls.id == id),
-            name=name,
+    async def get_labels(
+        cls, session: AsyncSession, game_set_id: int
+    ) -> list[Row]:
+        """``id, name, user_id, visibility`` of the pawns of the game set"""
+        res = await session.execute(
+            select(cls.id, cls.name, cls.user_id, PawnMeta.visibility)
+            .join(PawnMeta, PawnMeta.pawn_id == cls.id)
+            .where(cls.game_set_id == game_set_id)
+        )
+        return list(res)
+
+    @classmethod
+    async def get_footprints(
+        cls, session: AsyncSession, game_set_id: int
+    ) -> list[Row]:
+        """
+        ``id, name, user_id, visibility, meta_id, x, y, size_x, size_y``
+        of the pawns of the game set, for the geometry of the board
+        """
+        res = await session.execute(
+            select(
+                cls.id,
+                cls.name,
+                cls.user_id,
+                PawnMeta.visibility,
+                PawnMeta.id.label("meta_id"),
+                PawnMeta.x,
+                PawnMeta.y,
+                PawnMeta.size_x,
+                PawnMeta.size_y,
+            )
+            .join(PawnMeta, PawnMeta.pawn_id == cls.id)
+            .where(cls.game_set_id == game_set_id)
         )
+        return list(res)
+
+    @classmethod
+    async def update(
+        cls,
+        session: AsyncSession,
+        game_set_id: int,
+        name: str,
+        new_name: str | None = None,
+        version: int | None = None,
+        user_id: int | None = None,
+    ) -> int | None:
+        """
+        Compare-and-swap of the pawn version, returns the pawn id or None
+        if the pawn is missing, has another ``version`` or belongs to
+        another user than ``user_id``.
+        """
+        condition = [cls.game_set_id == game_set_id, cls.name == name]
+        if version is not None:
+            condition.append(cls.version == version)
+        if user_id is not None:
+            condition.append(cls.user_id == user_id)
+        values = {"version": cls.version + 1}
+        if new_name:
+            values["name"] = new_name
+        res = await session.execute(
+            update(cls)
+            .where(*condition)
+            .values(**values)
+            .returning(cls.id)
+            .execution_options(synchronize_session=False)
+        )
+        return res.scalar_one_or_none()
+
+    @classmethod
+    async def copy_out(
+        cls, session: AsyncSession, game_set_id: int, output: BinaryIO
+    ) -> None:
+        """Pawns of the game set as CSV with usernames of their users"""
+        connection = await cls._driver_connection(session)
+        await connection.copy_from_query(
+            "SELECT p.name, u.username, p.version, m.visibility, m.type, "
+            "m.size_x, m.size_y, m.x, m.y, m.color "
+            "FROM pawns p JOIN pawns_meta m ON m.pawn_id = p.id "
+            "LEFT JOIN users u ON u.id = p.user_id "
+            "WHERE p.game_set_id = $1 ORDER BY p.id",
+            game_set_id,
+            output=output,
+            format="csv",
+            header=True,
+        )
+
+    @classmethod
+    async def copy_in(
+        cls,
+        session: AsyncSession,
+        game_set_id: int,
+        owner_id: int,
+        source: AsyncIterable[bytes],
+    ) -> int:
+        """
+        Add pawns from CSV written by ``copy_out``, pawns of users missing
+        here are given to ``owner_id``. Returns the number of pawns.
+        """
+        await session.execute(
+            text(
+                "CREATE TEMPORARY TABLE imported_pawns (name text, "
+                "username text, version int, visibility bool, type text, "
+                "size_x int, size_y int, x int, y int, color text) "
+                "ON COMMIT DROP"
+            )
+        )
+        connection = await cls._driver_connection(session)
+        await connection.copy_to_table(
+            "imported_pawns", source=source, format="csv", header=True
+        )
+        res = await session.execute(
+            text(
+                "WITH added AS ("
+                "INSERT INTO pawns "
+                "(game_set_id, user_id, name, version, created_at) "
+                "SELECT :game_set_id, coalesce(u.id, :owner_id), i.name, "
+                "i.version, now() FROM imported_pawns i "
+                "LEFT JOIN users u ON u.username = i.username "
+                "RETURNING id, name) "
+                "INSERT INTO pawns_meta (pawn_id, visibility, type, size_x, "
+                "size_y, x, y, color, created_at) "
+                "SELECT a.id, i.visibility, i.type::pawntypeenum, i.size_x, "
+                "i.size_y, i.x, i.y, i.color, now() "
+                "FROM added a JOIN imported_pawns i ON i.name = a.name"
+            ),
+            {"game_set_id": game_set_id, "owner_id": owner_id},
+        )
+        return res.rowcount
 
 
 class PawnMeta(BaseSchema):
@@ -86,6 +221,8 @@ class PawnMeta(BaseSchema):
 
     @hybrid_property
     def color(self) -> str:
+        from colour import Color
+
         if isinstance(self._color, Color):
             return self._color.get_hex()
         return str(self._color)
@@ -121,19 +258,23 @@ class PawnMeta(BaseSchema):
     async def update(
         cls,
         session: AsyncSession,
-        id: int,
-        visibility: bool,
-        color: hex,
-        type: PawnTypeEnum = PawnTypeEnum.movable,
-        position: tuple[int, int] | tuple[None, None] = (None, None),
-        size: tuple[int, int] = (2, 2),
+        pawn_id: int,
+        color: str | None = None,
+        type: PawnTypeEnum | None = None,
+        position: tuple[int, int] | tuple[None, None] | None = None,
+        size: tuple[int, int] | None = None,
     ):
+        values = {}
+        if color is not None:
+            values["_color"] = color
+        if type is not None:
+            values["type"] = type
+        if position is not None:
+            values["x"], values["y"] = position
+        if size is not None:
+            values["size_x"], values["size_y"] = size
+        if not values:
+            return None
         return await cls._update(
-            session=session,
-            condition=(cls.id == id),
-            visibility=visibility,
-            position=position,
-            color=color,
-            type=type,
-            size=size,
+            session=session, condition=(cls.pawn_id == pawn_id), **values
         )
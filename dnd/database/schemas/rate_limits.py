@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+from dnd.database.schemas.base import Base
+
+
+class RateLimit(Base):
+    """Token bucket shared by the workers"""
+
+    __tablename__ = "rate_limits"
+    key: Mapped[str] = mapped_column(primary_key=True)
+    tokens: Mapped[float]
+    updated_at: Mapped[datetime] = mapped_column(server_default=func.now())
+
+    @classmethod
+    async def take(
+        cls, session: AsyncSession, key: str, rate: float, capacity: int
+    ) -> bool:
+        """
+        Take a token refilled at ``rate`` per second. A denied take
+        doesn't touch the row, so the refill keeps counting from the last
+        taken token.
+        """
+        elapsed = func.extract("epoch", func.now() - cls.updated_at)
+        tokens = func.least(capacity, cls.tokens + elapsed * rate)
+        res = await session.execute(
+            insert(cls)
+            .values(key=key, tokens=capacity - 1, updated_at=func.now())
+            .on_conflict_do_update(
+                index_elements=[cls.key],
+                set_={"tokens": tokens - 1, "updated_at": func.now()},
+                where=tokens >= 1,
+            )
+            .returning(cls.key)
+        )
+        return res.scalar_one_or_none() is not None
+
+    @classmethod
+    async def prune(cls, session: AsyncSession, older_than: timedelta):
+        await session.execute(
+            delete(cls).where(cls.updated_at < func.now() - older_than)
+        )
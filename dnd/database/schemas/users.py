@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING, Optional, Self
 
-from sqlalchemy import ForeignKey, select
+from sqlalchemy import ForeignKey, insert, literal, select
 from sqlalchemy.dialects.postgresql import BYTEA
 from sqlalchemy.engine import Result
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -44,6 +44,24 @@ class UserInGameset(Base):
             game_set_id=game_set_id,
         )
 
+    @classmethod
+    async def add_by_usernames(
+        cls,
+        session: AsyncSession,
+        game_set_id: int,
+        usernames: list[str],
+        owner_id: int,
+    ) -> None:
+        """Add the existing users besides the owner to the game set"""
+        await session.execute(
+            insert(cls).from_select(
+                ["user_id", "game_set_id"],
+                select(User.id, literal(game_set_id)).where(
+                    User.username.in_(usernames), User.id != owner_id
+                ),
+            )
+        )
+
 
 class User(BaseSchema):
     __tablename__ = "users"
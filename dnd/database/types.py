@@ -0,0 +1,38 @@
+from typing import TYPE_CHECKING
+
+from sqlalchemy import Unicode
+from sqlalchemy.types import TypeDecorator
+
+if TYPE_CHECKING:
+    from colour import Color
+
+
+class ColorType(TypeDecorator):
+    """
+    ``colour.Color`` stored as hex, compatible with the ``ColorType`` of
+    SQLAlchemy-Utils which costs a hundred milliseconds to import.
+    ``colour`` is imported by the first query.
+    """
+
+    impl = Unicode(20)
+    cache_ok = True
+
+    @property
+    def python_type(self) -> type["Color"]:
+        from colour import Color
+
+        return Color
+
+    def process_bind_param(self, value, dialect):
+        from colour import Color
+
+        if value and isinstance(value, Color):
+            return str(value.hex)
+        return value
+
+    def process_result_value(self, value, dialect):
+        from colour import Color
+
+        if value:
+            return Color(value)
+        return value
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import signal
+import time
+
+from sqlalchemy import text
+
+from dnd.database.db import async_session
+from dnd.database.schemas.game_sets import GameSet
+from dnd.procedures.game_set import game_set_load_options
+from dnd.settings import settings
+from dnd.storages.board import board_hub
+from dnd.storages.game_sets import game_set_headers
+from dnd.storages.initiative import initiative
+from dnd.utils.sharding import Shard
+
+logger = logging.getLogger(__name__)
+
+
+async def _warm_connection(short_urls: list[str]) -> None:
+    async with async_session() as session:
+        await session.execute(text("SELECT 1"))
+        # asyncpg prepares the statements per connection
+        for short_url in short_urls:
+            header = await game_set_headers.get(
+                session=session, short_url=short_url
+            )
+            if header is not None:
+                # resumes the turn timers of the encounters
+                await initiative.get(session=session, game_set_id=header.id)
+            await GameSet.get_by_short_url(
+                session=session,
+                short_url=short_url,
+                options=game_set_load_options(None),
+            )
+
+
+async def warm_up(shard: Shard = Shard()) -> None:
+    """
+    Open ``DB_POOL_SIZE`` connections and read the boards of the active
+    game sets of the shard spread over them, so the first requests after
+    a deploy don't pay for connecting, preparing statements and cold
+    pages.
+    """
+    start = time.perf_counter()
+    connections = settings.DB_POOL_SIZE
+    try:
+        async with async_session() as session:
+            short_urls = await GameSet.get_active_short_urls(
+                session=session, limit=settings.WARM_UP_GAME_SETS
+            )
+        short_urls = [x for x in short_urls if shard.owns(x)]
+        # sessions run concurrently to hold a connection each
+        await asyncio.gather(
+            *(
+                _warm_connection(short_urls[i::connections] or short_urls[:1])
+                for i in range(connections)
+            )
+        )
+    except Exception:
+        logger.exception("Warm up failed, starting cold")
+        return
+    logger.info(
+        f"Warmed {connections} connections and {len(short_urls)} game sets "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+
+
+class Shutdown:
+    """Graceful shutdown on SIGTERM or SIGINT"""
+
+    def __init__(self, drain_delay: float = 0.0):
+        self.drain_delay = drain_delay
+        self.draining = False
+
+    async def wait(self) -> None:
+        """
+        Shutdown trigger of the server. Health checks fail for
+        ``drain_delay`` to take the instance out of the load balancer,
+        then board sockets are closed and the server waits for in-flight
+        requests before running the shutdown handlers.
+        """
+        received = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, received.set)
+        await received.wait()
+        logger.info(f"Draining for {self.drain_delay}s before shutdown")
+        self.draining = True
+        await asyncio.sleep(self.drain_delay)
+        board_hub.close()
+
+
+shutdown = Shutdown(drain_delay=settings.SHUTDOWN_DRAIN_DELAY)
@@ -36,7 +36,7 @@ target_metadata = base.metadata
 # ... etc.
 
 with open(settings.LOGGING_FILE, "r") as stream:
-    log_config = yaml.load(stream, Loader=yaml.FullLoader)
+    log_config = yaml.load(stream, Loader=yaml.SafeLoader)
 
 logging.config.dictConfig(log_config)
 
@@ -0,0 +1,45 @@
+"""Add images
+
+Revision ID: 4f1c2d9e7a3b
+Revises: a2d5db77c2c8
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4f1c2d9e7a3b"
+down_revision = "a2d5db77c2c8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "images",
+        sa.Column("short_url", sa.String(), nullable=False),
+        sa.Column("refcount", sa.Integer(), nullable=False),
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_images_short_url"), "images", ["short_url"], unique=True
+    )
+    op.execute(
+        "INSERT INTO images (short_url, refcount, created_at) "
+        "SELECT image_short_url, count(*), now() FROM maps_meta "
+        "WHERE image_short_url IS NOT NULL GROUP BY image_short_url"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_images_short_url"), table_name="images")
+    op.drop_table("images")
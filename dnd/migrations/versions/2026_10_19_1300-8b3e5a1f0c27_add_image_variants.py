@@ -0,0 +1,41 @@
+"""Add image variants and dimensions
+
+Revision ID: 8b3e5a1f0c27
+Revises: 4f1c2d9e7a3b
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "8b3e5a1f0c27"
+down_revision = "4f1c2d9e7a3b"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("images", sa.Column("width", sa.Integer(), nullable=True))
+    op.add_column("images", sa.Column("height", sa.Integer(), nullable=True))
+    op.add_column(
+        "images",
+        sa.Column("formats", postgresql.ARRAY(sa.String()), nullable=True),
+    )
+    # images stored before are JPEG only
+    op.execute("UPDATE images SET formats = '{jpeg}'")
+    op.add_column(
+        "maps_meta", sa.Column("image_width", sa.Integer(), nullable=True)
+    )
+    op.add_column(
+        "maps_meta", sa.Column("image_height", sa.Integer(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("maps_meta", "image_height")
+    op.drop_column("maps_meta", "image_width")
+    op.drop_column("images", "formats")
+    op.drop_column("images", "height")
+    op.drop_column("images", "width")
@@ -0,0 +1,31 @@
+"""Add versions of pawns and game sets
+
+Revision ID: 3e8f0b6d5a91
+Revises: c71d9a4e2b58
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3e8f0b6d5a91"
+down_revision = "c71d9a4e2b58"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "pawns",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+    op.add_column(
+        "game_sets",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("game_sets", "version")
+    op.drop_column("pawns", "version")
@@ -0,0 +1,103 @@
+"""Add board history
+
+Revision ID: 9d4c7b2e1f60
+Revises: 3e8f0b6d5a91
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "9d4c7b2e1f60"
+down_revision = "3e8f0b6d5a91"
+branch_labels = None
+depends_on = None
+
+PARTITIONS = 16
+
+
+def upgrade() -> None:
+    op.execute(sa.schema.CreateSequence(sa.Sequence("board_events_id_seq")))
+    op.create_table(
+        "board_events",
+        sa.Column("game_set_id", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "id",
+            sa.BigInteger(),
+            server_default=sa.text("nextval('board_events_id_seq')"),
+            nullable=False,
+        ),
+        sa.Column("pawn_id", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "kind",
+            sa.Enum("add", "move", "remove", name="boardeventkind"),
+            nullable=False,
+        ),
+        sa.Column("x", sa.Integer(), nullable=True),
+        sa.Column("y", sa.Integer(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(
+            ["game_set_id"], ["game_sets.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("game_set_id", "id"),
+        postgresql_partition_by="HASH (game_set_id)",
+    )
+    for i in range(PARTITIONS):
+        op.execute(
+            f"CREATE TABLE board_events_{i} PARTITION OF board_events "
+            f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {i})"
+        )
+    op.create_table(
+        "board_snapshots",
+        sa.Column("game_set_id", sa.BigInteger(), nullable=False),
+        sa.Column("event_id", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "positions",
+            postgresql.JSONB(astext_type=sa.Text()),
+            nullable=False,
+        ),
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(
+            ["game_set_id"], ["game_sets.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_board_snapshots_game_set_event",
+        "board_snapshots",
+        ["game_set_id", "event_id"],
+    )
+    # the boards before the history, replays start from them
+    op.execute(
+        "INSERT INTO board_snapshots "
+        "(game_set_id, event_id, positions, created_at) "
+        "SELECT g.id, 0, coalesce(jsonb_object_agg("
+        "p.id::text, jsonb_build_array(m.x, m.y)) "
+        "FILTER (WHERE p.id IS NOT NULL), '{}'), now() "
+        "FROM game_sets g LEFT JOIN pawns p ON p.game_set_id = g.id "
+        "LEFT JOIN pawns_meta m ON m.pawn_id = p.id GROUP BY g.id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_board_snapshots_game_set_event", table_name="board_snapshots"
+    )
+    op.drop_table("board_snapshots")
+    op.drop_table("board_events")
+    sa.Enum(name="boardeventkind").drop(op.get_bind(), checkfirst=False)
+    op.execute(sa.schema.DropSequence(sa.Sequence("board_events_id_seq")))
@@ -0,0 +1,44 @@
+"""Add initiatives
+
+Revision ID: 5a2e8c4d9b13
+Revises: 9d4c7b2e1f60
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "5a2e8c4d9b13"
+down_revision = "9d4c7b2e1f60"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "initiatives",
+        sa.Column("game_set_id", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "entries", postgresql.JSONB(astext_type=sa.Text()), nullable=False
+        ),
+        sa.Column("turn", sa.Integer(), nullable=False),
+        sa.Column("round", sa.Integer(), nullable=False),
+        sa.Column("turn_seconds", sa.Integer(), nullable=True),
+        sa.Column("deadline", sa.DateTime(), nullable=True),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(
+            ["game_set_id"], ["game_sets.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("game_set_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("initiatives")
@@ -0,0 +1,54 @@
+"""Add dice
+
+Revision ID: e4b7a1c3d285
+Revises: 5a2e8c4d9b13
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e4b7a1c3d285"
+down_revision = "5a2e8c4d9b13"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "dice_streams",
+        sa.Column("game_set_id", sa.BigInteger(), nullable=False),
+        sa.Column("seed", sa.Numeric(precision=39, scale=0), nullable=False),
+        sa.Column("reserved", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["game_set_id"], ["game_sets.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("game_set_id"),
+    )
+    op.create_table(
+        "dice_rolls",
+        sa.Column("game_set_id", sa.BigInteger(), nullable=False),
+        sa.Column("index", sa.BigInteger(), nullable=False),
+        sa.Column("user_id", sa.BigInteger(), nullable=True),
+        sa.Column("expression", sa.String(), nullable=False),
+        sa.Column("total", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(
+            ["game_set_id"], ["game_sets.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(
+            ["user_id"], ["users.id"], ondelete="SET NULL"
+        ),
+        sa.PrimaryKeyConstraint("game_set_id", "index"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("dice_rolls")
+    op.drop_table("dice_streams")
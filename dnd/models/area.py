@@ -0,0 +1,72 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field, confloat, validator
+
+from dnd.utils import geometry
+
+# grid units, the cell (x, y) spans [x, x + 1) x [y, y + 1)
+Point = tuple[float, float]
+
+
+class CircleAreaModel(BaseModel):
+    shape: Literal["circle"]
+    origin: Point
+    radius: confloat(gt=0)
+
+    def area(self) -> geometry.Area:
+        return geometry.circle(self.origin, self.radius)
+
+
+class SquareAreaModel(BaseModel):
+    shape: Literal["square"]
+    # the center
+    origin: Point
+    size: confloat(gt=0)
+
+    def area(self) -> geometry.Area:
+        return geometry.square(self.origin, self.size)
+
+
+class DirectedAreaModel(BaseModel):
+    origin: Point
+    towards: Point
+
+    @validator("towards")
+    def towards_validator(cls, val: Point, values: dict):
+        if val == values.get("origin"):
+            raise ValueError("Must differ from the origin")
+        return val
+
+
+class LineAreaModel(DirectedAreaModel):
+    shape: Literal["line"]
+    length: confloat(gt=0)
+    width: confloat(gt=0) = 1
+
+    def area(self) -> geometry.Area:
+        return geometry.line(
+            self.origin, self.towards, self.length, self.width
+        )
+
+
+class ConeAreaModel(DirectedAreaModel):
+    shape: Literal["cone"]
+    length: confloat(gt=0)
+    # degrees, as wide as long by default
+    angle: confloat(gt=0, le=360) = 53.13
+
+    def area(self) -> geometry.Area:
+        return geometry.cone(
+            self.origin, self.towards, self.length, self.angle
+        )
+
+
+class AreaRequestModel(BaseModel):
+    __root__: (
+        CircleAreaModel | SquareAreaModel | LineAreaModel | ConeAreaModel
+    ) = Field(discriminator="shape")
+
+
+class AreaPawnsModel(BaseModel):
+    # names of the pawns in the area
+    pawns: list[str]
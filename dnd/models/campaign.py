@@ -0,0 +1,42 @@
+from typing import Literal
+
+from pydantic import BaseModel, conint, conlist, constr
+
+from dnd.models.pawn import PawnMetaRequestModel
+
+# a storage key, see ``image_key``
+ImageShortUrl = constr(regex=r"^[0-9A-Za-z]{1,255}$")
+
+
+class CampaignImageModel(BaseModel):
+    short_url: ImageShortUrl
+    width: int | None
+    height: int | None
+    # the last one is the fallback, see ``Image.formats``
+    formats: conlist(Literal["avif", "webp", "png", "jpeg"], min_items=1)
+
+
+class CampaignMapModel(BaseModel):
+    name: constr(min_length=1, max_length=60)
+    len_x: conint(ge=1)
+    len_y: conint(ge=1)
+    image: CampaignImageModel | None
+
+
+class CampaignModel(BaseModel):
+    """``campaign.json`` of an archive, users are referred by usernames"""
+
+    format: Literal[1] = 1
+    name: str
+    short_url: str
+    owner: str
+    members: list[str]
+    map: CampaignMapModel | None
+
+
+class CampaignPawnModel(PawnMetaRequestModel):
+    """A row of ``pawns.csv`` checked like a created pawn"""
+
+    name: constr(min_length=1, max_length=30)
+    version: conint(ge=1)
+    visibility: bool
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field, constr, validator
+
+from dnd.utils.dice import parse
+
+
+class DiceRollRequestModel(BaseModel):
+    expression: constr(min_length=1, max_length=100) = Field(
+        example="4d6kh3+2"
+    )
+
+    @validator("expression")
+    def expression_validator(cls, val: str):
+        return str(parse(val))
+
+
+class DiceRollModel(BaseModel):
+    # the stream index of the roll, it's replayed from it
+    index: int
+    user: str | None
+    expression: str
+    total: int
+    # the dice of every term, null for terms of more than 100 dice
+    rolls: list[list[int] | None]
+
+
+class DiceLogEntryModel(BaseModel):
+    index: int
+    username: str | None
+    expression: str
+    total: int
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
@@ -1,9 +1,10 @@
-from typing import Optional
+from datetime import datetime
+from typing import Literal, Optional
 
-from pydantic import BaseModel, constr
+from pydantic import BaseModel, conint, conlist, constr
 
 from dnd.models.map import MapModel
-from dnd.models.pawn import PawnModel
+from dnd.models.pawn import PawnModel, PawnMoveModel
 
 
 class GameSetPlayerPositionModel(BaseModel):
@@ -40,6 +41,7 @@ class UsersInGame(BaseModel):
 class GameSetModel(BaseModel):
     name: str
     short_url: str
+    version: int
     owner: UserInGameModel
     meta: GameSetMetaModel
     pawns: list[PawnModel]
@@ -78,4 +80,49 @@ class CreateGameSetRequestModel(BaseModel):
 class UpdateGameSetRequestModel(BaseModel):
     name: constr(max_length=60) | None
     map_name: constr(max_length=60) | None
+    # the version the change is based on, 409 if the game set was changed
+    version: int | None
     # users: UserInGameUpdateRequestModel | None
+
+
+class BoardMoveEventModel(PawnMoveModel):
+    type: Literal["move"]
+    pawn: constr(max_length=30)
+
+
+class BoardHistoryPawnModel(BaseModel):
+    name: str
+    x: int | None
+    y: int | None
+
+
+class BoardHistoryModel(BaseModel):
+    """The board after the event ``event_id``, without deleted pawns"""
+
+    event_id: int
+    pawns: list[BoardHistoryPawnModel]
+
+
+class InitiativeEntryRequestModel(BaseModel):
+    pawn: constr(max_length=30)
+    initiative: int
+
+
+class StartInitiativeRequestModel(BaseModel):
+    pawns: conlist(InitiativeEntryRequestModel, min_items=1)
+    # the turn passes on by itself after the seconds
+    turn_seconds: conint(ge=1) | None
+
+
+class InitiativeEntryModel(BaseModel):
+    pawn: str
+    initiative: int
+
+
+class InitiativeModel(BaseModel):
+    round: int
+    turn_seconds: int | None
+    deadline: datetime | None
+    # the pawn that may move
+    active: str
+    pawns: list[InitiativeEntryModel]
@@ -8,6 +8,8 @@ class MapMetaLenModel(BaseModel):
 
 class MapMetaModel(MapMetaLenModel):
     image_short_url: str | None
+    image_width: int | None
+    image_height: int | None
     len_x: int
     len_y: int
 
@@ -1,4 +1,3 @@
-from enum import Enum
 from typing import TypeAlias
 
 from pydantic import BaseModel, Field, conint, conlist, validator
@@ -6,28 +5,11 @@ from pydantic.color import Color
 
 from dnd.database.schemas.pawns import PawnTypeEnum
 from dnd.models.auth import UserInfoModel
+from dnd.storages.glossary import glossary
 
 XYType: TypeAlias = conlist(conint(ge=1), min_items=2, max_items=2)
 
 
-class MovablePawnSizeEnum(Enum):
-    small: XYType = (2, 2)
-    medium: XYType = (5, 5)
-    large: XYType = (10, 10)
-    huge: XYType = (15, 15)
-    gigantic: XYType = (20, 20)
-
-    @classmethod
-    def get_all_sizes(cls):
-        return (
-            cls.small,
-            cls.medium,
-            cls.large,
-            cls.huge,
-            cls.gigantic,
-        )
-
-
 class PawnMetaModel(BaseModel):
     visibility: bool
     type: PawnTypeEnum
@@ -43,6 +25,7 @@ class PawnMetaModel(BaseModel):
 
 class PawnModel(BaseModel):
     name: str
+    version: int
     user: UserInfoModel
     meta: PawnMetaModel
 
@@ -59,15 +42,15 @@ class PawnMetaRequestModel(BaseModel):
     color: Color = Field(example=Color("white"))
     size: XYType
 
-    @classmethod
     @validator("size")
     def size_validator(cls, val: XYType, values: dict):
         if (
             val is not None
             and values.get("type") is PawnTypeEnum.movable
-            and val not in MovablePawnSizeEnum.get_all_sizes()
+            and tuple(val) not in glossary.pawn_sizes
         ):
             raise ValueError("Not available size for movable type")
+        return val
 
 
 class UpdatePawnMetaRequestModel(PawnMetaRequestModel):
@@ -78,6 +61,8 @@ class UpdatePawnMetaRequestModel(PawnMetaRequestModel):
     type: PawnTypeEnum | None
     color: Color | None = Field(example=Color("white"))
     size: XYType | None
+    # the version the change is based on, 409 if the pawn was changed
+    version: int | None
 
 
 class PawnMoveModel(BaseModel):
@@ -85,3 +70,6 @@ class PawnMoveModel(BaseModel):
         None,
         None,
     )
+    # the end of a drag, the position is written right away
+    drop: bool = False
+    version: int | None
@@ -32,19 +32,21 @@ async def check_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    if payload := hasher.decode_jwt(token=token):
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenDataModel(username=username)
-    else:
-        raise credentials_exception
-    user = await User.get_by_username(session, username=token_data.username)
+    user = await get_user_by_token(session=session, token=token, hasher=hasher)
     if user is None:
         raise credentials_exception
-
     return user
 
 
+async def get_user_by_token(
+    session: AsyncSession, token: str, hasher: Hasher
+) -> User | None:
+    payload = hasher.decode_jwt(token=token)
+    if not payload or payload.get("sub") is None:
+        return None
+    token_data = TokenDataModel(username=payload["sub"])
+    return await User.get_by_username(session, username=token_data.username)
+
+
 async def get_current_user(user: User = Depends(check_user)) -> UserInfoModel:
     return UserInfoModel.from_orm(user)
@@ -0,0 +1,52 @@
+from fastapi import Header
+from starlette.responses import Response
+
+from dnd.models.game_set import GameSetModel
+from dnd.models.pawn import PawnModel
+from dnd.utils.packing import pack_game_set, pack_pawns
+
+BOARD_MEDIA_TYPE = "application/vnd.dnd.board"
+# the encoding is negotiated, caches must key the responses by Accept
+VARY_ACCEPT = {"Vary": "Accept"}
+
+
+def accepts(accept: str | None, media_type: str) -> bool:
+    """Check that the ``Accept`` header allows the ``media_type``"""
+    for item in (accept or "").split(","):
+        value, *params = (x.strip() for x in item.split(";"))
+        if value.lower() != media_type:
+            continue
+        for param in params:
+            key, _, quality = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    return float(quality) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+async def get_board_encoding(
+    response: Response, accept: str | None = Header(None)
+) -> bool:
+    """
+    Whether the client asked for the compact binary board encoding.
+    Responses built from the returned models get ``VARY_ACCEPT``, the
+    routes add it to the responses they return.
+    """
+    response.headers.update(VARY_ACCEPT)
+    return accepts(accept, BOARD_MEDIA_TYPE)
+
+
+class BoardResponse(Response):
+    media_type = BOARD_MEDIA_TYPE
+
+    def init_headers(self, headers=None) -> None:
+        super().init_headers(headers)
+        self.headers.add_vary_header("Accept")
+
+    def render(self, content: GameSetModel | list[PawnModel]) -> bytes:
+        if isinstance(content, GameSetModel):
+            return pack_game_set(content)
+        return pack_pawns(content)
@@ -0,0 +1,419 @@
+"""
+Campaign archives: a tar of ``campaign.json`` (``CampaignModel``), the
+stored variants of the map image as ``images/<format>`` and the pawns as
+``pawns.csv`` written and read with COPY. Members are streamed one by
+one, only the pawns are spooled (in memory while they are small).
+"""
+import asyncio
+import codecs
+import csv
+import io
+from hashlib import blake2b
+from pathlib import Path
+from tempfile import SpooledTemporaryFile
+from typing import AsyncIterable, AsyncIterator, BinaryIO
+
+from asyncpg import PostgresError
+from hashids import Hashids
+from pydantic import ValidationError
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dnd.database.db import async_session
+from dnd.database.schemas.game_sets import GameSet, GameSetMeta
+from dnd.database.schemas.history import BoardSnapshot
+from dnd.database.schemas.images import Image as StoredImage
+from dnd.database.schemas.maps import Map, MapMeta
+from dnd.database.schemas.pawns import Pawn
+from dnd.database.schemas.users import User, UserInGameset
+from dnd.models.campaign import (
+    CampaignImageModel,
+    CampaignMapModel,
+    CampaignModel,
+    CampaignPawnModel,
+)
+from dnd.procedures.game_set import game_set_load_options
+from dnd.procedures.maps import SavedImage, store_image
+from dnd.settings import settings
+from dnd.storages.board import move_buffer
+from dnd.storages.images import image_backend
+from dnd.utils.archive import (
+    END,
+    ArchiveError,
+    TarReader,
+    tar_bytes,
+    tar_member,
+)
+
+MANIFEST = "campaign.json"
+PAWNS = "pawns.csv"
+IMAGES = "images/"
+CAMPAIGN_FIELDS = {
+    "owner": None,
+    "meta": None,
+    "users_in_game": {"user": None},
+}
+SPOOL_SIZE = 1024 * 1024
+# the header of ``pawns.csv``, see ``Pawn.copy_out``
+PAWN_COLUMNS = [
+    "name",
+    "username",
+    "version",
+    "visibility",
+    "type",
+    "size_x",
+    "size_y",
+    "x",
+    "y",
+    "color",
+]
+
+
+async def _file_chunks(file, chunk_size: int) -> AsyncIterator[bytes]:
+    while chunk := await asyncio.to_thread(file.read, chunk_size):
+        yield chunk
+
+
+async def export_campaign(short_url: str) -> AsyncIterator[bytes]:
+    """The archive of the game set, raises LookupError if it's missing"""
+    # positions dragged in this worker aren't written yet
+    await move_buffer.flush()
+    pawns = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    try:
+        async with async_session() as session:
+            game_set = await GameSet.get_by_short_url(
+                session=session,
+                short_url=short_url,
+                options=game_set_load_options(CAMPAIGN_FIELDS),
+            )
+            if game_set is None:
+                raise LookupError(f"Game set {short_url} not found")
+            manifest = await _manifest(session=session, game_set=game_set)
+            await Pawn.copy_out(
+                session=session, game_set_id=game_set.id, output=pawns
+            )
+        # the session is closed, streaming may take long
+
+        async for chunk in tar_bytes(MANIFEST, manifest.json().encode()):
+            yield chunk
+        if manifest.map and manifest.map.image:
+            image = manifest.map.image
+            for fmt in image.formats:
+                async with image_backend.open(image.short_url, fmt) as (
+                    size,
+                    chunks,
+                ):
+                    async for chunk in tar_member(
+                        f"{IMAGES}{fmt}", size, chunks
+                    ):
+                        yield chunk
+        size = pawns.tell()
+        pawns.seek(0)
+        async for chunk in tar_member(
+            PAWNS, size, _file_chunks(pawns, image_backend.chunk_size)
+        ):
+            yield chunk
+        yield END
+    finally:
+        pawns.close()
+
+
+async def _manifest(session: AsyncSession, game_set: GameSet) -> CampaignModel:
+    campaign_map = None
+    if game_set.meta and (game_map := game_set.meta.map):
+        image = None
+        if short_url := game_map.meta.image_short_url:
+            formats = await StoredImage.get_formats(
+                session=session, short_url=short_url
+            )
+            if formats:
+                image = CampaignImageModel(
+                    short_url=short_url,
+                    width=game_map.meta.image_width,
+                    height=game_map.meta.image_height,
+                    formats=formats,
+                )
+        campaign_map = CampaignMapModel(
+            name=game_map.name,
+            len_x=game_map.meta.len_x,
+            len_y=game_map.meta.len_y,
+            image=image,
+        )
+    return CampaignModel(
+        name=game_set.name,
+        short_url=game_set.short_url,
+        owner=game_set.owner.username,
+        members=[x.user.username for x in game_set.users_in_game],
+        map=campaign_map,
+    )
+
+
+async def _spool(
+    chunks: AsyncIterable[bytes], max_size: int | None = None
+) -> tuple[Path, str]:
+    """Copy the member into a spool file, returns it and its digest"""
+    path = image_backend.temporary_path()
+    file_hash = blake2b(digest_size=16)
+    size = 0
+    try:
+        with path.open("wb") as spool:
+            async for chunk in chunks:
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise ArchiveError("The map image is too large")
+                file_hash.update(chunk)
+                await asyncio.to_thread(spool.write, chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path, file_hash.hexdigest()
+
+
+def _validate_pawns(source: BinaryIO, target: BinaryIO) -> None:
+    """
+    Write the rows of ``pawns.csv`` validated like created pawns to
+    ``target``, the usernames are dropped so the owner gets every pawn
+    """
+    rows = csv.reader(codecs.iterdecode(source, "utf-8"))
+    line = io.StringIO()
+    writer = csv.writer(line)
+    try:
+        if next(rows, None) != PAWN_COLUMNS:
+            raise ArchiveError(f"Broken {PAWNS}: unexpected columns")
+        writer.writerow(PAWN_COLUMNS)
+        for number, row in enumerate(rows, start=1):
+            if len(row) != len(PAWN_COLUMNS):
+                raise ArchiveError(f"Broken {PAWNS}: row {number}")
+            (
+                name,
+                _,
+                version,
+                visibility,
+                type_,
+                size_x,
+                size_y,
+                x,
+                y,
+                color,
+            ) = row
+            pawn = CampaignPawnModel(
+                name=name,
+                version=version,
+                visibility=visibility,
+                type=type_,
+                size=(size_x, size_y),
+                position=(x or None, y or None),
+                color=color,
+            )
+            writer.writerow(
+                [
+                    pawn.name,
+                    None,
+                    pawn.version,
+                    "t" if pawn.visibility else "f",
+                    pawn.type.value,
+                    *pawn.size,
+                    *pawn.position,
+                    pawn.color.as_hex(),
+                ]
+            )
+            target.write(line.getvalue().encode())
+            line.seek(0)
+            line.truncate()
+    except ValidationError as e:
+        raise ArchiveError(f"Broken {PAWNS}: row {number}: {e}") from None
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ArchiveError(f"Broken {PAWNS}: {e}") from None
+
+
+async def _check_pawns(chunks: AsyncIterable[bytes], target: BinaryIO) -> None:
+    """``pawns.csv`` of an untrusted archive, see ``_validate_pawns``"""
+    source = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    try:
+        async for chunk in chunks:
+            await asyncio.to_thread(source.write, chunk)
+        source.seek(0)
+        await asyncio.to_thread(_validate_pawns, source, target)
+    finally:
+        source.close()
+    target.seek(0)
+
+
+class _ImageImport:
+    """
+    Variants of the map image from an archive. Trusted archives are
+    stored as they are, others have the fallback variant decoded and
+    encoded again like an upload.
+    """
+
+    def __init__(
+        self,
+        image: CampaignImageModel,
+        session: AsyncSession,
+        shortcut: Hashids,
+        trusted: bool,
+    ):
+        self.image = image
+        self.session = session
+        self.shortcut = shortcut
+        self.trusted = trusted
+        self.saved: SavedImage | None = None
+        self._stored = None
+        self._formats: set[str] = set()
+
+    async def add(self, fmt: str, chunks: AsyncIterable[bytes]) -> None:
+        if fmt not in self.image.formats:
+            return
+        if not self.trusted:
+            if fmt == self.image.formats[-1]:
+                path, digest = await _spool(
+                    chunks, max_size=settings.IMAGE_MAX_UPLOAD_SIZE
+                )
+                self.saved = await store_image(
+                    source=path,
+                    digest=digest,
+                    shortcut=self.shortcut,
+                    session=self.session,
+                )
+            return
+
+        if self._stored is None:
+            # the row is locked till the commit, like uploads
+            self._stored = await StoredImage.acquire(
+                session=self.session, short_url=self.image.short_url
+            )
+        if self._stored.formats is not None:
+            return
+        path, _ = await _spool(chunks)
+        try:
+            await image_backend.put(self.image.short_url, path, fmt)
+        finally:
+            path.unlink(missing_ok=True)
+        self._formats.add(fmt)
+
+    async def finish(self) -> SavedImage | None:
+        if not self.trusted or self._stored is None:
+            return self.saved
+        if self._stored.formats is None:
+            if self._formats != set(self.image.formats):
+                raise ArchiveError("Variants of the map image are missing")
+            await StoredImage.set_variants(
+                session=self.session,
+                short_url=self.image.short_url,
+                width=self.image.width,
+                height=self.image.height,
+                formats=self.image.formats,
+            )
+        return SavedImage(
+            self.image.short_url, self.image.width, self.image.height
+        )
+
+
+async def import_campaign(
+    chunks: AsyncIterable[bytes],
+    session: AsyncSession,
+    shortcut: Hashids,
+    owner_id: int | None = None,
+    trusted: bool = False,
+    max_size: int = settings.CAMPAIGN_MAX_IMPORT_SIZE,
+) -> str:
+    """
+    Create a game set from the archive and return its short url, the
+    caller commits. The owner defaults to the user with the username of
+    the archive owner, an owner's map with the same name is reused.
+    Untrusted archives get no members and all of their pawns go to the
+    owner, the pawns are validated before the COPY.
+    """
+    members = aiter(TarReader(chunks, max_size=max_size))
+    name, content = await anext(members, (None, None))
+    if name != MANIFEST:
+        raise ArchiveError(f"{MANIFEST} must be the first file")
+    try:
+        manifest = CampaignModel.parse_raw(
+            b"".join([chunk async for chunk in content])
+        )
+    except ValidationError as e:
+        raise ArchiveError(f"Broken {MANIFEST}: {e}") from None
+
+    if owner_id is None:
+        owner = await User.get_by_username(
+            session=session, username=manifest.owner
+        )
+        if owner is None:
+            raise ArchiveError(f"User {manifest.owner} doesn't exist")
+        owner_id = owner.id
+    game_set_id = await GameSet.get_next_id(session=session)
+    short_url = shortcut.encode(game_set_id)
+    await GameSet.create(
+        session=session,
+        game_set_id=game_set_id,
+        owner_id=owner_id,
+        name=manifest.name,
+        short_url=short_url,
+    )
+    game_map = None
+    if manifest.map:
+        game_map = await Map.get_by_name_and_user_id(
+            session=session, name=manifest.map.name, user_id=owner_id
+        )
+    image = None
+    if game_map is None and manifest.map and manifest.map.image:
+        image = _ImageImport(
+            image=manifest.map.image,
+            session=session,
+            shortcut=shortcut,
+            trusted=trusted,
+        )
+
+    async for name, content in members:
+        if name.startswith(IMAGES) and image is not None:
+            await image.add(name.removeprefix(IMAGES), content)
+        elif name == PAWNS:
+            pawns = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+            try:
+                if not trusted:
+                    await _check_pawns(content, pawns)
+                    content = _file_chunks(pawns, image_backend.chunk_size)
+                await Pawn.copy_in(
+                    session=session,
+                    game_set_id=game_set_id,
+                    owner_id=owner_id,
+                    source=content,
+                )
+            except (PostgresError, DBAPIError) as e:
+                raise ArchiveError(f"Broken {PAWNS}: {e}") from None
+            finally:
+                pawns.close()
+            # the history of the game set starts with the imported board
+            await BoardSnapshot.capture(
+                session=session, game_set_id=game_set_id
+            )
+
+    if game_map is None and manifest.map:
+        saved = await image.finish() if image else None
+        game_map = await Map.create(
+            session=session, user_id=owner_id, name=manifest.map.name
+        )
+        game_map.meta = await MapMeta.create(
+            session=session,
+            map_id=game_map.id,
+            len_x=manifest.map.len_x,
+            len_y=manifest.map.len_y,
+            image_short_url=saved.short_url if saved else None,
+            image_width=saved.width if saved else None,
+            image_height=saved.height if saved else None,
+        )
+        await session.flush()
+    await GameSetMeta.create(
+        session=session,
+        game_set_id=game_set_id,
+        map_id=game_map.id if game_map else None,
+    )
+    if trusted and manifest.members:
+        await UserInGameset.add_by_usernames(
+            session=session,
+            game_set_id=game_set_id,
+            usernames=manifest.members,
+            owner_id=owner_id,
+        )
+    return short_url
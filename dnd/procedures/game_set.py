@@ -1,14 +1,23 @@
 import logging
+from typing import Callable
 
-from fastapi import Depends, HTTPException
-from pydantic import constr
+from fastapi import Depends, HTTPException, Query
+from pydantic import BaseModel, constr
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+from sqlalchemy.sql.base import ExecutableOption
 from starlette import status
 
 from dnd.database.db import get_db
-from dnd.database.schemas.game_sets import GameSet
+from dnd.database.schemas.game_sets import GameSet, GameSetMeta
+from dnd.database.schemas.maps import Map, MapMeta
+from dnd.database.schemas.users import User, UserInGameset
 from dnd.models.auth import UserInfoModel
-from dnd.procedures.auth import get_current_user
+from dnd.procedures.auth import check_user, get_current_user
+from dnd.procedures.pawn import pawn_load_options
+from dnd.storages.game_sets import GameSetHeader, game_set_headers
+from dnd.storages.members import membership
+from dnd.utils.projection import FieldsTree, parse_fields, selects
 
 logger = logging.getLogger(__name__)
 
@@ -27,4 +36,107 @@ async def get_current_game_set(
             detail="GameSet not found",
         )
     logger.info(f"{current_user=} get {game_set=} with {game_set.id}")
+    membership.load(game_set)
     return game_set
+
+
+async def get_game_set_header(
+    game_set_short_url: constr(max_length=255),
+    current_user: UserInfoModel = Depends(get_current_user),
+    session: AsyncSession = Depends(get_db),
+) -> GameSetHeader:
+    """The game set without relationships, for pawn and board requests"""
+    header = await game_set_headers.get(
+        session=session, short_url=game_set_short_url
+    )
+    if not header:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="GameSet not found",
+        )
+    return header
+
+
+async def get_member_game_set(
+    game_set: GameSetHeader = Depends(get_game_set_header),
+    user: User = Depends(check_user),
+    session: AsyncSession = Depends(get_db),
+) -> GameSetHeader:
+    """The game set of the owner or a member, other users get 404"""
+    if user.id != game_set.owner_id and not await membership.is_member(
+        session=session, game_set_id=game_set.id, user_id=user.id
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="GameSet not found",
+        )
+    return game_set
+
+
+def get_fields(
+    model: type[BaseModel],
+) -> Callable[..., FieldsTree | None]:
+    async def fields_dependency(
+        fields: str
+        | None = Query(
+            None,
+            max_length=1024,
+            description="Comma separated fields to return, "
+            "e.g. `short_url,pawns.name,pawns.meta.x,pawns.meta.y`",
+        ),
+    ) -> FieldsTree | None:
+        if fields is None:
+            return None
+        try:
+            return parse_fields(model, fields)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=str(e),
+            )
+
+    return fields_dependency
+
+
+def game_set_load_options(fields: FieldsTree) -> list[ExecutableOption]:
+    """
+    Loader options which fetch only relationships selected by ``fields``,
+    the access check uses ``membership``.
+    """
+    options = []
+    if selects(fields, "users_in_game"):
+        options.append(
+            selectinload(GameSet.users_in_game).options(
+                raiseload(UserInGameset.game_set),
+                joinedload(UserInGameset.user).raiseload("*")
+                if selects(fields, "users_in_game", "user")
+                else raiseload(UserInGameset.user),
+            )
+        )
+    else:
+        options.append(raiseload(GameSet.users_in_game))
+    if selects(fields, "owner"):
+        options.append(joinedload(GameSet.owner).raiseload("*"))
+    else:
+        options.append(raiseload(GameSet.owner))
+    if selects(fields, "meta"):
+        options.append(
+            joinedload(GameSet.meta).options(
+                raiseload(GameSetMeta.game_set),
+                joinedload(GameSetMeta.map).options(
+                    raiseload(Map.user),
+                    joinedload(Map.meta).raiseload(MapMeta.map),
+                ),
+            )
+        )
+    else:
+        options.append(raiseload(GameSet.meta))
+    if selects(fields, "pawns"):
+        options.append(
+            selectinload(GameSet.pawns).options(
+                *pawn_load_options((fields or {}).get("pawns"), meta=True)
+            )
+        )
+    else:
+        options.append(raiseload(GameSet.pawns))
+    return options
@@ -1,30 +1,187 @@
-from hashlib import md5
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from hashlib import blake2b
 from pathlib import Path
+from typing import BinaryIO, Callable, Coroutine
 
-from fastapi import HTTPException, UploadFile
+from fastapi import HTTPException, Request, Response, UploadFile
+from fastapi.routing import APIRoute
 from hashids import Hashids
-from PIL import Image
-
-from dnd.storages.images import images
-
-
-async def save_image(image: UploadFile, shortcut: Hashids) -> str:
-    file_hash = md5()
-    while chunk := (await image.read(8192)):
-        file_hash.update(chunk)
-    short_url = shortcut.encode_hex(file_hash.hexdigest())
-    path = Path(images.directory)
-    path /= short_url
-    if not path.exists():
-        im = Image.open(image.file)
-        try:
-            if im.mode in ("RGBA", "P"):
-                im = im.convert("RGB")
-
-            im.save(path.absolute(), "JPEG", quality=50)
-        except Exception:
-            raise HTTPException(status_code=500, detail="Something went wrong")
-        finally:
-            image.file.close()
-            im.close()
-    return short_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from dnd.database.schemas.images import Image as StoredImage
+from dnd.settings import settings
+from dnd.storages.images import image_backend
+from dnd.utils.imaging import (
+    DecodeLimits,
+    EncodeOptions,
+    ImageDecoder,
+    ImageRejected,
+    ImageUnreadable,
+)
+
+logger = logging.getLogger(__name__)
+
+image_decoder = ImageDecoder(
+    spool_directory=image_backend.spool_directory,
+    limits=DecodeLimits(
+        max_pixels=settings.IMAGE_MAX_PIXELS,
+        max_side=settings.IMAGE_MAX_SIDE,
+        max_decoded_bytes=settings.IMAGE_MAX_DECODED_BYTES,
+    ),
+    options=EncodeOptions(
+        jpeg_quality=settings.IMAGE_JPEG_QUALITY,
+        webp_quality=settings.IMAGE_WEBP_QUALITY,
+        avif_quality=(
+            settings.IMAGE_AVIF_QUALITY if settings.IMAGE_AVIF else None
+        ),
+    ),
+    workers=settings.IMAGE_DECODE_WORKERS,
+    memory=settings.IMAGE_DECODE_MEMORY,
+)
+
+
+# multipart boundaries, part headers and the other form fields
+FORM_OVERHEAD = 64 * 1024
+
+
+class UploadRoute(APIRoute):
+    """
+    Rejects request bodies over ``max_size`` while receiving them, before
+    Starlette spools the whole form: by Content-Length when it's sent,
+    otherwise once the received chunks exceed it.
+    """
+
+    max_size = settings.IMAGE_MAX_UPLOAD_SIZE + FORM_OVERHEAD
+
+    def get_route_handler(
+        self,
+    ) -> Callable[[Request], Coroutine[None, None, Response]]:
+        handler = super().get_route_handler()
+        max_size = self.max_size
+
+        async def limited_handler(request: Request) -> Response:
+            length = request.headers.get("content-length")
+            if length is not None and (
+                not length.isdigit() or int(length) > max_size
+            ):
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                )
+            received = 0
+
+            async def receive():
+                nonlocal received
+                message = await request.receive()
+                received += len(message.get("body", b""))
+                if received > max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                    )
+                return message
+
+            return await handler(Request(request.scope, receive))
+
+        return limited_handler
+
+
+@dataclass(frozen=True)
+class SavedImage:
+    short_url: str
+    width: int | None
+    height: int | None
+
+
+def spool_upload(
+    file: BinaryIO, path: Path, chunk_size: int, max_size: int
+) -> str:
+    """
+    Copy the upload into the spool file hashing it on the way, returns
+    the hex digest of the content. The body is bounded by ``UploadRoute``
+    already, the size of the file itself is checked before reading.
+    """
+    size = file.seek(0, os.SEEK_END)
+    if size > max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+    file.seek(0)
+    file_hash = blake2b(digest_size=16)
+    with path.open("wb") as spool:
+        while chunk := file.read(chunk_size):
+            file_hash.update(chunk)
+            spool.write(chunk)
+    return file_hash.hexdigest()
+
+
+async def save_image(
+    image: UploadFile, shortcut: Hashids, session: AsyncSession
+) -> SavedImage:
+    source = image_backend.temporary_path()
+    try:
+        digest = await asyncio.to_thread(
+            spool_upload,
+            image.file,
+            source,
+            settings.IMAGE_UPLOAD_CHUNK_SIZE,
+            settings.IMAGE_MAX_UPLOAD_SIZE,
+        )
+    except Exception:
+        source.unlink(missing_ok=True)
+        raise
+    finally:
+        image.file.close()
+    return await store_image(
+        source=source, digest=digest, shortcut=shortcut, session=session
+    )
+
+
+async def store_image(
+    source: Path, digest: str, shortcut: Hashids, session: AsyncSession
+) -> SavedImage:
+    """Decode the spooled ``source`` and store its variants, once"""
+    short_url = shortcut.encode_hex(digest)
+    # the row is locked till the commit, so the collector can't remove
+    # the files in between and concurrent uploads wait for the variants
+    stored = await StoredImage.acquire(session=session, short_url=short_url)
+    if stored.formats is not None:
+        source.unlink(missing_ok=True)
+        return SavedImage(short_url, stored.width, stored.height)
+
+    variants = {}
+    try:
+        width, height, variants = await image_decoder.encode(source)
+        for fmt, path in variants.items():
+            await image_backend.put(short_url, path, fmt)
+    except ImageRejected:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Image is too large",
+        )
+    except ImageUnreadable:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Unsupported image",
+        )
+    except Exception:
+        logger.exception(f"Storing image {short_url} failed")
+        raise
+    finally:
+        for path in (source, *variants.values()):
+            path.unlink(missing_ok=True)
+    await StoredImage.set_variants(
+        session=session,
+        short_url=short_url,
+        width=width,
+        height=height,
+        formats=list(variants),
+    )
+    return SavedImage(short_url, width, height)
+
+
+async def release_image(session: AsyncSession, short_url: str | None):
+    if short_url is not None:
+        await StoredImage.release(session=session, short_url=short_url)
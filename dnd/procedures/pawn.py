@@ -0,0 +1,117 @@
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, raiseload
+from sqlalchemy.sql.base import ExecutableOption
+from starlette import status
+
+from dnd.database.schemas.history import BoardEventKind
+from dnd.database.schemas.pawns import Pawn, PawnMeta
+from dnd.models.pawn import PawnModel
+from dnd.procedures.versions import version_conflict
+from dnd.storages.board import Position, board_hub, move_buffer
+from dnd.storages.game_sets import GameSetHeader
+from dnd.storages.history import event_log
+from dnd.storages.initiative import initiative
+from dnd.utils.projection import FieldsTree, selects
+
+
+def pawn_load_options(
+    fields: FieldsTree | None, meta: bool = False
+) -> list[ExecutableOption]:
+    """
+    Loader options which fetch only relationships selected by ``fields``,
+    ``meta`` forces loading of the meta (e.g. for the visibility check).
+    """
+    return [
+        raiseload(Pawn.game_set),
+        joinedload(Pawn.user).raiseload("*")
+        if selects(fields, "user")
+        else raiseload(Pawn.user),
+        joinedload(Pawn.meta).raiseload(PawnMeta.pawn)
+        if meta or selects(fields, "meta")
+        else raiseload(Pawn.meta),
+    ]
+
+
+async def check_turn(
+    session: AsyncSession,
+    game_set: GameSetHeader,
+    user_id: int,
+    pawn_name: str,
+) -> None:
+    """
+    In an encounter only the active pawn moves, the owner of the game set
+    moves any pawn
+    """
+    encounter = await initiative.get(session=session, game_set_id=game_set.id)
+    if (
+        encounter is not None
+        and user_id != game_set.owner_id
+        and pawn_name != encounter.active.name
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"It's the turn of {encounter.active.name}",
+        )
+
+
+async def place_pawn(
+    session: AsyncSession,
+    game_set: GameSetHeader,
+    user_id: int,
+    pawn_name: str,
+    new_position: Position,
+    drop: bool = False,
+    version: int | None = None,
+) -> Pawn:
+    """
+    Move the pawn and broadcast the move, the position is written by
+    ``move_buffer`` when the drag is over and every move goes to
+    ``event_log``. Moves don't change the pawn version, ``version`` only
+    checks that the pawn wasn't edited.
+    """
+    # out of turn moves are rejected before reading the pawn
+    await check_turn(
+        session=session,
+        game_set=game_set,
+        user_id=user_id,
+        pawn_name=pawn_name,
+    )
+    pawn = await Pawn.get_by_name_and_game_set_id(
+        session=session,
+        game_set_id=game_set.id,
+        name=pawn_name,
+        options=pawn_load_options({"user": None}, meta=True),
+    )
+    if pawn is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if version is not None and version != pawn.version:
+        move_buffer.overlay([pawn])
+        raise version_conflict(PawnModel.from_orm(pawn))
+    pawn_meta: PawnMeta = pawn.meta
+    x, y = new_position
+    if (
+        x is not None
+        and game_set.map_id is not None
+        and (
+            x > game_set.map_len_x - pawn_meta.size_x
+            or y > game_set.map_len_y - pawn_meta.size_y
+        )
+    ):
+        move_buffer.overlay([pawn])
+        return pawn
+
+    # the pawn isn't flushed, the session only serves the response
+    pawn_meta.x, pawn_meta.y = x, y
+    move_buffer.put(pawn_meta.id, (x, y))
+    event_log.record(game_set.id, pawn.id, BoardEventKind.move, (x, y))
+    board_hub.publish(
+        game_set.id,
+        {"type": "move", "pawn": pawn.name, "x": x, "y": y},
+        audience=None
+        if pawn_meta.visibility
+        else {pawn.user_id, game_set.owner_id},
+    )
+    if drop:
+        await move_buffer.flush([pawn_meta.id])
+    return pawn
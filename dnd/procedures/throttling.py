@@ -0,0 +1,27 @@
+from math import ceil
+
+from fastapi import Depends, HTTPException, Request
+from starlette import status
+
+from dnd.database.schemas.users import User
+from dnd.procedures.auth import check_user
+from dnd.storages.throttling import rate_limiter
+
+
+def rate_limit(name: str, rate: float, burst: int, per_game_set=False):
+    """
+    Dependency limiting the route to ``rate`` requests per second with
+    bursts of ``burst`` per user (and per game set of the path).
+    """
+
+    async def dependency(request: Request, user: User = Depends(check_user)):
+        key = f"{name}:{user.id}"
+        if per_game_set:
+            key += f":{request.path_params['game_set_short_url']}"
+        if not await rate_limiter.take(key=key, rate=rate, capacity=burst):
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(ceil(1 / rate))},
+            )
+
+    return dependency
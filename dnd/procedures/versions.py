@@ -0,0 +1,15 @@
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from starlette import status
+
+
+def version_conflict(current: BaseModel) -> HTTPException:
+    """409 carrying the current state, so the client can merge and retry"""
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "msg": "Version conflict",
+            "current": jsonable_encoder(current),
+        },
+    )
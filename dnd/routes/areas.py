@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dnd.database.db import get_db
+from dnd.database.schemas.pawns import Pawn
+from dnd.database.schemas.users import User
+from dnd.models.area import AreaPawnsModel, AreaRequestModel
+from dnd.procedures.auth import check_user
+from dnd.procedures.game_set import get_member_game_set
+from dnd.storages.board import move_buffer
+from dnd.storages.game_sets import GameSetHeader
+from dnd.utils.geometry import pawns_in_area
+
+router = APIRouter(prefix="/game_set", tags=["game_set"])
+
+
+@router.post("/{game_set_short_url}/area", response_model=AreaPawnsModel)
+async def get_pawns_in_area(
+    query: AreaRequestModel,
+    user: User = Depends(check_user),
+    game_set: GameSetHeader = Depends(get_member_game_set),
+    session: AsyncSession = Depends(get_db),
+) -> AreaPawnsModel:
+    """Pawns with a cell in the area of effect, see ``dnd.utils.geometry``"""
+    # numpy is loaded by the first query, not on startup
+    import numpy as np
+
+    area = query.__root__.area()
+    pawns, positions = [], []
+    for pawn in await Pawn.get_footprints(
+        session=session, game_set_id=game_set.id
+    ):
+        if not (
+            pawn.visibility
+            or user.id == pawn.user_id
+            or user.id == game_set.owner_id
+        ):
+            continue
+        x, y = move_buffer.get(pawn.meta_id) or (pawn.x, pawn.y)
+        if x is None:
+            continue
+        pawns.append(pawn.name)
+        positions.append((x, y, pawn.size_x, pawn.size_y))
+    x, y, size_x, size_y = np.array(positions, dtype=np.int64).reshape(-1, 4).T
+    inside = pawns_in_area(x, y, size_x, size_y, area)
+    return AreaPawnsModel(pawns=[pawns[i] for i in np.flatnonzero(inside)])
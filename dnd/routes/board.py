@@ -0,0 +1,99 @@
+import asyncio
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from pydantic import constr
+
+from dnd.database.db import async_session
+from dnd.models.game_set import BoardMoveEventModel
+from dnd.procedures.auth import get_user_by_token
+from dnd.procedures.pawn import place_pawn
+from dnd.settings import settings
+from dnd.storages.board import board_hub
+from dnd.storages.game_sets import game_set_headers
+from dnd.storages.members import membership
+from dnd.storages.throttling import rate_limiter
+from dnd.utils.crypto import Hasher
+
+router = APIRouter(prefix="/game_set", tags=["game_set"])
+
+
+@router.websocket("/{game_set_short_url}/ws")
+async def board_events(
+    websocket: WebSocket,
+    game_set_short_url: constr(max_length=255),
+    token: str = Query(),
+    hasher: Hasher = Depends(Hasher),
+):
+    """
+    Board events of the game set. Clients send ``{"type": "move", ...}``
+    while dragging pawns and receive moves of the other players.
+    """
+    async with async_session() as session:
+        user = await get_user_by_token(
+            session=session, token=token, hasher=hasher
+        )
+        game_set = await game_set_headers.get(
+            session=session, short_url=game_set_short_url
+        )
+        allowed = (
+            user is not None
+            and game_set is not None
+            and await membership.is_member(
+                session=session, game_set_id=game_set.id, user_id=user.id
+            )
+        )
+    if not allowed:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    with board_hub.subscribe(game_set.id, user.id) as events:
+
+        async def send_events():
+            while (event := await events.get()) is not None:
+                await websocket.send_json(event)
+            # the service is shutting down, clients reconnect to another one
+            await websocket.close(code=status.WS_1012_SERVICE_RESTART)
+
+        sender = asyncio.create_task(send_events())
+        try:
+            while True:
+                try:
+                    move = BoardMoveEventModel.parse_obj(
+                        await websocket.receive_json()
+                    )
+                    if not move.drop and not await rate_limiter.take(
+                        key=f"move:{user.id}:{game_set_short_url}",
+                        rate=settings.RATE_LIMIT_MOVE_RATE,
+                        capacity=settings.RATE_LIMIT_MOVE_BURST,
+                    ):
+                        # skip intermediate positions of a too fast drag
+                        continue
+                    # a short session, the socket may stay open for hours
+                    async with async_session() as session:
+                        await place_pawn(
+                            session=session,
+                            game_set=game_set,
+                            user_id=user.id,
+                            pawn_name=move.pawn,
+                            new_position=move.new_position,
+                            drop=move.drop,
+                            version=move.version,
+                        )
+                except (ValueError, HTTPException) as e:
+                    detail = getattr(e, "detail", None) or str(e)
+                    await websocket.send_json(
+                        {"type": "error", "detail": detail}
+                    )
+        except WebSocketDisconnect:
+            pass
+        finally:
+            sender.cancel()
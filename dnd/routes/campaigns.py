@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from hashids import Hashids
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dnd.database.db import get_db
+from dnd.database.schemas.game_sets import GameSet
+from dnd.database.schemas.users import User
+from dnd.models.game_set import GameSetModel
+from dnd.procedures.auth import check_user
+from dnd.procedures.campaigns import export_campaign, import_campaign
+from dnd.procedures.game_set import get_game_set_header
+from dnd.procedures.throttling import rate_limit
+from dnd.settings import settings
+from dnd.storages.game_sets import GameSetHeader
+from dnd.utils.archive import MEDIA_TYPE, ArchiveError
+from dnd.utils.crypto import get_shortcut
+
+router = APIRouter(prefix="/game_set", tags=["game_set"])
+
+
+@router.post(
+    "/",
+    response_model=GameSetModel,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[
+        Depends(
+            rate_limit(
+                "upload",
+                rate=settings.RATE_LIMIT_UPLOAD_RATE,
+                burst=settings.RATE_LIMIT_UPLOAD_BURST,
+            )
+        )
+    ],
+)
+async def import_game_set(
+    request: Request,
+    user: User = Depends(check_user),
+    session: AsyncSession = Depends(get_db),
+    shortcut: Hashids = Depends(get_shortcut),
+) -> GameSetModel:
+    """Create a game set owned by the user from an exported archive"""
+    try:
+        short_url = await import_campaign(
+            request.stream(),
+            session=session,
+            shortcut=shortcut,
+            owner_id=user.id,
+        )
+    except ArchiveError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e)
+        )
+    await session.commit()
+    # the pawns and members were added bypassing the loaded objects
+    session.expunge_all()
+    game_set = await GameSet.get_by_short_url(
+        session=session, short_url=short_url
+    )
+    return GameSetModel.from_orm(game_set)
+
+
+@router.get(
+    "/{game_set_short_url}/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {MEDIA_TYPE: {}}}},
+)
+async def export_game_set(
+    user: User = Depends(check_user),
+    game_set: GameSetHeader = Depends(get_game_set_header),
+):
+    """The game set with its map, image and pawns as a tar stream"""
+    if user.id != game_set.owner_id:
+        raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED)
+    return StreamingResponse(
+        export_campaign(game_set.short_url),
+        media_type=MEDIA_TYPE,
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="{game_set.short_url}.tar"'
+            )
+        },
+    )
@@ -0,0 +1,101 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dnd.database.db import get_db
+from dnd.database.schemas.dice import DiceRoll, DiceStream
+from dnd.database.schemas.users import User
+from dnd.models.dice import (
+    DiceLogEntryModel,
+    DiceRollModel,
+    DiceRollRequestModel,
+)
+from dnd.procedures.auth import check_user
+from dnd.procedures.game_set import get_member_game_set
+from dnd.procedures.throttling import rate_limit
+from dnd.settings import settings
+from dnd.storages.board import board_hub
+from dnd.storages.dice import dice_roller
+from dnd.storages.game_sets import GameSetHeader
+from dnd.utils.dice import parse, roll, stream
+
+router = APIRouter(prefix="/game_set", tags=["game_set"])
+
+
+@router.post(
+    "/{game_set_short_url}/dice",
+    response_model=DiceRollModel,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[
+        Depends(
+            rate_limit(
+                "dice",
+                rate=settings.RATE_LIMIT_DICE_RATE,
+                burst=settings.RATE_LIMIT_DICE_BURST,
+                per_game_set=True,
+            )
+        )
+    ],
+)
+async def roll_dice(
+    dice: DiceRollRequestModel,
+    user: User = Depends(check_user),
+    game_set: GameSetHeader = Depends(get_member_game_set),
+    session: AsyncSession = Depends(get_db),
+) -> DiceRollModel:
+    """Roll for the game set, the members get the result on the websocket"""
+    index, result = await dice_roller.roll(
+        game_set.id, user.id, parse(dice.expression)
+    )
+    res = DiceRollModel(
+        index=index,
+        user=user.username,
+        expression=dice.expression,
+        total=result.total,
+        rolls=result.rolls,
+    )
+    board_hub.publish(game_set.id, {"type": "roll", **res.dict()})
+    return res
+
+
+@router.get(
+    "/{game_set_short_url}/dice", response_model=list[DiceLogEntryModel]
+)
+async def get_dice_log(
+    before: int | None = Query(None, description="Rolls before the index"),
+    limit: int = Query(50, ge=1, le=500),
+    user: User = Depends(check_user),
+    game_set: GameSetHeader = Depends(get_member_game_set),
+    session: AsyncSession = Depends(get_db),
+) -> list[DiceLogEntryModel]:
+    await dice_roller.flush()
+    rows = await DiceRoll.get_page(
+        session=session, game_set_id=game_set.id, before=before, limit=limit
+    )
+    return [DiceLogEntryModel.from_orm(x) for x in rows]
+
+
+@router.get("/{game_set_short_url}/dice/{index}", response_model=DiceRollModel)
+async def replay_dice_roll(
+    index: int,
+    user: User = Depends(check_user),
+    game_set: GameSetHeader = Depends(get_member_game_set),
+    session: AsyncSession = Depends(get_db),
+) -> DiceRollModel:
+    """The logged roll drawn again from its stream, for audits"""
+    await dice_roller.flush()
+    logged = await DiceRoll.get_by_index(
+        session=session, game_set_id=game_set.id, index=index
+    )
+    if logged is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    seed = await DiceStream.get_seed(session=session, game_set_id=game_set.id)
+    if seed is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    result = roll(parse(logged.expression), stream(seed, index))
+    return DiceRollModel(
+        index=index,
+        user=logged.username,
+        expression=logged.expression,
+        total=result.total,
+        rolls=result.rolls,
+    )
@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
 from hashids import Hashids
+from pydantic import constr
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
 from dnd.database.db import get_db
 from dnd.database.schemas.game_sets import GameSet, GameSetMeta
@@ -13,8 +16,26 @@ from dnd.models.game_set import (
     UpdateGameSetRequestModel,
 )
 from dnd.procedures.auth import check_user
-from dnd.procedures.game_set import get_current_game_set
+from dnd.procedures.board import (
+    VARY_ACCEPT,
+    BoardResponse,
+    get_board_encoding,
+)
+from dnd.procedures.game_set import (
+    game_set_load_options,
+    get_current_game_set,
+    get_fields,
+    get_game_set_header,
+)
+from dnd.procedures.versions import version_conflict
+from dnd.storages.board import move_buffer
+from dnd.storages.dice import dice_roller
+from dnd.storages.game_sets import GameSetHeader, game_set_headers
+from dnd.storages.history import event_log
+from dnd.storages.initiative import initiative
+from dnd.storages.members import membership
 from dnd.utils.crypto import get_shortcut
+from dnd.utils.projection import FieldsTree, project_model, selects
 
 router = APIRouter(prefix="/game_set", tags=["game_set"])
 
@@ -69,60 +90,92 @@ async def update_game_set(
     game_set: GameSet = Depends(get_current_game_set),
     session: AsyncSession = Depends(get_db),
 ) -> GameSetModel:
-    if user.id == game_set.owner.id:
-        if data := game_set_data.dict(exclude_unset=True):
-            if new_name := data.get("name"):
-                await GameSet.update(
-                    session=session, id=game_set.id, name=new_name
-                )
-                data.pop("name")
-            new_map_name = data.get("map_name", False)
-            if new_map_name or new_map_name is None:
-                data.pop("map_name")
-            if isinstance(new_map_name, str):
-                new_map = await Map.get_by_name_and_user_id(
-                    session=session,
-                    user_id=user.id,
-                    name=new_map_name,
-                )
-                if not new_map:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail="Map not found",
-                    )
-                data["map_id"], data["map"] = new_map.id, new_map
-            elif new_map_name is None:
-                data["map_id"] = data["map"] = None
-            updated_meta = await GameSetMeta.update(
-                session=session,
-                id=game_set.meta.id,
-                **{x: data[x] for x in data if x != "map"},
-            )
-            updated_meta.map = data["map"]
-            game_set.meta = updated_meta
-
+    if user.id != game_set.owner_id:
+        raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED)
+    data = game_set_data.dict(exclude_unset=True)
+    version = data.pop("version", None)
+    if version is not None and version != game_set.version:
+        raise version_conflict(GameSetModel.from_orm(game_set))
+    if not data:
         return GameSetModel.from_orm(game_set)
-    raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    new_map = None
+    if new_map_name := data.get("map_name"):
+        new_map = await Map.get_by_name_and_user_id(
+            session=session, user_id=user.id, name=new_map_name
+        )
+        if not new_map:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Map not found",
+            )
+    new_version = await GameSet.update(
+        session=session,
+        id=game_set.id,
+        name=data.get("name"),
+        version=game_set.version,
+    )
+    if new_version is None:
+        # changed after it was read by this request
+        await session.refresh(game_set)
+        raise version_conflict(GameSetModel.from_orm(game_set))
+    # the rows are written already, only update the loaded objects
+    set_committed_value(game_set, "version", new_version)
+    if data.get("name"):
+        set_committed_value(game_set, "name", data["name"])
+    if "map_name" in data:
+        map_id = new_map.id if new_map else None
+        await GameSetMeta.update(
+            session=session, id=game_set.meta.id, map_id=map_id
+        )
+        set_committed_value(game_set.meta, "map_id", map_id)
+        set_committed_value(game_set.meta, "map", new_map)
+    await session.commit()
+    game_set_headers.forget(game_set.id)
+    return GameSetModel.from_orm(game_set)
 
 
 @router.get("/{game_set_short_url}/", response_model=GameSetModel)
 async def get_game_set(
+    game_set_short_url: constr(max_length=255),
+    fields: FieldsTree | None = Depends(get_fields(GameSetModel)),
+    packed: bool = Depends(get_board_encoding),
     user: User = Depends(check_user),
-    game_set: GameSet = Depends(get_current_game_set),
+    session: AsyncSession = Depends(get_db),
 ):
-    if (
-        user.id in [user.user_id for user in game_set.users_in_game]
-        or user.id == game_set.owner.id
+    if packed:
+        # the binary snapshot has a fixed layout
+        fields = None
+    game_set = await GameSet.get_by_short_url(
+        session=session,
+        short_url=game_set_short_url,
+        options=game_set_load_options(fields) if fields else (),
+    )
+    if game_set:
+        membership.load(game_set)
+    if game_set and (
+        user.id == game_set.owner_id
+        or await membership.is_member(
+            session=session, game_set_id=game_set.id, user_id=user.id
+        )
     ):
-        res: GameSetModel = GameSetModel.from_orm(game_set)
-        if user.id == game_set.owner.id:
+        if selects(fields, "pawns"):
+            move_buffer.overlay(game_set.pawns)
+        if fields is None:
+            res: GameSetModel = GameSetModel.from_orm(game_set)
+        else:
+            res = project_model(GameSetModel, fields).from_orm(game_set)
+        if user.id != game_set.owner_id and "pawns" in res.__fields__:
+            res.pawns = [
+                pawn
+                for pawn, orm_pawn in zip(res.pawns, game_set.pawns)
+                if orm_pawn.user_id == user.id or orm_pawn.meta.visibility
+            ]
+        if packed:
+            return BoardResponse(res)
+        if fields is None:
             return res
-        res.pawns = [
-            pawn
-            for pawn in res.pawns
-            if pawn.user.username == user.username or pawn.meta.visibility
-        ]
-        return res
+        return JSONResponse(jsonable_encoder(res), headers=VARY_ACCEPT)
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
         detail="GameSet not found",
@@ -140,19 +193,21 @@ async def get_game_set(
 )
 async def join_to_game(
     user: User = Depends(check_user),
-    game_set: GameSet = Depends(get_current_game_set),
+    game_set: GameSetHeader = Depends(get_game_set_header),
     session: AsyncSession = Depends(get_db),
 ):
-    if user.id == game_set.owner.id:
+    if user.id == game_set.owner_id:
         raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE)
-    elif user.id in [user.user_id for user in game_set.users_in_game]:
+    elif await membership.is_member(
+        session=session, game_set_id=game_set.id, user_id=user.id
+    ):
         raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED)
     user_in_game = await UserInGameset.create(
         session=session, user_id=user.id, game_set_id=game_set.id
     )
     user.in_games.append(user_in_game)
-    game_set.users_in_game.append(user_in_game)
     await session.commit()
+    membership.add(game_set_id=game_set.id, user_id=user.id)
     return Response(status_code=202, content="accepted")
 
 
@@ -163,7 +218,14 @@ async def delete_game_set(
     session: AsyncSession = Depends(get_db),
 ):
     if user.id == game_set.owner.id:
+        meta_ids = [x.meta.id for x in game_set.pawns if x.meta]
         await session.delete(game_set)
         await session.commit()
+        move_buffer.discard(meta_ids)
+        membership.forget(game_set.id)
+        game_set_headers.forget(game_set.id)
+        initiative.forget(game_set.id)
+        await event_log.forget(game_set.id)
+        await dice_roller.forget(game_set.id)
         return Response(status_code=status.HTTP_200_OK)
     raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED)
@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.responses import JSONResponse
 
 from dnd.database.db import get_db
+from dnd.lifecycle import shutdown
 
 router = APIRouter(prefix="/health", tags=["health"])
 
@@ -59,4 +60,8 @@ async def is_database_online(session: AsyncSession = Depends(get_db)):
     return {"is_database_online": "OK"} if res == 1 else False
 
 
-router.add_api_route("", health([is_database_online]))
+async def is_serving():
+    return False if shutdown.draining else {"is_serving": "OK"}
+
+
+router.add_api_route("", health([is_serving, is_database_online]))
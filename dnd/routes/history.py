@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dnd.database.db import get_db
+from dnd.database.schemas.pawns import Pawn
+from dnd.database.schemas.users import User
+from dnd.models.game_set import BoardHistoryModel, BoardHistoryPawnModel
+from dnd.procedures.auth import check_user
+from dnd.procedures.game_set import get_member_game_set
+from dnd.storages.game_sets import GameSetHeader
+from dnd.storages.history import event_log
+
+router = APIRouter(prefix="/game_set", tags=["game_set"])
+
+
+@router.get("/{game_set_short_url}/history", response_model=BoardHistoryModel)
+async def get_board_history(
+    at: int | None = Query(None, ge=0, description="Event id, the last one"),
+    user: User = Depends(check_user),
+    game_set: GameSetHeader = Depends(get_member_game_set),
+    session: AsyncSession = Depends(get_db),
+) -> BoardHistoryModel:
+    """The board replayed up to the event ``at``, see ``EventLog``"""
+    event_id, positions = await event_log.replay(
+        session=session, game_set_id=game_set.id, at=at
+    )
+    pawns = []
+    for pawn in await Pawn.get_labels(
+        session=session, game_set_id=game_set.id
+    ):
+        if pawn.id not in positions:
+            continue
+        if not (
+            pawn.visibility
+            or user.id == pawn.user_id
+            or user.id == game_set.owner_id
+        ):
+            continue
+        x, y = positions[pawn.id]
+        pawns.append(BoardHistoryPawnModel(name=pawn.name, x=x, y=y))
+    return BoardHistoryModel(event_id=event_id, pawns=pawns)
@@ -0,0 +1,114 @@
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dnd.database.db import get_db
+from dnd.database.schemas.pawns import Pawn
+from dnd.database.schemas.users import User
+from dnd.models.game_set import (
+    InitiativeEntryModel,
+    InitiativeModel,
+    StartInitiativeRequestModel,
+)
+from dnd.procedures.auth import check_user
+from dnd.procedures.game_set import (
+    get_game_set_header,
+    get_member_game_set,
+)
+from dnd.storages.game_sets import GameSetHeader
+from dnd.storages.initiative import Combatant, Encounter, initiative
+
+router = APIRouter(prefix="/game_set", tags=["game_set"])
+
+
+def _initiative_model(encounter: Encounter) -> InitiativeModel:
+    return InitiativeModel(
+        round=encounter.round,
+        turn_seconds=encounter.turn_seconds,
+        deadline=encounter.deadline,
+        active=encounter.active.name,
+        pawns=[
+            InitiativeEntryModel(pawn=x.name, initiative=x.initiative)
+            for x in encounter.combatants
+        ],
+    )
+
+
+@router.get("/{game_set_short_url}/initiative", response_model=InitiativeModel)
+async def get_initiative(
+    game_set: GameSetHeader = Depends(get_member_game_set),
+    session: AsyncSession = Depends(get_db),
+) -> InitiativeModel:
+    encounter = await initiative.get(session=session, game_set_id=game_set.id)
+    if encounter is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return _initiative_model(encounter)
+
+
+@router.put(
+    "/{game_set_short_url}/initiative",
+    response_model=InitiativeModel,
+    status_code=status.HTTP_201_CREATED,
+)
+async def start_initiative(
+    order: StartInitiativeRequestModel,
+    user: User = Depends(check_user),
+    game_set: GameSetHeader = Depends(get_game_set_header),
+    session: AsyncSession = Depends(get_db),
+) -> InitiativeModel:
+    """Start an encounter, only the active pawn moves till it's over"""
+    if user.id != game_set.owner_id:
+        raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED)
+    pawns = {
+        x.name: x
+        for x in await Pawn.get_labels(
+            session=session, game_set_id=game_set.id
+        )
+    }
+    combatants = {}
+    for entry in order.pawns:
+        if (pawn := pawns.get(entry.pawn)) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Pawn {entry.pawn} not found",
+            )
+        combatants[pawn.id] = Combatant(
+            pawn_id=pawn.id,
+            name=pawn.name,
+            user_id=pawn.user_id,
+            initiative=entry.initiative,
+        )
+    encounter = initiative.start(
+        game_set.id, combatants.values(), turn_seconds=order.turn_seconds
+    )
+    return _initiative_model(encounter)
+
+
+@router.post(
+    "/{game_set_short_url}/initiative/next", response_model=InitiativeModel
+)
+async def next_turn(
+    user: User = Depends(check_user),
+    game_set: GameSetHeader = Depends(get_game_set_header),
+    session: AsyncSession = Depends(get_db),
+) -> InitiativeModel:
+    """End the turn, by the owner of the game set or of the active pawn"""
+    encounter = await initiative.get(session=session, game_set_id=game_set.id)
+    if encounter is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if user.id not in (game_set.owner_id, encounter.active.user_id):
+        raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED)
+    return _initiative_model(initiative.advance(game_set.id))
+
+
+@router.delete("/{game_set_short_url}/initiative")
+async def end_initiative(
+    user: User = Depends(check_user),
+    game_set: GameSetHeader = Depends(get_game_set_header),
+    session: AsyncSession = Depends(get_db),
+):
+    if user.id != game_set.owner_id:
+        raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED)
+    if await initiative.get(session=session, game_set_id=game_set.id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    initiative.end(game_set.id)
+    return Response(status_code=status.HTTP_200_OK)
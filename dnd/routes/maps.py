@@ -1,11 +1,10 @@
-from pathlib import Path
-
 from fastapi import (
     APIRouter,
     Depends,
     File,
     Form,
     HTTPException,
+    Request,
     Response,
     UploadFile,
 )
@@ -19,17 +18,29 @@ from dnd.database.schemas.maps import Map, MapMeta
 from dnd.database.schemas.users import User
 from dnd.models.map import MapModel
 from dnd.procedures.auth import check_user
-from dnd.procedures.maps import save_image
-from dnd.storages.images import images
+from dnd.procedures.maps import UploadRoute, release_image, save_image
+from dnd.procedures.throttling import rate_limit
+from dnd.settings import settings
+from dnd.storages.game_sets import game_set_headers
+from dnd.storages.images import image_backend, image_formats
 from dnd.utils.crypto import get_shortcut
 
-router = APIRouter(prefix="/map", tags=["map"])
+router = APIRouter(prefix="/map", tags=["map"], route_class=UploadRoute)
 
 
 @router.put(
     "/{map_name}/",
     response_model=MapModel,
     status_code=201,
+    dependencies=[
+        Depends(
+            rate_limit(
+                "upload",
+                rate=settings.RATE_LIMIT_UPLOAD_RATE,
+                burst=settings.RATE_LIMIT_UPLOAD_BURST,
+            )
+        )
+    ],
 )
 async def create_map(
     map_name: str,
@@ -51,16 +62,20 @@ async def create_map(
         user_id=user.id,
         name=map_name,
     )
-    short_url = None
+    saved = None
     if image:
-        short_url = await save_image(image=image, shortcut=shortcut)
+        saved = await save_image(
+            image=image, shortcut=shortcut, session=session
+        )
 
     new_map_meta = await MapMeta.create(
         session=session,
         len_x=len_x,
         len_y=len_y,
         map_id=new_map.id,
-        image_short_url=short_url,
+        image_short_url=saved.short_url if saved else None,
+        image_width=saved.width if saved else None,
+        image_height=saved.height if saved else None,
     )
     new_map.meta = new_map_meta
     await session.commit()
@@ -71,6 +86,15 @@ async def create_map(
     "/{map_name}/",
     response_model=MapModel,
     status_code=201,
+    dependencies=[
+        Depends(
+            rate_limit(
+                "upload",
+                rate=settings.RATE_LIMIT_UPLOAD_RATE,
+                burst=settings.RATE_LIMIT_UPLOAD_BURST,
+            )
+        )
+    ],
 )
 async def update_map(
     map_name: str,
@@ -97,19 +121,26 @@ async def update_map(
         id=current_map.id,
         name=new_map_name or map_name,
     )
-    short_url = None
+    meta = current_map.meta
+    saved = None
     if image:
-        short_url = await save_image(image=image, shortcut=shortcut)
+        saved = await save_image(
+            image=image, shortcut=shortcut, session=session
+        )
+        await release_image(session=session, short_url=meta.image_short_url)
 
     await MapMeta.update(
         session=session,
-        id=current_map.meta.id,
-        len_x=len_x or current_map.meta.len_x,
-        len_y=len_y or current_map.meta.len_y,
-        image_short_url=short_url or current_map.meta.image_short_url,
+        id=meta.id,
+        len_x=len_x or meta.len_x,
+        len_y=len_y or meta.len_y,
+        image_short_url=saved.short_url if saved else meta.image_short_url,
+        image_width=saved.width if saved else meta.image_width,
+        image_height=saved.height if saved else meta.image_height,
     )
     await session.flush()
     await session.commit()
+    game_set_headers.forget_map(current_map.id)
     return MapModel.from_orm(current_map)
 
 
@@ -123,23 +154,22 @@ async def remove_map(
         session=session, name=map_name, user_id=user.id
     )
     if map:
+        await release_image(
+            session=session, short_url=map.meta.image_short_url
+        )
         await session.delete(map)
         await session.commit()
+        game_set_headers.forget_map(map.id)
         return Response(status_code=status.HTTP_200_OK)
     raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED)
 
 
 @router.get("/images/{image_short_url}/")
 async def get_map_image(
+    request: Request,
     image_short_url: constr(max_length=255),
     user: User = Depends(check_user),
 ):
-    path = Path(images.directory) / image_short_url
-    if path.exists() and user:
-        return Response(
-            path.read_bytes(),
-            status_code=200,
-            media_type="image/jpg",
-        )
-    else:
-        return Response(status_code=404)
+    return await image_formats.response(
+        image_backend, image_short_url, request.scope
+    )
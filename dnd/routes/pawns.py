@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from pydantic import constr
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from dnd.database.db import get_db
-from dnd.database.schemas.game_sets import GameSet
-from dnd.database.schemas.maps import MapMeta
+from dnd.database.schemas.history import BoardEventKind
 from dnd.database.schemas.pawns import Pawn, PawnMeta
 from dnd.database.schemas.users import User
 from dnd.models.pawn import (
@@ -14,7 +16,25 @@ from dnd.models.pawn import (
     UpdatePawnMetaRequestModel,
 )
 from dnd.procedures.auth import check_user
-from dnd.procedures.game_set import get_current_game_set
+from dnd.procedures.board import (
+    VARY_ACCEPT,
+    BoardResponse,
+    get_board_encoding,
+)
+from dnd.procedures.game_set import (
+    get_fields,
+    get_game_set_header,
+    get_member_game_set,
+)
+from dnd.procedures.pawn import check_turn, pawn_load_options, place_pawn
+from dnd.procedures.throttling import rate_limit
+from dnd.procedures.versions import version_conflict
+from dnd.settings import settings
+from dnd.storages.board import move_buffer
+from dnd.storages.game_sets import GameSetHeader
+from dnd.storages.history import event_log
+from dnd.storages.initiative import initiative
+from dnd.utils.projection import FieldsTree, project_model
 
 router = APIRouter(prefix="/pawn", tags=["pawn"])
 
@@ -26,15 +46,36 @@ router = APIRouter(prefix="/pawn", tags=["pawn"])
 )
 async def get_pawn(
     pawn_name: constr(max_length=30),
-    game_set: GameSet = Depends(get_current_game_set),
-    _: User = Depends(check_user),
+    fields: FieldsTree | None = Depends(get_fields(PawnModel)),
+    packed: bool = Depends(get_board_encoding),
+    game_set: GameSetHeader = Depends(get_member_game_set),
+    user: User = Depends(check_user),
     session: AsyncSession = Depends(get_db),
 ):
+    if packed:
+        fields = None
     pawn = await Pawn.get_by_name_and_game_set_id(
-        session=session, game_set_id=game_set.id, name=pawn_name
+        session=session,
+        game_set_id=game_set.id,
+        name=pawn_name,
+        options=pawn_load_options(fields, meta=True) if fields else (),
     )
-    if not pawn:
+    # hidden pawns are seen by the owners of the game set and of the pawn
+    if not pawn or not (
+        pawn.meta.visibility
+        or user.id == pawn.user_id
+        or user.id == game_set.owner_id
+    ):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    move_buffer.overlay([pawn])
+    if packed:
+        return BoardResponse([PawnModel.from_orm(pawn)])
+    if fields is None:
+        return PawnModel.from_orm(pawn)
+    return JSONResponse(
+        jsonable_encoder(project_model(PawnModel, fields).from_orm(pawn)),
+        headers=VARY_ACCEPT,
+    )
 
 
 @router.put(
@@ -45,11 +86,12 @@ async def get_pawn(
 async def create_pawn(
     pawn_name: constr(max_length=30),
     pawn_meta: PawnMetaRequestModel,
-    game_set: GameSet = Depends(get_current_game_set),
+    packed: bool = Depends(get_board_encoding),
+    game_set: GameSetHeader = Depends(get_game_set_header),
     user: User = Depends(check_user),
     session: AsyncSession = Depends(get_db),
 ):
-    visibility = False if user.id == game_set.owner.id else True
+    visibility = False if user.id == game_set.owner_id else True
     exist_pawn = await Pawn.get_by_name_and_game_set_id(
         session=session, game_set_id=game_set.id, name=pawn_name
     )
@@ -72,6 +114,11 @@ async def create_pawn(
     new_pawn.meta = new_pawn_meta
     new_pawn.user = user
     await session.commit()
+    event_log.record(
+        game_set.id, new_pawn.id, BoardEventKind.add, pawn_meta.position
+    )
+    if packed:
+        return BoardResponse([PawnModel.from_orm(new_pawn)], status_code=201)
     return PawnModel.from_orm(new_pawn)
 
 
@@ -83,31 +130,66 @@ async def update_pawn(
     pawn_name: constr(max_length=30),
     pawn_meta: UpdatePawnMetaRequestModel,
     pawn_new_name: str | None = Query(max_length=30),
-    game_set: GameSet = Depends(get_current_game_set),
+    packed: bool = Depends(get_board_encoding),
+    game_set: GameSetHeader = Depends(get_game_set_header),
     user: User = Depends(check_user),
     session: AsyncSession = Depends(get_db),
 ) -> PawnModel:
-    if pawn_new_name:
-        exist_pawn = await Pawn.get_by_name_and_game_set_id(
-            session=session, game_set_id=game_set.id, name=pawn_new_name
+    data = pawn_meta.dict(exclude_unset=True)
+    version = data.pop("version", None)
+    if data.get("color") is not None:
+        data["color"] = pawn_meta.color.as_hex()
+    if "position" in data:
+        await check_turn(
+            session=session,
+            game_set=game_set,
+            user_id=user.id,
+            pawn_name=pawn_name,
         )
-        if exist_pawn:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT)
-
-    pawn = await Pawn.get_by_name_and_game_set_id(
-        session=session, game_set_id=game_set.id, name=pawn_name
-    )
-    if not (user.id == pawn.user_id or user.id == game_set.owner.id):
-        raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED)
+    try:
+        # the version check replaces the read of the pawn
+        pawn_id = await Pawn.update(
+            session=session,
+            game_set_id=game_set.id,
+            name=pawn_name,
+            new_name=pawn_new_name,
+            version=version,
+            user_id=None if user.id == game_set.owner_id else user.id,
+        )
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT)
+    if pawn_id is None:
+        pawn = await Pawn.get_by_name_and_game_set_id(
+            session=session, game_set_id=game_set.id, name=pawn_name
+        )
+        if pawn is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        if not (user.id == pawn.user_id or user.id == game_set.owner_id):
+            raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED)
+        move_buffer.overlay([pawn])
+        raise version_conflict(PawnModel.from_orm(pawn))
 
+    await PawnMeta.update(session=session, pawn_id=pawn_id, **data)
+    await session.commit()
     if pawn_new_name:
-        await Pawn.update(session=session, id=pawn.id, name=pawn_new_name)
-    await PawnMeta.update(
-        session=session, id=pawn.meta.id, **pawn_meta.dict(exclude_unset=True)
+        initiative.rename_pawn(game_set.id, pawn_id, pawn_new_name)
+    if "position" in data:
+        event_log.record(
+            game_set.id, pawn_id, BoardEventKind.move, data["position"]
+        )
+    pawn = await Pawn.get_by_name_and_game_set_id(
+        session=session,
+        game_set_id=game_set.id,
+        name=pawn_new_name or pawn_name,
     )
-
-    await session.flush()
-    await session.commit()
+    if "position" not in data:
+        move_buffer.overlay([pawn])
+    elif pawn.meta and move_buffer.get(pawn.meta.id) is not None:
+        # the patch replaces a pending drag, it'd be written over it later
+        move_buffer.put(pawn.meta.id, data["position"])
+    if packed:
+        return BoardResponse([PawnModel.from_orm(pawn)])
     return PawnModel.from_orm(pawn)
 
 
@@ -115,27 +197,36 @@ async def update_pawn(
     "/{game_set_short_url}/{pawn_name}",
     response_model=PawnModel,
     status_code=201,
+    dependencies=[
+        Depends(
+            rate_limit(
+                "move",
+                rate=settings.RATE_LIMIT_MOVE_RATE,
+                burst=settings.RATE_LIMIT_MOVE_BURST,
+                per_game_set=True,
+            )
+        )
+    ],
 )
 async def move_pawn(
     pawn_name: constr(max_length=30),
     pawn_move: PawnMoveModel,
-    game_set: GameSet = Depends(get_current_game_set),
-    _: User = Depends(check_user),
+    packed: bool = Depends(get_board_encoding),
+    game_set: GameSetHeader = Depends(get_game_set_header),
+    user: User = Depends(check_user),
     session: AsyncSession = Depends(get_db),
 ):
-    new_position = pawn_move.new_position
-    map_meta: MapMeta = game_set.meta.map.meta
-
-    pawn = await Pawn.get_by_name_and_game_set_id(
-        session=session, game_set_id=game_set.id, name=pawn_name
+    pawn = await place_pawn(
+        session=session,
+        game_set=game_set,
+        user_id=user.id,
+        pawn_name=pawn_name,
+        new_position=pawn_move.new_position,
+        drop=pawn_move.drop,
+        version=pawn_move.version,
     )
-    pawn_meta: PawnMeta = pawn.meta
-
-    if new_position[0] <= (map_meta.len_x - pawn_meta.size_x) and new_position[
-        1
-    ] <= (map_meta.len_y - pawn_meta.size_y):
-        pawn.meta.position = new_position
-        await session.commit()
+    if packed:
+        return BoardResponse([PawnModel.from_orm(pawn)], status_code=201)
     return PawnModel.from_orm(pawn)
 
 
@@ -145,7 +236,8 @@ async def move_pawn(
 )
 async def delete_pawn(
     pawn_name: constr(max_length=30),
-    game_set: GameSet = Depends(get_current_game_set),
+    packed: bool = Depends(get_board_encoding),
+    game_set: GameSetHeader = Depends(get_game_set_header),
     user: User = Depends(check_user),
     session: AsyncSession = Depends(get_db),
 ):
@@ -153,10 +245,17 @@ async def delete_pawn(
         session=session, game_set_id=game_set.id, name=pawn_name
     )
     if pawn:
-        if not (user.id == pawn.user_id or user.id == game_set.owner.id):
+        if not (user.id == pawn.user_id or user.id == game_set.owner_id):
             raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED)
+        meta_id = pawn.meta.id if pawn.meta else None
         await session.delete(pawn)
         await session.commit()
+        if meta_id is not None:
+            move_buffer.discard([meta_id])
+        event_log.record(game_set.id, pawn.id, BoardEventKind.remove)
+        initiative.remove_pawn(game_set.id, pawn.id)
 
+        if packed:
+            return BoardResponse([PawnModel.from_orm(pawn)])
         return PawnModel.from_orm(pawn)
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,136 @@
+"""
+Hypercorn configuration of a worker from the ``SERVER_*`` settings.
+
+Profiles: ``http1``, ``http2`` (h2 over TLS, h2c without it) and
+``http3`` (``http2`` plus QUIC on ``BIND``, needs TLS and one worker).
+"""
+import logging
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from hypercorn.config import Config
+
+from dnd.settings import settings
+from dnd.utils.sharding import Shard
+
+logger = logging.getLogger(__name__)
+
+ALPN_PROTOCOLS = {
+    "http1": ["http/1.1"],
+    "http2": ["h2", "http/1.1"],
+    "http3": ["h2", "http/1.1"],
+}
+
+
+def shard_bind(index: int) -> str:
+    host = settings.BIND.rsplit(":", 1)[0]
+    return f"{host}:{settings.SHARD_PORT + index}"
+
+
+def reuse_port(bind: str) -> str:
+    """
+    Bind a socket shared by the workers, the kernel balances connections
+    between them. Returns the hypercorn bind of the socket.
+    """
+    host, port = bind.rsplit(":", 1)
+    host = host.strip("[]")
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, int(port)))
+    # hypercorn owns the descriptor from now on
+    return f"fd://{sock.detach()}"
+
+
+def self_signed_certificate(directory: Path) -> tuple[Path, Path]:
+    """Certificate for localhost, created once, for local TLS and QUIC"""
+    certfile, keyfile = directory / "cert.pem", directory / "key.pem"
+    if certfile.exists() and keyfile.exists():
+        return certfile, keyfile
+
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=365))
+        .add_extension(
+            x509.SubjectAlternativeName([x509.DNSName("localhost")]),
+            critical=False,
+        )
+        .sign(key, hashes.SHA256())
+    )
+    directory.mkdir(parents=True, exist_ok=True)
+    for path, content in (
+        (
+            keyfile,
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            ),
+        ),
+        (certfile, cert.public_bytes(serialization.Encoding.PEM)),
+    ):
+        # workers may read the files while they are written
+        temporary = path.with_suffix(".tmp")
+        temporary.write_bytes(content)
+        os.replace(temporary, path)
+    logger.warning(f"Created a self-signed certificate in {directory}")
+    return certfile, keyfile
+
+
+def tls_files() -> tuple[Path, Path] | None:
+    if settings.SERVER_CERTFILE and settings.SERVER_KEYFILE:
+        return settings.SERVER_CERTFILE, settings.SERVER_KEYFILE
+    if settings.SERVER_SELF_SIGNED:
+        return self_signed_certificate(settings.SERVER_SELF_SIGNED_DIR)
+    if settings.SERVER_PROFILE == "http3":
+        raise ValueError(
+            "HTTP/3 needs SERVER_CERTFILE and SERVER_KEYFILE "
+            "or SERVER_SELF_SIGNED"
+        )
+    return None
+
+
+def server_config(shard: Shard) -> Config:
+    config = Config()
+    config.debug = settings.DEBUG
+    config.accesslog = logger
+    config.graceful_timeout = settings.SHUTDOWN_GRACEFUL_TIMEOUT
+    config.bind = [settings.BIND]
+    if shard.count > 1:
+        config.bind = [reuse_port(settings.BIND), shard_bind(shard.index)]
+
+    config.backlog = settings.SERVER_BACKLOG
+    config.keep_alive_timeout = settings.SERVER_KEEP_ALIVE_TIMEOUT
+    config.websocket_ping_interval = settings.SERVER_WEBSOCKET_PING_INTERVAL
+    config.alpn_protocols = ALPN_PROTOCOLS[settings.SERVER_PROFILE]
+    config.h2_max_concurrent_streams = settings.SERVER_H2_MAX_STREAMS
+    config.h2_max_inbound_frame_size = settings.SERVER_H2_MAX_FRAME_SIZE
+
+    if files := tls_files():
+        config.certfile, config.keyfile = map(str, files)
+    if settings.SERVER_PROFILE == "http3":
+        if shard.count == 1:
+            # the same port over UDP, advertised by Alt-Svc
+            config.quic_bind = [settings.BIND]
+        else:
+            # packets of a connection would be spread between the workers
+            logger.warning(
+                "QUIC is disabled with several workers, terminate HTTP/3 "
+                "at the proxy"
+            )
+    return config
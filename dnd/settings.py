@@ -1,9 +1,8 @@
-import logging.config
+from functools import cache
 from pathlib import Path
+from typing import Literal
 
-import yaml
 from pydantic import BaseSettings, validator
-from sqlalchemy.engine import make_url
 
 from dnd.utils.types import AsyncPostgresDsn
 
@@ -12,11 +11,39 @@ class Settings(BaseSettings):
     # SERVICE
     BIND: str = "0.0.0.0:8080"
     DEBUG: bool = False
+    # processes, 0 runs one per core. Game sets are sharded between them:
+    # the worker N also listens on SHARD_PORT + N for its game sets
     WORKERS: int = 1
+    SHARD_PORT: int = 8100
+
+    # server, see dnd.server for the profiles. TLS uses SERVER_CERTFILE and
+    # SERVER_KEYFILE or a self-signed certificate for local use
+    SERVER_PROFILE: Literal["http1", "http2", "http3"] = "http2"
+    SERVER_LOOP: Literal["asyncio", "uvloop"] = "asyncio"
+    SERVER_BACKLOG: int = 1024
+    # mobile clients reconnect less with longer keep-alive and pings
+    SERVER_KEEP_ALIVE_TIMEOUT: float = 30.0
+    SERVER_WEBSOCKET_PING_INTERVAL: float | None = 20.0
+    SERVER_H2_MAX_STREAMS: int = 128
+    SERVER_H2_MAX_FRAME_SIZE: int = 64 * 1024
+    SERVER_CERTFILE: Path | None = None
+    SERVER_KEYFILE: Path | None = None
+    SERVER_SELF_SIGNED: bool = False
+    SERVER_SELF_SIGNED_DIR: Path = Path("./tmp/certs")
     ROOT_PATH: str = "/api/v1"
 
     # DB
     DB_URL: AsyncPostgresDsn
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+
+    # lifecycle, the pool is opened and the boards of the most active game
+    # sets are read on startup. On SIGTERM health checks fail for
+    # SHUTDOWN_DRAIN_DELAY, then in-flight requests get
+    # SHUTDOWN_GRACEFUL_TIMEOUT to finish before the state is flushed
+    WARM_UP_GAME_SETS: int = 50
+    SHUTDOWN_DRAIN_DELAY: float = 0.0
+    SHUTDOWN_GRACEFUL_TIMEOUT: float = 30.0
 
     # JWT
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 10000
@@ -31,19 +58,107 @@ class Settings(BaseSettings):
     # storages
     IMAGE_DIR: Path = Path("./tmp/maps")
     GLOSSARY_DIR: Path = Path("./glossary")
+    IMAGE_GC_DELAY: float = 60.0 * 60
+    IMAGE_GC_GRACE: float = 60.0 * 60
+    IMAGE_BACKEND: Literal["local", "s3"] = "local"
+    IMAGE_URL_EXPIRE_SECONDS: int = 60 * 60
+    # internal nginx location of IMAGE_DIR for the local backend
+    IMAGE_ACCEL_REDIRECT: str | None = None
+    IMAGE_S3_ENDPOINT: str = "http://localhost:9000"
+    IMAGE_S3_PUBLIC_ENDPOINT: str | None = None
+    IMAGE_S3_BUCKET: str = "maps"
+    IMAGE_S3_REGION: str = "us-east-1"
+    IMAGE_S3_ACCESS_KEY: str = ""
+    IMAGE_S3_SECRET_KEY: str = ""
+    IMAGE_UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    IMAGE_MAX_UPLOAD_SIZE: int = 20 * 1024 * 1024
+    # campaign archives, see dnd.procedures.campaigns
+    CAMPAIGN_MAX_IMPORT_SIZE: int = 200 * 1024 * 1024
+    # decode budgets, bigger images are downscaled to IMAGE_MAX_SIDE
+    IMAGE_MAX_PIXELS: int = 50_000_000
+    IMAGE_MAX_SIDE: int = 8192
+    IMAGE_MAX_DECODED_BYTES: int = 256 * 1024 * 1024
+    IMAGE_DECODE_WORKERS: int = 2
+    # address space limit of a decode worker
+    IMAGE_DECODE_MEMORY: int | None = 1024 * 1024 * 1024
+    # encoded variants, AVIF needs the "avif" extra
+    IMAGE_JPEG_QUALITY: int = 50
+    IMAGE_WEBP_QUALITY: int = 75
+    IMAGE_AVIF: bool = False
+    IMAGE_AVIF_QUALITY: int = 50
+
+    # rate limits, "postgres" shares the buckets between workers
+    RATE_LIMIT_BACKEND: Literal["memory", "postgres"] = "memory"
+    RATE_LIMIT_MOVE_RATE: float = 20.0
+    RATE_LIMIT_MOVE_BURST: int = 40
+    RATE_LIMIT_UPLOAD_RATE: float = 1 / 60
+    RATE_LIMIT_UPLOAD_BURST: int = 5
+    RATE_LIMIT_DICE_RATE: float = 5.0
+    RATE_LIMIT_DICE_BURST: int = 20
+
+    # moves of a dragged pawn are written after the delay without moves
+    MOVE_WRITE_DELAY: float = 2.0
+    # board events are appended in batches, a snapshot of the board is
+    # taken every N events of a game set to bound replays. A batch failing
+    # HISTORY_MAX_RETRIES times is written by game set, the failing ones
+    # are dropped, as are the oldest of more than HISTORY_MAX_PENDING
+    HISTORY_WRITE_DELAY: float = 1.0
+    HISTORY_BATCH_SIZE: int = 1000
+    HISTORY_SNAPSHOT_EVERY: int = 500
+    HISTORY_MAX_PENDING: int = 100_000
+    HISTORY_MAX_RETRIES: int = 3
+    # encounters are written after the delay without turn changes, game
+    # sets known to be out of combat are remembered up to the size
+    INITIATIVE_WRITE_DELAY: float = 2.0
+    INITIATIVE_ABSENT_SIZE: int = 10_000
+    # rolls are logged in batches, a query reserves the indexes of the next
+    # DICE_RESERVE_BLOCK rolls of a game set. Failing batches are bounded
+    # like the history by DICE_MAX_RETRIES and DICE_MAX_PENDING
+    DICE_WRITE_DELAY: float = 1.0
+    DICE_BATCH_SIZE: int = 1000
+    DICE_RESERVE_BLOCK: int = 1000
+    DICE_MAX_PENDING: int = 100_000
+    DICE_MAX_RETRIES: int = 3
+
+    # game sets with their members kept in memory for access checks
+    MEMBERSHIP_INDEX_SIZE: int = 10_000
+    # owner and map bounds of game sets by the id decoded from short urls,
+    # the TTL bounds how long other workers see an edited map
+    GAME_SET_HEADERS_SIZE: int = 10_000
+    GAME_SET_HEADERS_TTL: float = 60.0
+
+    # compression
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
 
     @classmethod
     @validator("DB_URL", always=True)
     def set_driver_name(cls, val):
+        from sqlalchemy.engine import make_url
+
         return str(make_url(val).set(drivername="postgresql+asyncpg"))
 
 
 settings = Settings()
 
-settings.GLOSSARY_DIR.mkdir(parents=True, exist_ok=True)
-settings.IMAGE_DIR.mkdir(parents=True, exist_ok=True)
 
-with open(settings.LOGGING_FILE, "r") as stream:
-    config = yaml.load(stream, Loader=yaml.FullLoader)
+@cache
+def bootstrap() -> None:
+    """
+    Create the storage directories and configure logging, once. Called by
+    the entry points, importing the settings has no side effects.
+    """
+    import logging.config
+
+    import yaml
+
+    settings.GLOSSARY_DIR.mkdir(parents=True, exist_ok=True)
+    settings.IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+
+    with open(settings.LOGGING_FILE, "r") as stream:
+        # the C loader is an order of magnitude faster when available
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        config = yaml.load(stream, Loader=loader)
 
-logging.config.dictConfig(config)
+    logging.config.dictConfig(config)
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Collection, Iterable, Iterator
+
+from sqlalchemy import bindparam, inspect, update
+
+from dnd.database.db import async_session
+from dnd.database.schemas.pawns import Pawn, PawnMeta
+from dnd.settings import settings
+
+logger = logging.getLogger(__name__)
+
+Position = tuple[int | None, int | None]
+
+
+@dataclass(eq=False)
+class Subscriber:
+    user_id: int
+    queue: asyncio.Queue
+
+
+class BoardHub:
+    """Fan-out of board events to the websockets of a game set"""
+
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._subscribers: dict[int, set[Subscriber]] = defaultdict(set)
+
+    @contextmanager
+    def subscribe(
+        self, game_set_id: int, user_id: int
+    ) -> Iterator[asyncio.Queue]:
+        subscriber = Subscriber(
+            user_id=user_id, queue=asyncio.Queue(self.queue_size)
+        )
+        self._subscribers[game_set_id].add(subscriber)
+        try:
+            yield subscriber.queue
+        finally:
+            self._subscribers[game_set_id].discard(subscriber)
+            if not self._subscribers[game_set_id]:
+                del self._subscribers[game_set_id]
+
+    def publish(
+        self,
+        game_set_id: int,
+        event: dict[str, Any],
+        audience: Collection[int] | None = None,
+    ) -> None:
+        """Send the event to ``audience`` user ids, everyone by default"""
+        for subscriber in self._subscribers.get(game_set_id, ()):
+            if audience is not None and subscriber.user_id not in audience:
+                continue
+            self._put(subscriber.queue, event)
+
+    def close(self) -> None:
+        """Ask every subscriber to close its socket, ``None`` is the end"""
+        for subscribers in self._subscribers.values():
+            for subscriber in subscribers:
+                self._put(subscriber.queue, None)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, event: dict[str, Any] | None) -> None:
+        if queue.full():
+            # a slow client loses the oldest events
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+
+_pawns_meta = PawnMeta.__table__
+_write_positions = (
+    update(_pawns_meta)
+    .where(_pawns_meta.c.id == bindparam("meta_id"))
+    .values(x=bindparam("new_x"), y=bindparam("new_y"))
+)
+
+
+class MoveBuffer:
+    """
+    Latest positions of dragged pawns by ``PawnMeta.id``. A position is
+    written after ``delay`` seconds without moves of the pawn, on drop
+    or on shutdown.
+    """
+
+    def __init__(self, delay: float = 2.0):
+        self.delay = delay
+        self._positions: dict[int, Position] = {}
+        # positions being written, still newer than the rows
+        self._writing: dict[int, Position] = {}
+        self._timers: dict[int, asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def put(self, meta_id: int, position: Position) -> None:
+        self._positions[meta_id] = position
+        if timer := self._timers.pop(meta_id, None):
+            timer.cancel()
+        self._timers[meta_id] = asyncio.get_running_loop().call_later(
+            self.delay, self._flush_later, meta_id
+        )
+
+    def get(self, meta_id: int) -> Position | None:
+        return self._positions.get(meta_id, self._writing.get(meta_id))
+
+    def overlay(self, pawns: Iterable[Pawn]) -> None:
+        """Apply unwritten positions to loaded pawns"""
+        for pawn in pawns:
+            if "meta" in inspect(pawn).unloaded or pawn.meta is None:
+                continue
+            if position := self.get(pawn.meta.id):
+                pawn.meta.x, pawn.meta.y = position
+
+    def discard(self, meta_ids: Iterable[int]) -> None:
+        """Forget unwritten positions, e.g. of deleted pawns"""
+        for meta_id in meta_ids:
+            if timer := self._timers.pop(meta_id, None):
+                timer.cancel()
+            self._positions.pop(meta_id, None)
+            self._writing.pop(meta_id, None)
+
+    def _flush_later(self, meta_id: int) -> None:
+        self._timers.pop(meta_id, None)
+        task = asyncio.create_task(self.flush([meta_id]))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self, meta_ids: Iterable[int] | None = None) -> int:
+        rows = []
+        for meta_id in list(self._positions if meta_ids is None else meta_ids):
+            if timer := self._timers.pop(meta_id, None):
+                timer.cancel()
+            if (position := self._positions.pop(meta_id, None)) is not None:
+                self._writing[meta_id] = position
+                rows.append(
+                    {
+                        "meta_id": meta_id,
+                        "new_x": position[0],
+                        "new_y": position[1],
+                    }
+                )
+        if not rows:
+            return 0
+        try:
+            async with async_session() as session:
+                # a core executemany skips rows of pawns deleted meanwhile
+                await session.execute(_write_positions, rows)
+                await session.commit()
+        except Exception:
+            logger.exception(f"Failed to write {len(rows)} moves")
+            for row in rows:
+                if row["meta_id"] not in self._positions:
+                    self.put(row["meta_id"], (row["new_x"], row["new_y"]))
+            return 0
+        finally:
+            for row in rows:
+                self._writing.pop(row["meta_id"], None)
+        return len(rows)
+
+    async def close(self) -> None:
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        written = await self.flush()
+        logger.info(f"Wrote {written} pending moves")
+
+
+board_hub = BoardHub()
+move_buffer = MoveBuffer(delay=settings.MOVE_WRITE_DELAY)
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from dnd.database.db import async_session
+from dnd.database.schemas.dice import DiceRoll, DiceStream
+from dnd.settings import settings
+from dnd.utils.dice import Expression, Roll, roll, stream
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Stream:
+    seed: int
+    # the next index and the end of the reserved block
+    next: int
+    end: int
+
+
+class DiceRoller:
+    """
+    Rolls of the game sets of this worker. Every ``block`` rolls of a game
+    set reserve the next indexes with one query, the log is appended with
+    one COPY per batch: after ``delay`` seconds, at ``batch_size`` rolls
+    or on shutdown.
+
+    A failed batch is queued again, after ``max_retries`` failures in a
+    row it's written by game set and the game sets still failing lose
+    their rolls. At most ``max_pending`` rolls wait, the oldest are
+    dropped while the database is unavailable.
+    """
+
+    def __init__(
+        self,
+        delay: float = 1.0,
+        batch_size: int = 1000,
+        block: int = 1000,
+        max_pending: int = 100_000,
+        max_retries: int = 3,
+    ):
+        self.delay = delay
+        self.batch_size = batch_size
+        self.block = block
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self._streams: dict[int, Stream] = {}
+        self._reserving: defaultdict[int, asyncio.Lock] = defaultdict(
+            asyncio.Lock
+        )
+        self._records: list[tuple[Any, ...]] = []
+        # failed flushes in a row
+        self._failures = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._lock = asyncio.Lock()
+
+    async def roll(
+        self, game_set_id: int, user_id: int, expression: Expression
+    ) -> tuple[int, Roll]:
+        """The index of the roll and its result, logged later"""
+        current = await self._stream(game_set_id)
+        index = current.next
+        current.next += 1
+        result = roll(expression, stream(current.seed, index))
+        self._trim(room=1)
+        self._records.append(
+            (
+                game_set_id,
+                index,
+                user_id,
+                str(expression),
+                result.total,
+                datetime.utcnow(),
+            )
+        )
+        if len(self._records) >= self.batch_size:
+            self._flush_later()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.delay, self._flush_later
+            )
+        return index, result
+
+    def _trim(self, room: int = 0) -> None:
+        overflow = len(self._records) + room - self.max_pending
+        if overflow <= 0:
+            return
+        # a batch at once rather than one on every roll
+        overflow = max(overflow, min(self.batch_size, len(self._records)))
+        del self._records[:overflow]
+        logger.warning(f"Dropped {overflow} rolls over the limit")
+
+    async def _stream(self, game_set_id: int) -> Stream:
+        current = self._streams.get(game_set_id)
+        if current is not None and current.next < current.end:
+            return current
+        async with self._reserving[game_set_id]:
+            current = self._streams.get(game_set_id)
+            if current is None or current.next >= current.end:
+                async with async_session() as session:
+                    seed, start = await DiceStream.reserve(
+                        session=session,
+                        game_set_id=game_set_id,
+                        block=self.block,
+                    )
+                    await session.commit()
+                current = self._streams[game_set_id] = Stream(
+                    seed=seed, next=start, end=start + self.block
+                )
+        return current
+
+    async def forget(self, game_set_id: int) -> None:
+        """Drop the stream and the unwritten rolls of a deleted game set"""
+        self._streams.pop(game_set_id, None)
+        self._reserving.pop(game_set_id, None)
+        async with self._lock:
+            self._records = [x for x in self._records if x[0] != game_set_id]
+
+    def _flush_later(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        task = asyncio.create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            records, self._records = self._records, []
+            if not records:
+                return 0
+            try:
+                await self._append(records)
+            except Exception:
+                self._failures += 1
+                logger.exception(f"Failed to write {len(records)} rolls")
+                if self._failures < self.max_retries:
+                    self._records[:0] = records
+                    self._trim()
+                    return 0
+            else:
+                self._failures = 0
+            if self._failures:
+                # a game set may fail every batch, the others are written
+                records = await self._append_by_game_set(records)
+                self._failures = 0
+        return len(records)
+
+    @staticmethod
+    async def _append(records: list[tuple[Any, ...]]) -> None:
+        async with async_session() as session:
+            await DiceRoll.append(session=session, records=records)
+            await session.commit()
+
+    async def _append_by_game_set(
+        self, records: list[tuple[Any, ...]]
+    ) -> list[tuple[Any, ...]]:
+        """Write the rolls of every game set apart, returns the written"""
+        by_game_set = defaultdict(list)
+        for record in records:
+            by_game_set[record[0]].append(record)
+        written = []
+        for game_set_id, rolls in by_game_set.items():
+            try:
+                await self._append(rolls)
+            except Exception:
+                logger.exception(
+                    f"Dropped {len(rolls)} rolls of game set {game_set_id}"
+                )
+                continue
+            written.extend(rolls)
+        return written
+
+    async def close(self) -> None:
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        written = await self.flush()
+        logger.info(f"Wrote {written} pending rolls")
+
+
+dice_roller = DiceRoller(
+    delay=settings.DICE_WRITE_DELAY,
+    batch_size=settings.DICE_BATCH_SIZE,
+    block=settings.DICE_RESERVE_BLOCK,
+    max_pending=settings.DICE_MAX_PENDING,
+    max_retries=settings.DICE_MAX_RETRIES,
+)
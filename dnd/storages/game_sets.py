@@ -1,51 +1,86 @@
-import asyncio
 import time
-from asyncio import AbstractEventLoop
+from collections import OrderedDict
 from dataclasses import dataclass
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from dnd.database.schemas.game_sets import GameSet
+from dnd.settings import settings
+from dnd.utils.crypto import hashids
 
 
-@dataclass
-class GameSetConfig:
-    ...
+@dataclass(frozen=True)
+class GameSetHeader:
+    """What pawn and board requests need of a game set"""
 
+    id: int
+    short_url: str
+    owner_id: int
+    version: int
+    map_id: int | None = None
+    map_len_x: int | None = None
+    map_len_y: int | None = None
 
-class GameSetStorage:
-    _gamesets: dict[int, GameSet] = {}
 
-    def __init__(self, stay_alive: float = 60.0 * 15):
-        self.set_alive = True
-        self.stay_alive = stay_alive
+class GameSetHeaders:
+    """
+    Headers of the recently used game sets by ``GameSet.id``, decoded
+    from the short url. Changes of the game set (``forget``) and of its
+    map (``forget_map``) drop the header in this worker, ``ttl`` bounds
+    how long other workers see an edited map.
+    """
 
-    @classmethod
-    def get_running_set(cls, set_id: int) -> GameSet | None:
-        return cls._gamesets.get(set_id)
+    def __init__(self, max_size: int = 10_000, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        # id -> (header, expires at)
+        self._headers: OrderedDict[
+            int, tuple[GameSetHeader, float]
+        ] = OrderedDict()
 
-    @classmethod
-    def set_resumed_set(cls, set_id: int, game_set: GameSet) -> GameSet:
-        cls._gamesets[set_id] = game_set
-        return cls._gamesets[set_id]
+    @staticmethod
+    def decode(short_url: str) -> int | None:
+        """Id of the short url made by ``hashids.encode``"""
+        ids = hashids.decode(short_url)
+        return ids[0] if len(ids) == 1 else None
 
-    async def cleaner(self, session: AsyncSession, delay: int = 60):
-        while self.set_alive:
-            current_time = time.time()
-            await self.dump(session=session)
-            for game_id, gameset in self._gamesets.items():
-                if current_time - gameset.timer >= self.stay_alive:
-                    self._gamesets.pop(game_id)
-            await asyncio.sleep(delay)
-
-    async def dump(self, session: AsyncSession) -> bool:
-        res = await asyncio.gather(
-            *[i.save(session=session) for i in self._gamesets.values()]
+    async def get(
+        self, session: AsyncSession, short_url: str
+    ) -> GameSetHeader | None:
+        game_set_id = self.decode(short_url)
+        if game_set_id is None:
+            return None
+        now = time.monotonic()
+        if cached := self._headers.get(game_set_id):
+            header, expires = cached
+            if expires > now:
+                self._headers.move_to_end(game_set_id)
+                return header
+        row = await GameSet.get_header(
+            session=session, id=game_set_id, short_url=short_url
         )
-        if all(res):
-            return True
-        else:
-            return False
+        if row is None:
+            self.forget(game_set_id)
+            return None
+        header = GameSetHeader(**row._mapping)
+        self._headers[game_set_id] = (header, now + self.ttl)
+        self._headers.move_to_end(game_set_id)
+        if len(self._headers) > self.max_size:
+            self._headers.popitem(last=False)
+        return header
+
+    def forget(self, game_set_id: int) -> None:
+        self._headers.pop(game_set_id, None)
+
+    def forget_map(self, map_id: int) -> None:
+        for game_set_id in [
+            game_set_id
+            for game_set_id, (header, _) in self._headers.items()
+            if header.map_id == map_id
+        ]:
+            del self._headers[game_set_id]
+
 
-    def start(self, loop: AbstractEventLoop) -> None:
-        asyncio.run_coroutine_threadsafe(self.cleaner(), loop=loop)
+game_set_headers = GameSetHeaders(
+    max_size=settings.GAME_SET_HEADERS_SIZE, ttl=settings.GAME_SET_HEADERS_TTL
+)
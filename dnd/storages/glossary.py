@@ -1,5 +1,170 @@
-from starlette.staticfiles import StaticFiles
+import json
+import logging
+from dataclasses import dataclass, field
+from hashlib import sha256
+from mimetypes import guess_type
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Mapping
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
 
 from dnd.settings import settings
+from dnd.utils.compression import (
+    PRECOMPRESSED_SUFFIXES,
+    BrotliCompressor,
+    GZipCompressor,
+    accepted_encodings,
+    brotli,
+)
+
+logger = logging.getLogger(__name__)
+
+INDEX = "index.json"
+PAWN_SIZES = "pawns/sizes.json"
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+@dataclass(frozen=True)
+class GlossaryFile:
+    content: bytes
+    etag: str
+    media_type: str
+    encoded: Mapping[str, bytes] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, content: bytes, media_type: str) -> "GlossaryFile":
+        encoded = {}
+        compressors = {"gzip": GZipCompressor(9)}
+        if brotli is not None:
+            compressors["br"] = BrotliCompressor(11)
+        for encoding, compressor in compressors.items():
+            variant = compressor.compress(content) + compressor.flush(True)
+            if len(variant) < len(content):
+                encoded[encoding] = variant
+        return cls(
+            content=content,
+            etag=sha256(content).hexdigest()[:16],
+            media_type=media_type,
+            encoded=MappingProxyType(encoded),
+        )
+
+    def response(self, scope: Scope, cache_control: str) -> Response:
+        request_headers = Headers(scope=scope)
+        headers = {
+            "ETag": f'"{self.etag}"',
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if request_headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+        content = self.content
+        for encoding in accepted_encodings(request_headers):
+            if encoding in self.encoded:
+                content = self.encoded[encoding]
+                headers["Content-Encoding"] = encoding
+                break
+        return Response(
+            content,
+            media_type=self.media_type,
+            headers=headers,
+        )
+
+
+class Glossary:
+    """
+    Immutable in-memory copy of the glossary directory.
+
+    Files are served as ``/<path>`` (revalidated by ETag) and as
+    ``/<etag>/<path>`` (cached forever). ``/index.json`` lists the
+    versioned urls of all files.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._files: Mapping[str, GlossaryFile] | None = None
+        self._data: dict[str, Any] = {}
+        self._indexes: dict[str, GlossaryFile] = {}
+        self._pawn_sizes: frozenset[tuple[int, int]] = frozenset()
+
+    def load(self) -> None:
+        files = {}
+        for path in sorted(self.directory.rglob("*")):
+            if (
+                not path.is_file()
+                or path.suffix in PRECOMPRESSED_SUFFIXES.values()
+            ):
+                continue
+            name = path.relative_to(self.directory).as_posix()
+            files[name] = GlossaryFile.build(
+                path.read_bytes(),
+                guess_type(name)[0] or "application/octet-stream",
+            )
+        self._data, self._indexes = {}, {}
+        self._files = MappingProxyType(files)
+        # checked by every pawn validation
+        if PAWN_SIZES in files:
+            self._pawn_sizes = frozenset(
+                tuple(value["size"]) for value in self.get(PAWN_SIZES).values()
+            )
+        else:
+            logger.warning(f"Glossary has no {PAWN_SIZES}")
+            self._pawn_sizes = frozenset()
+        logger.info(f"Glossary loaded {len(files)} files")
+
+    @property
+    def files(self) -> Mapping[str, GlossaryFile]:
+        if self._files is None:
+            self.load()
+        return self._files
+
+    def get(self, path: str) -> Any:
+        """Parsed content of the JSON file"""
+        if path not in self._data:
+            self._data[path] = json.loads(self.files[path].content)
+        return self._data[path]
+
+    @property
+    def pawn_sizes(self) -> frozenset[tuple[int, int]]:
+        if self._files is None:
+            self.load()
+        return self._pawn_sizes
+
+    def index(self, root_path: str) -> GlossaryFile:
+        if root_path not in self._indexes:
+            self._indexes[root_path] = GlossaryFile.build(
+                json.dumps(
+                    {
+                        path: f"{root_path}/{file.etag}/{path}"
+                        for path, file in self.files.items()
+                    }
+                ).encode(),
+                "application/json",
+            )
+        return self._indexes[root_path]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        assert scope["type"] == "http"
+        path = scope["path"].strip("/")
+        if scope["method"] not in ("GET", "HEAD"):
+            response = Response(status_code=405)
+        elif path == INDEX:
+            response = self.index(scope.get("root_path", "")).response(
+                scope, REVALIDATE
+            )
+        elif file := self.files.get(path):
+            response = file.response(scope, REVALIDATE)
+        else:
+            version, _, path = path.partition("/")
+            file = self.files.get(path)
+            if file and file.etag == version:
+                response = file.response(scope, IMMUTABLE)
+            else:
+                response = Response(status_code=404)
+        await response(scope, receive, send)
+
 
-glossary = StaticFiles(directory=settings.GLOSSARY_DIR)
+glossary = Glossary(directory=settings.GLOSSARY_DIR)
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dnd.database.db import async_session
+from dnd.database.schemas.history import (
+    BoardEvent,
+    BoardEventKind,
+    BoardSnapshot,
+)
+from dnd.settings import settings
+from dnd.storages.board import Position
+
+logger = logging.getLogger(__name__)
+
+
+class EventLog:
+    """
+    Board events of the game sets of this worker, appended with one COPY
+    per batch: after ``delay`` seconds, at ``batch_size`` events or on
+    shutdown. A game set gets a snapshot every ``snapshot_every`` events,
+    so a replay reads at most that many events past a snapshot.
+
+    A failed batch is queued again, after ``max_retries`` failures in a
+    row it's written by game set and the game sets still failing lose
+    their events. At most ``max_pending`` events wait, the oldest are
+    dropped while the database is unavailable.
+    """
+
+    def __init__(
+        self,
+        delay: float = 1.0,
+        batch_size: int = 1000,
+        snapshot_every: int = 500,
+        max_pending: int = 100_000,
+        max_retries: int = 3,
+    ):
+        self.delay = delay
+        self.batch_size = batch_size
+        self.snapshot_every = snapshot_every
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self._records: list[tuple[Any, ...]] = []
+        # failed flushes in a row
+        self._failures = 0
+        # events written since the last snapshot by game set
+        self._since_snapshot: Counter[int] = Counter()
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._lock = asyncio.Lock()
+
+    def record(
+        self,
+        game_set_id: int,
+        pawn_id: int,
+        kind: BoardEventKind,
+        position: Position = (None, None),
+    ) -> None:
+        x, y = position
+        self._trim(room=1)
+        self._records.append(
+            (game_set_id, pawn_id, kind.value, x, y, datetime.utcnow())
+        )
+        if len(self._records) >= self.batch_size:
+            self._flush_later()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.delay, self._flush_later
+            )
+
+    def _trim(self, room: int = 0) -> None:
+        overflow = len(self._records) + room - self.max_pending
+        if overflow <= 0:
+            return
+        # a batch at once rather than an event on every record
+        overflow = max(overflow, min(self.batch_size, len(self._records)))
+        del self._records[:overflow]
+        logger.warning(f"Dropped {overflow} board events over the limit")
+
+    def _flush_later(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        task = asyncio.create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self) -> int:
+        # batches are written in order, the ids order the events
+        async with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            records, self._records = self._records, []
+            if not records:
+                return 0
+            try:
+                await self._append(records)
+            except Exception:
+                self._failures += 1
+                logger.exception(f"Failed to write {len(records)} events")
+                if self._failures < self.max_retries:
+                    self._records[:0] = records
+                    self._trim()
+                    return 0
+            else:
+                self._failures = 0
+            if self._failures:
+                # a game set may fail every batch, the others are written
+                records = await self._append_by_game_set(records)
+                self._failures = 0
+            self._since_snapshot.update(x[0] for x in records)
+            await self._snapshot_due()
+        return len(records)
+
+    @staticmethod
+    async def _append(records: list[tuple[Any, ...]]) -> None:
+        async with async_session() as session:
+            await BoardEvent.append(session=session, records=records)
+            await session.commit()
+
+    async def _append_by_game_set(
+        self, records: list[tuple[Any, ...]]
+    ) -> list[tuple[Any, ...]]:
+        """Write the events of every game set apart, returns the written"""
+        by_game_set = defaultdict(list)
+        for record in records:
+            by_game_set[record[0]].append(record)
+        written = []
+        for game_set_id, events in by_game_set.items():
+            try:
+                await self._append(events)
+            except Exception:
+                logger.exception(
+                    f"Dropped {len(events)} events of game set {game_set_id}"
+                )
+                continue
+            written.extend(events)
+        return written
+
+    async def _snapshot_due(self) -> None:
+        due = [
+            game_set_id
+            for game_set_id, count in self._since_snapshot.items()
+            if count >= self.snapshot_every
+        ]
+        for game_set_id in due:
+            try:
+                async with async_session() as session:
+                    event_id, positions = await self._replay(
+                        session=session, game_set_id=game_set_id
+                    )
+                    await BoardSnapshot.create(
+                        session=session,
+                        game_set_id=game_set_id,
+                        event_id=event_id,
+                        positions={
+                            str(k): list(v) for k, v in positions.items()
+                        },
+                    )
+                    await session.commit()
+            except Exception:
+                # the next batch of the game set tries again
+                logger.exception(f"Failed to snapshot game set {game_set_id}")
+                continue
+            del self._since_snapshot[game_set_id]
+
+    async def replay(
+        self, session: AsyncSession, game_set_id: int, at: int | None = None
+    ) -> tuple[int, dict[int, Position]]:
+        """
+        Positions by ``Pawn.id`` after the event ``at``, the latest by
+        default, and the id of the last event applied
+        """
+        await self.flush()
+        return await self._replay(
+            session=session, game_set_id=game_set_id, at=at
+        )
+
+    @staticmethod
+    async def _replay(
+        session: AsyncSession, game_set_id: int, at: int | None = None
+    ) -> tuple[int, dict[int, Position]]:
+        event_id, positions = 0, {}
+        snapshot = await BoardSnapshot.get_nearest(
+            session=session, game_set_id=game_set_id, at=at
+        )
+        if snapshot is not None:
+            event_id = snapshot.event_id
+            positions = {
+                int(k): tuple(v) for k, v in snapshot.positions.items()
+            }
+        for event in await BoardEvent.get_range(
+            session=session, game_set_id=game_set_id, after=event_id, until=at
+        ):
+            event_id = event.id
+            if event.kind is BoardEventKind.remove:
+                positions.pop(event.pawn_id, None)
+            else:
+                positions[event.pawn_id] = (event.x, event.y)
+        return event_id, positions
+
+    async def forget(self, game_set_id: int) -> None:
+        """
+        Drop the events of a deleted game set, they would fail every batch.
+        Waits for the batch being written, it's queued again if it failed.
+        """
+        async with self._lock:
+            self._records = [x for x in self._records if x[0] != game_set_id]
+            self._since_snapshot.pop(game_set_id, None)
+
+    async def close(self) -> None:
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        written = await self.flush()
+        logger.info(f"Wrote {written} pending board events")
+
+
+event_log = EventLog(
+    delay=settings.HISTORY_WRITE_DELAY,
+    batch_size=settings.HISTORY_BATCH_SIZE,
+    snapshot_every=settings.HISTORY_SNAPSHOT_EVERY,
+    max_pending=settings.HISTORY_MAX_PENDING,
+    max_retries=settings.HISTORY_MAX_RETRIES,
+)
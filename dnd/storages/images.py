@@ -1,5 +1,514 @@
-from fastapi.staticfiles import StaticFiles
+import asyncio
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from hashlib import sha1
+from pathlib import Path
+from tempfile import mkstemp
+from typing import TYPE_CHECKING, AsyncContextManager, AsyncIterator
 
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import Headers
+from starlette.responses import RedirectResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from dnd.database.db import async_session
+from dnd.database.schemas.images import Image
 from dnd.settings import settings
+from dnd.utils.compression import (
+    PRECOMPRESSED_SUFFIXES,
+    PrecompressedStaticFiles,
+)
+from dnd.utils.s3 import presign_url
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+S3_NAMESPACE = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+
+IMAGE_FORMATS = {
+    "avif": "image/avif",
+    "webp": "image/webp",
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+}
+
+
+def image_key(short_url: str, fmt: str = "jpeg") -> str:
+    """
+    Two level sharded key of the image variant: ``ab/cd/<short_url>``,
+    formats besides JPEG (the only one stored before) get an extension.
+    """
+    shard = sha1(short_url.encode()).hexdigest()
+    key = f"{shard[:2]}/{shard[2:4]}/{short_url}"
+    return key if fmt == "jpeg" else f"{key}.{fmt}"
+
+
+def negotiate(formats: list[str], accept: str) -> str:
+    """Preferred stored format allowed by ``Accept``, or the fallback"""
+    accept = accept.lower()
+    for fmt in formats[:-1]:
+        if IMAGE_FORMATS[fmt] in accept:
+            return fmt
+    return formats[-1]
+
+
+class ImageBackend(ABC):
+    """
+    Storage of images addressed by content derived short urls. Uploads
+    are spooled to ``spool_directory`` before ``put``.
+    """
+
+    chunk_size = 1024 * 1024
+
+    def __init__(self, spool_directory: Path):
+        self.spool_directory = spool_directory
+
+    def temporary_path(self) -> Path:
+        self.spool_directory.mkdir(parents=True, exist_ok=True)
+        fd, path = mkstemp(dir=self.spool_directory, suffix=".tmp")
+        os.close(fd)
+        return Path(path)
+
+    def _clean_spool(self, older_than: float) -> None:
+        if not self.spool_directory.exists():
+            return
+        for path in self.spool_directory.iterdir():
+            if path.stat().st_mtime < older_than:
+                path.unlink(missing_ok=True)
+
+    async def prepare(self) -> None:
+        """Clean spooled files left after a crash"""
+        await asyncio.to_thread(self._clean_spool, time.time() - 60 * 60)
+
+    async def close(self) -> None:
+        ...
+
+    @abstractmethod
+    async def exists(self, short_url: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def put(self, short_url: str, path: Path, fmt: str) -> None:
+        """Move the spooled file at ``path`` into the storage"""
+
+    @abstractmethod
+    def open(
+        self, short_url: str, fmt: str
+    ) -> AsyncContextManager[tuple[int, AsyncIterator[bytes]]]:
+        """Size and chunks of the stored variant"""
+
+    @abstractmethod
+    async def remove(self, short_url: str) -> None:
+        """Remove all variants of the image"""
+
+    @abstractmethod
+    async def stale(self, older_than: float) -> list[str]:
+        """Short urls of images stored before the timestamp"""
+
+    @abstractmethod
+    async def response(
+        self, short_url: str, fmt: str, scope: Scope
+    ) -> Response:
+        """Delivery response which doesn't pass the image bytes through"""
+
+
+class LocalImageBackend(ImageBackend):
+    """
+    Images in a local directory. Set ``accel_redirect`` to the prefix of
+    an ``internal`` nginx location aliased to the directory to let nginx
+    send the files, e.g.::
+
+        location /internal/maps/ { internal; alias /srv/maps/; }
+    """
+
+    def __init__(self, directory: Path, accel_redirect: str | None = None):
+        super().__init__(spool_directory=directory / ".spool")
+        self.directory = directory
+        self.accel_redirect = accel_redirect
+        # the directory is created by ``settings.bootstrap``
+        self.files = PrecompressedStaticFiles(
+            directory=directory, check_dir=False
+        )
+
+    def path(self, short_url: str) -> Path:
+        return self.directory / image_key(short_url)
+
+    async def prepare(self) -> None:
+        await super().prepare()
+        moved = await asyncio.to_thread(self.relayout)
+        if moved:
+            logger.info(f"Moved {moved} images into shards")
+
+    def relayout(self) -> int:
+        """Move files of the old flat layout into shards"""
+        moved = 0
+        for path in self.directory.iterdir():
+            if path.is_file() and not path.name.startswith("."):
+                target = self.path(path.name)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.replace(path, target)
+                except FileNotFoundError:
+                    # moved by another worker
+                    continue
+                moved += 1
+        return moved
+
+    async def exists(self, short_url: str) -> bool:
+        return await asyncio.to_thread(self.path(short_url).exists)
+
+    async def put(self, short_url: str, path: Path, fmt: str) -> None:
+        target = self.directory / image_key(short_url, fmt)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, target)
+
+    @asynccontextmanager
+    async def open(
+        self, short_url: str, fmt: str
+    ) -> AsyncIterator[tuple[int, AsyncIterator[bytes]]]:
+        path = self.directory / image_key(short_url, fmt)
+        file = await asyncio.to_thread(path.open, "rb")
+        try:
+
+            async def chunks():
+                while chunk := await asyncio.to_thread(
+                    file.read, self.chunk_size
+                ):
+                    yield chunk
+
+            yield os.fstat(file.fileno()).st_size, chunks()
+        finally:
+            file.close()
+
+    async def remove(self, short_url: str) -> None:
+        for fmt in IMAGE_FORMATS:
+            path = self.directory / image_key(short_url, fmt)
+            for suffix in ("", *PRECOMPRESSED_SUFFIXES.values()):
+                path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+    def _stale(self, older_than: float) -> list[str]:
+        short_urls = set()
+        for path in self.directory.glob("[!.]*/*/*"):
+            if path.is_file() and path.stat().st_mtime < older_than:
+                short_urls.add(path.name.split(".", 1)[0])
+        return list(short_urls)
+
+    async def stale(self, older_than: float) -> list[str]:
+        return await asyncio.to_thread(self._stale, older_than)
+
+    async def response(
+        self, short_url: str, fmt: str, scope: Scope
+    ) -> Response:
+        key = image_key(short_url, fmt)
+        if self.accel_redirect:
+            return Response(
+                headers={
+                    "X-Accel-Redirect": f"{self.accel_redirect}/{key}",
+                    "Vary": "Accept",
+                },
+                media_type=IMAGE_FORMATS[fmt],
+            )
+        response = await self.files.get_response(key, scope)
+        response.headers["Content-Type"] = IMAGE_FORMATS[fmt]
+        response.headers.add_vary_header("Accept")
+        return response
+
+
+class S3ImageBackend(ImageBackend):
+    """
+    Images in an S3-compatible bucket, delivered by redirects to
+    presigned urls. ``public_endpoint`` is the endpoint reachable by
+    clients if it differs from the one used by the service.
+    """
+
+    def __init__(
+        self,
+        spool_directory: Path,
+        endpoint: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        public_endpoint: str | None = None,
+        expires: int = 60 * 60,
+    ):
+        super().__init__(spool_directory=spool_directory)
+        self.endpoint = endpoint
+        self.public_endpoint = public_endpoint or endpoint
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.expires = expires
+        self._client: "httpx.AsyncClient | None" = None
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            # only the S3 backend needs the client, don't import it eagerly
+            import httpx
+
+            self._client = httpx.AsyncClient(timeout=30.0)
+        return self._client
+
+    def url(
+        self,
+        method: str,
+        key: str = "",
+        query: dict[str, str] | None = None,
+        public: bool = False,
+    ) -> str:
+        signed_at = None
+        expires = 60
+        if public:
+            # the same url within a half of the expiration window,
+            # so clients can cache the redirect target
+            window = self.expires // 2
+            signed_at = time.time() // window * window
+            expires = self.expires
+        return presign_url(
+            method=method,
+            endpoint=self.public_endpoint if public else self.endpoint,
+            bucket=self.bucket,
+            key=key,
+            access_key=self.access_key,
+            secret_key=self.secret_key,
+            region=self.region,
+            expires=expires,
+            query=query,
+            signed_at=signed_at,
+        )
+
+    async def prepare(self) -> None:
+        await super().prepare()
+        res = await self.client.put(self.url("PUT"))
+        if res.status_code not in (200, 409):
+            res.raise_for_status()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def exists(self, short_url: str) -> bool:
+        res = await self.client.head(self.url("HEAD", image_key(short_url)))
+        return res.status_code == 200
+
+    async def put(self, short_url: str, path: Path, fmt: str) -> None:
+        content = await asyncio.to_thread(path.read_bytes)
+        res = await self.client.put(
+            self.url("PUT", image_key(short_url, fmt)),
+            content=content,
+            headers={"Content-Type": IMAGE_FORMATS[fmt]},
+        )
+        res.raise_for_status()
+        path.unlink(missing_ok=True)
+
+    @asynccontextmanager
+    async def open(
+        self, short_url: str, fmt: str
+    ) -> AsyncIterator[tuple[int, AsyncIterator[bytes]]]:
+        url = self.url("GET", image_key(short_url, fmt))
+        async with self.client.stream("GET", url) as res:
+            res.raise_for_status()
+            size = int(res.headers["Content-Length"])
+            yield size, res.aiter_raw(self.chunk_size)
+
+    async def remove(self, short_url: str) -> None:
+        for fmt in IMAGE_FORMATS:
+            res = await self.client.delete(
+                self.url("DELETE", image_key(short_url, fmt))
+            )
+            if res.status_code != 404:
+                res.raise_for_status()
+
+    async def stale(self, older_than: float) -> list[str]:
+        from xml.etree.ElementTree import fromstring
+
+        short_urls = set()
+        query = {"list-type": "2"}
+        while True:
+            res = await self.client.get(self.url("GET", query=query))
+            res.raise_for_status()
+            root = fromstring(res.content)
+            for item in root.iter(f"{S3_NAMESPACE}Contents"):
+                modified = datetime.fromisoformat(
+                    item.findtext(f"{S3_NAMESPACE}LastModified")
+                )
+                if modified.timestamp() < older_than:
+                    key = item.findtext(f"{S3_NAMESPACE}Key")
+                    name = key.rsplit("/", 1)[-1]
+                    short_urls.add(name.split(".", 1)[0])
+            token = root.findtext(f"{S3_NAMESPACE}NextContinuationToken")
+            if not token:
+                return list(short_urls)
+            query = {"list-type": "2", "continuation-token": token}
+
+    async def response(
+        self, short_url: str, fmt: str, scope: Scope
+    ) -> Response:
+        return RedirectResponse(
+            self.url("GET", image_key(short_url, fmt), public=True),
+            status_code=307,
+            headers={
+                "Cache-Control": f"private, max-age={self.expires // 2}",
+                "Vary": "Accept",
+            },
+        )
+
+
+class ImageFormats:
+    """
+    LRU cache of stored formats by short url, images are immutable so
+    entries never go stale.
+    """
+
+    def __init__(self, size: int = 4096):
+        self.size = size
+        self._cache: OrderedDict[str, list[str]] = OrderedDict()
+
+    async def get(self, short_url: str) -> list[str] | None:
+        if formats := self._cache.get(short_url):
+            self._cache.move_to_end(short_url)
+            return formats
+        async with async_session() as session:
+            formats = await Image.get_formats(
+                session=session, short_url=short_url
+            )
+        if formats:
+            self._cache[short_url] = formats
+            if len(self._cache) > self.size:
+                self._cache.popitem(last=False)
+        return formats
+
+    def forget(self, short_url: str) -> None:
+        self._cache.pop(short_url, None)
+
+    async def response(
+        self, backend: "ImageBackend", short_url: str, scope: Scope
+    ) -> Response:
+        formats = await self.get(short_url)
+        if not formats:
+            return Response(status_code=404)
+        fmt = negotiate(formats, Headers(scope=scope).get("accept", ""))
+        return await backend.response(short_url, fmt, scope)
+
+
+class ImageFiles:
+    """ASGI app delivering images by ``/<short_url>``"""
+
+    def __init__(self, backend: ImageBackend, formats: ImageFormats):
+        self.backend = backend
+        self.formats = formats
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        assert scope["type"] == "http"
+        short_url = scope["path"].strip("/").rsplit("/", 1)[-1]
+        if scope["method"] not in ("GET", "HEAD"):
+            response = Response(status_code=405)
+        elif not short_url:
+            response = Response(status_code=404)
+        else:
+            response = await self.formats.response(
+                self.backend, short_url, scope
+            )
+        await response(scope, receive, send)
+
+
+class ImageCollector:
+    """Background job removing images without references"""
+
+    def __init__(
+        self,
+        backend: ImageBackend,
+        formats: ImageFormats,
+        delay: float = 60.0 * 60,
+        grace: float = 60.0 * 60,
+    ):
+        self.backend = backend
+        self.formats = formats
+        self.delay = delay
+        self.grace = grace
+        self._task: asyncio.Task | None = None
+
+    async def collect(self, session: AsyncSession) -> int:
+        removed = 0
+        while short_urls := await Image.delete_unused(
+            session=session, grace=timedelta(seconds=self.grace)
+        ):
+            for short_url in short_urls:
+                self.formats.forget(short_url)
+                await self.backend.remove(short_url)
+            await session.commit()
+            removed += len(short_urls)
+        return removed
+
+    async def sweep(self, session: AsyncSession) -> int:
+        """Remove files left without rows, e.g. by rolled back uploads"""
+        removed = 0
+        stale = await self.backend.stale(time.time() - self.grace)
+        for i in range(0, len(stale), 1000):
+            batch = stale[i : i + 1000]
+            existing = await Image.existing(session=session, short_urls=batch)
+            for short_url in batch:
+                if short_url not in existing:
+                    await self.backend.remove(short_url)
+                    removed += 1
+        return removed
+
+    async def run(self) -> None:
+        await self.backend.prepare()
+        while True:
+            try:
+                async with async_session() as session:
+                    removed = await self.collect(session=session)
+                    removed += await self.sweep(session=session)
+                logger.info(f"Removed {removed} unused images")
+            except Exception:
+                logger.exception("Images collection failed")
+            await asyncio.sleep(self.delay)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.backend.close()
+
+
+def get_image_backend() -> ImageBackend:
+    if settings.IMAGE_BACKEND == "s3":
+        return S3ImageBackend(
+            spool_directory=settings.IMAGE_DIR / ".spool",
+            endpoint=settings.IMAGE_S3_ENDPOINT,
+            public_endpoint=settings.IMAGE_S3_PUBLIC_ENDPOINT,
+            bucket=settings.IMAGE_S3_BUCKET,
+            access_key=settings.IMAGE_S3_ACCESS_KEY,
+            secret_key=settings.IMAGE_S3_SECRET_KEY,
+            region=settings.IMAGE_S3_REGION,
+            expires=settings.IMAGE_URL_EXPIRE_SECONDS,
+        )
+    return LocalImageBackend(
+        directory=settings.IMAGE_DIR,
+        accel_redirect=settings.IMAGE_ACCEL_REDIRECT,
+    )
+
 
-images = StaticFiles(directory=settings.IMAGE_DIR)
+image_backend = get_image_backend()
+image_formats = ImageFormats()
+images = ImageFiles(backend=image_backend, formats=image_formats)
+image_collector = ImageCollector(
+    backend=image_backend,
+    formats=image_formats,
+    delay=settings.IMAGE_GC_DELAY,
+    grace=settings.IMAGE_GC_GRACE,
+)
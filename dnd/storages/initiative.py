@@ -0,0 +1,278 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Iterable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dnd.database.db import async_session
+from dnd.database.schemas.initiative import Initiative
+from dnd.settings import settings
+from dnd.storages.board import board_hub
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Combatant:
+    pawn_id: int
+    name: str
+    user_id: int
+    initiative: int
+
+
+@dataclass
+class Encounter:
+    game_set_id: int
+    # the turn order, the highest initiative first
+    combatants: list[Combatant]
+    turn: int = 0
+    round: int = 1
+    turn_seconds: int | None = None
+    deadline: datetime | None = None
+
+    @property
+    def active(self) -> Combatant:
+        return self.combatants[self.turn]
+
+    def as_row(self) -> dict[str, Any]:
+        return {
+            "game_set_id": self.game_set_id,
+            "entries": [asdict(x) for x in self.combatants],
+            "turn": self.turn,
+            "round": self.round,
+            "turn_seconds": self.turn_seconds,
+            "deadline": self.deadline,
+        }
+
+    @classmethod
+    def from_row(cls, row: Initiative) -> "Encounter":
+        return cls(
+            game_set_id=row.game_set_id,
+            combatants=[Combatant(**x) for x in row.entries],
+            turn=row.turn,
+            round=row.round,
+            turn_seconds=row.turn_seconds,
+            deadline=row.deadline,
+        )
+
+
+class InitiativeTracker:
+    """
+    Encounters of the game sets of this worker by ``GameSet.id``. Turns
+    change in memory and are broadcast by ``board_hub``, the encounters
+    are written ``delay`` seconds after a change or on shutdown. Game
+    sets without an encounter are remembered (up to ``max_absent``), so
+    moves outside of combat don't query the database.
+    """
+
+    def __init__(self, delay: float = 2.0, max_absent: int = 10_000):
+        self.delay = delay
+        self.max_absent = max_absent
+        self._encounters: dict[int, Encounter] = {}
+        self._absent: OrderedDict[int, None] = OrderedDict()
+        # changed encounters, ended ones are deleted
+        self._dirty: set[int] = set()
+        self._timer: asyncio.TimerHandle | None = None
+        self._turn_timers: dict[int, asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._lock = asyncio.Lock()
+
+    async def get(
+        self, session: AsyncSession, game_set_id: int
+    ) -> Encounter | None:
+        if encounter := self._encounters.get(game_set_id):
+            return encounter
+        if game_set_id in self._absent:
+            self._absent.move_to_end(game_set_id)
+            return None
+        row = await Initiative.get_by_game_set_id(
+            session=session, game_set_id=game_set_id
+        )
+        # the encounter may have been started or ended meanwhile
+        if encounter := self._encounters.get(game_set_id):
+            return encounter
+        if row is None or game_set_id in self._absent:
+            self._remember_absent(game_set_id)
+            return None
+        encounter = self._encounters[game_set_id] = Encounter.from_row(row)
+        self._schedule_turn(encounter)
+        return encounter
+
+    def start(
+        self,
+        game_set_id: int,
+        combatants: Iterable[Combatant],
+        turn_seconds: int | None = None,
+    ) -> Encounter:
+        """Start the encounter over, ties keep the order of ``combatants``"""
+        encounter = Encounter(
+            game_set_id=game_set_id,
+            combatants=sorted(combatants, key=lambda x: -x.initiative),
+            turn_seconds=turn_seconds,
+        )
+        self._absent.pop(game_set_id, None)
+        self._encounters[game_set_id] = encounter
+        self._begin_turn(encounter)
+        return encounter
+
+    def advance(self, game_set_id: int) -> Encounter | None:
+        """Pass the turn to the next pawn"""
+        encounter = self._encounters.get(game_set_id)
+        if encounter is None:
+            return None
+        encounter.turn += 1
+        if encounter.turn == len(encounter.combatants):
+            encounter.turn = 0
+            encounter.round += 1
+        self._begin_turn(encounter)
+        return encounter
+
+    def end(self, game_set_id: int) -> None:
+        if self._encounters.pop(game_set_id, None) is None:
+            return
+        self._cancel_turn(game_set_id)
+        self._remember_absent(game_set_id)
+        self._mark(game_set_id)
+        board_hub.publish(game_set_id, {"type": "turn", "pawn": None})
+
+    def remove_pawn(self, game_set_id: int, pawn_id: int) -> None:
+        encounter = self._encounters.get(game_set_id)
+        if encounter is None:
+            return
+        for index, combatant in enumerate(encounter.combatants):
+            if combatant.pawn_id == pawn_id:
+                break
+        else:
+            return
+        del encounter.combatants[index]
+        if not encounter.combatants:
+            self.end(game_set_id)
+        elif index < encounter.turn:
+            encounter.turn -= 1
+            self._mark(game_set_id)
+        elif index == encounter.turn:
+            # the next pawn takes the turn
+            encounter.turn -= 1
+            self.advance(game_set_id)
+        else:
+            self._mark(game_set_id)
+
+    def rename_pawn(self, game_set_id: int, pawn_id: int, name: str) -> None:
+        if encounter := self._encounters.get(game_set_id):
+            for combatant in encounter.combatants:
+                if combatant.pawn_id == pawn_id:
+                    combatant.name = name
+                    self._mark(game_set_id)
+
+    def forget(self, game_set_id: int) -> None:
+        """Drop the encounter of a deleted game set without writing it"""
+        self._encounters.pop(game_set_id, None)
+        self._cancel_turn(game_set_id)
+        self._dirty.discard(game_set_id)
+        self._remember_absent(game_set_id)
+
+    def _remember_absent(self, game_set_id: int) -> None:
+        self._absent[game_set_id] = None
+        self._absent.move_to_end(game_set_id)
+        if len(self._absent) > self.max_absent:
+            self._absent.popitem(last=False)
+
+    def _begin_turn(self, encounter: Encounter) -> None:
+        encounter.deadline = None
+        if encounter.turn_seconds:
+            encounter.deadline = datetime.utcnow() + timedelta(
+                seconds=encounter.turn_seconds
+            )
+        self._schedule_turn(encounter)
+        self._mark(encounter.game_set_id)
+        board_hub.publish(
+            encounter.game_set_id,
+            {
+                "type": "turn",
+                "pawn": encounter.active.name,
+                "round": encounter.round,
+                "deadline": encounter.deadline.isoformat()
+                if encounter.deadline
+                else None,
+            },
+        )
+
+    def _schedule_turn(self, encounter: Encounter) -> None:
+        self._cancel_turn(encounter.game_set_id)
+        if encounter.deadline is None:
+            return
+        delay = (encounter.deadline - datetime.utcnow()).total_seconds()
+        self._turn_timers[
+            encounter.game_set_id
+        ] = asyncio.get_running_loop().call_later(
+            max(delay, 0), self._expire, encounter.game_set_id
+        )
+
+    def _cancel_turn(self, game_set_id: int) -> None:
+        if timer := self._turn_timers.pop(game_set_id, None):
+            timer.cancel()
+
+    def _expire(self, game_set_id: int) -> None:
+        self._turn_timers.pop(game_set_id, None)
+        self.advance(game_set_id)
+
+    def _mark(self, game_set_id: int) -> None:
+        self._dirty.add(game_set_id)
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.delay, self._flush_later
+            )
+
+    def _flush_later(self) -> None:
+        self._timer = None
+        task = asyncio.create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            dirty, self._dirty = self._dirty, set()
+            if not dirty:
+                return 0
+            rows = [
+                self._encounters[x].as_row()
+                for x in dirty
+                if x in self._encounters
+            ]
+            ended = [x for x in dirty if x not in self._encounters]
+            try:
+                async with async_session() as session:
+                    if ended:
+                        await Initiative.delete_many(
+                            session=session, game_set_ids=ended
+                        )
+                    if rows:
+                        await Initiative.save(session=session, rows=rows)
+                    await session.commit()
+            except Exception:
+                logger.exception(f"Failed to write {len(dirty)} encounters")
+                for game_set_id in dirty:
+                    self._mark(game_set_id)
+                return 0
+        return len(dirty)
+
+    async def close(self) -> None:
+        for timer in self._turn_timers.values():
+            timer.cancel()
+        self._turn_timers.clear()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        written = await self.flush()
+        logger.info(f"Wrote {written} pending encounters")
+
+
+initiative = InitiativeTracker(
+    delay=settings.INITIATIVE_WRITE_DELAY,
+    max_absent=settings.INITIATIVE_ABSENT_SIZE,
+)
@@ -0,0 +1,78 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dnd.database.schemas.game_sets import GameSet
+from dnd.settings import settings
+
+
+@dataclass
+class Members:
+    owner_id: int | None = None
+    user_ids: set[int] = field(default_factory=set)
+    # every member is known, otherwise only the checked ones
+    complete: bool = False
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id == self.owner_id or user_id in self.user_ids
+
+
+class MembershipIndex:
+    """
+    Members of the recently used game sets by ``GameSet.id``. Game sets
+    are indexed completely when their members are loaded anyway, other
+    users are checked with one EXISTS query and remembered. Joins go
+    through the worker owning the game set (see ``Shard``), so the index
+    stays in sync with ``UserInGameset`` writes.
+    """
+
+    def __init__(self, max_game_sets: int = 10_000):
+        self.max_game_sets = max_game_sets
+        self._members: OrderedDict[int, Members] = OrderedDict()
+
+    def _get(self, game_set_id: int) -> Members:
+        members = self._members.get(game_set_id)
+        if members is None:
+            members = self._members[game_set_id] = Members()
+            if len(self._members) > self.max_game_sets:
+                self._members.popitem(last=False)
+        else:
+            self._members.move_to_end(game_set_id)
+        return members
+
+    def load(self, game_set: GameSet) -> None:
+        """Index the game set if its members are loaded"""
+        if "users_in_game" in inspect(game_set).unloaded:
+            return
+        members = self._get(game_set.id)
+        members.owner_id = game_set.owner_id
+        # joins added while the game set was being read are kept
+        members.user_ids |= {x.user_id for x in game_set.users_in_game}
+        members.complete = True
+
+    def add(self, game_set_id: int, user_id: int) -> None:
+        self._get(game_set_id).user_ids.add(user_id)
+
+    def forget(self, game_set_id: int) -> None:
+        self._members.pop(game_set_id, None)
+
+    async def is_member(
+        self, session: AsyncSession, game_set_id: int, user_id: int
+    ) -> bool:
+        """Whether the user owns or joined the game set"""
+        members = self._get(game_set_id)
+        if user_id in members:
+            return True
+        if members.complete:
+            return False
+        if await GameSet.has_member(
+            session=session, id=game_set_id, user_id=user_id
+        ):
+            members.user_ids.add(user_id)
+            return True
+        return False
+
+
+membership = MembershipIndex(max_game_sets=settings.MEMBERSHIP_INDEX_SIZE)
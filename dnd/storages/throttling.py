@@ -0,0 +1,86 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import timedelta
+
+from dnd.database.db import async_session
+from dnd.database.schemas.rate_limits import RateLimit
+from dnd.settings import settings
+
+
+class RateLimiter(ABC):
+    """Token buckets by key, ``capacity`` tokens refilled at ``rate``/s"""
+
+    @abstractmethod
+    async def take(self, key: str, rate: float, capacity: int) -> bool:
+        ...
+
+
+class MemoryRateLimiter(RateLimiter):
+    """
+    Buckets of the current worker, at most ``max_keys`` of them: the
+    least recently used bucket is forgotten first
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # key -> (tokens, updated at, refilled at), the oldest update first
+        self._buckets: OrderedDict[
+            str, tuple[float, float, float]
+        ] = OrderedDict()
+
+    async def take(self, key: str, rate: float, capacity: int) -> bool:
+        now = time.monotonic()
+        tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.max_keys:
+            self.prune(now)
+        return allowed
+
+    def prune(self, now: float) -> None:
+        """
+        Forget the least recently used buckets which are refilled, they
+        equal to new ones, then the least recently used one over the limit
+        """
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if bucket[2] > now:
+                break
+            del self._buckets[key]
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+
+class PostgresRateLimiter(RateLimiter):
+    """Buckets shared by all workers, one statement per take"""
+
+    def __init__(self, prune_every: int = 10_000):
+        self.prune_every = prune_every
+        self._takes = 0
+
+    async def take(self, key: str, rate: float, capacity: int) -> bool:
+        async with async_session() as session:
+            allowed = await RateLimit.take(
+                session=session, key=key, rate=rate, capacity=capacity
+            )
+            self._takes += 1
+            if self._takes % self.prune_every == 0:
+                await RateLimit.prune(
+                    session=session, older_than=timedelta(hours=1)
+                )
+            await session.commit()
+        return allowed
+
+
+def get_rate_limiter() -> RateLimiter:
+    if settings.RATE_LIMIT_BACKEND == "postgres":
+        return PostgresRateLimiter()
+    return MemoryRateLimiter()
+
+
+rate_limiter = get_rate_limiter()
@@ -0,0 +1,101 @@
+"""
+Server processes. With ``WORKERS`` above one every worker listens on
+``BIND`` with ``SO_REUSEPORT``, the kernel spreads connections between
+them, and on ``SHARD_PORT + index`` for the game sets it owns.
+"""
+import asyncio
+import logging
+import multiprocessing
+import signal
+import time
+from multiprocessing.connection import wait
+from multiprocessing.process import BaseProcess
+
+from hypercorn.asyncio import serve
+
+from dnd.server import server_config
+from dnd.settings import bootstrap, settings
+from dnd.utils.sharding import Shard
+
+logger = logging.getLogger(__name__)
+
+
+def run_worker(shard: Shard) -> None:
+    """Serve the app until SIGTERM, the entry point of a worker process"""
+    bootstrap()
+    # imported here to keep the supervisor process light
+    from dnd.app import create_app
+    from dnd.lifecycle import shutdown
+
+    if settings.SERVER_LOOP == "uvloop":
+        import uvloop
+
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    asyncio.run(
+        serve(
+            create_app(shard=shard),
+            server_config(shard),
+            mode="asgi",
+            shutdown_trigger=shutdown.wait,
+        )
+    )
+
+
+class Supervisor:
+    """Runs ``workers`` worker processes and restarts the crashed ones"""
+
+    def __init__(self, workers: int, restart_delay: float = 1.0):
+        self.workers = workers
+        self.restart_delay = restart_delay
+        # worst case of a worker shutdown, see ``Shutdown``
+        self.stop_timeout = (
+            settings.SHUTDOWN_DRAIN_DELAY
+            + settings.SHUTDOWN_GRACEFUL_TIMEOUT
+            + 30.0
+        )
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: dict[int, BaseProcess] = {}
+        self._stopping = False
+
+    def _start(self, index: int) -> None:
+        process = self._context.Process(
+            target=run_worker,
+            args=(Shard(index=index, count=self.workers),),
+            name=f"dnd-worker-{index}",
+        )
+        process.start()
+        self._processes[index] = process
+        logger.info(f"Started worker {index} ({process.pid})")
+
+    def _stop(self, signum: int, frame) -> None:
+        self._stopping = True
+
+    def run(self) -> None:
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self._stop)
+        for index in range(self.workers):
+            self._start(index)
+
+        while not self._stopping:
+            sentinels = {x.sentinel: i for i, x in self._processes.items()}
+            for sentinel in wait(list(sentinels), timeout=1.0):
+                if self._stopping:
+                    break
+                index = sentinels[sentinel]
+                self._processes[index].join()
+                code = self._processes[index].exitcode
+                logger.error(f"Worker {index} exited with {code}")
+                time.sleep(self.restart_delay)
+                self._start(index)
+
+        logger.info(f"Stopping {self.workers} workers")
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + self.stop_timeout
+        for process in self._processes.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.error(f"Killing {process.name}")
+                process.kill()
+                process.join()
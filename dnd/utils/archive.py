@@ -0,0 +1,151 @@
+"""
+Streaming tar archives: members are written and read one by one, so
+neither side holds more than a chunk of a member in memory.
+"""
+import tarfile
+import time
+from typing import AsyncIterable, AsyncIterator
+
+BLOCK = 512
+END = bytes(BLOCK * 2)
+MEDIA_TYPE = "application/x-tar"
+
+
+class ArchiveError(ValueError):
+    pass
+
+
+async def tar_member(
+    name: str, size: int, chunks: AsyncIterable[bytes]
+) -> AsyncIterator[bytes]:
+    """Header, content and padding of a regular file of ``size`` bytes"""
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = int(time.time())
+    info.mode = 0o644
+    yield info.tobuf(format=tarfile.PAX_FORMAT)
+    written = 0
+    async for chunk in chunks:
+        written += len(chunk)
+        yield chunk
+    if written != size:
+        raise ArchiveError(f"{name} has {written} bytes instead of {size}")
+    if size % BLOCK:
+        yield bytes(BLOCK - size % BLOCK)
+
+
+async def tar_bytes(name: str, content: bytes) -> AsyncIterator[bytes]:
+    async def chunks():
+        yield content
+
+    async for chunk in tar_member(name, len(content), chunks()):
+        yield chunk
+
+
+def _pax_headers(content: bytes) -> dict[str, str]:
+    """Records ``"<length> <key>=<value>\\n"`` of a pax extended header"""
+    headers = {}
+    while content:
+        length, _, _ = content.partition(b" ")
+        if not length.isdigit() or len(length) > 20:
+            raise ArchiveError("Broken pax header length")
+        size = int(length)
+        # the length counts itself, the space and the newline
+        if not len(length) + 2 < size <= len(content):
+            raise ArchiveError(f"Bad pax record length {size}")
+        record = content[:size]
+        if not record.endswith(b"\n"):
+            raise ArchiveError("Broken pax record")
+        key, _, value = record[len(length) + 1 : -1].partition(b"=")
+        try:
+            headers[key.decode()] = value.decode()
+        except UnicodeDecodeError:
+            raise ArchiveError("Broken pax record encoding") from None
+        content = content[size:]
+    return headers
+
+
+def _pax_size(value: str) -> int:
+    if not (value.isascii() and value.isdigit()) or len(value) > 20:
+        raise ArchiveError(f"Bad pax size {value!r}")
+    return int(value)
+
+
+class TarReader:
+    """
+    Regular files of a tar stream, e.g. a request body. The content of a
+    member has to be consumed before the next one is read.
+    """
+
+    def __init__(self, chunks: AsyncIterable[bytes], max_size: int):
+        self.max_size = max_size
+        self._chunks = aiter(chunks)
+        self._buffer = bytearray()
+        self._read = 0
+        # unread bytes of the current member
+        self._remaining = 0
+
+    async def _fill(self) -> bool:
+        try:
+            chunk = await anext(self._chunks)
+        except StopAsyncIteration:
+            return False
+        self._read += len(chunk)
+        if self._read > self.max_size:
+            raise ArchiveError("The archive is too large")
+        self._buffer += chunk
+        return True
+
+    async def _take(self, size: int) -> AsyncIterator[bytes]:
+        while size:
+            if not self._buffer and not await self._fill():
+                raise ArchiveError("The archive is truncated")
+            chunk = bytes(self._buffer[:size])
+            del self._buffer[:size]
+            size -= len(chunk)
+            yield chunk
+
+    async def _member(self, size: int) -> AsyncIterator[bytes]:
+        async for chunk in self._take(size):
+            self._remaining -= len(chunk)
+            yield chunk
+
+    async def _read_exactly(self, size: int) -> bytes:
+        return b"".join([chunk async for chunk in self._take(size)])
+
+    async def _skip(self, size: int) -> None:
+        async for _ in self._take(size):
+            pass
+
+    async def __aiter__(self) -> AsyncIterator[tuple[str, AsyncIterator]]:
+        """``(name, chunks)`` of the regular files"""
+        pax: dict[str, str] = {}
+        while True:
+            if not self._buffer and not await self._fill():
+                # ended without the end of archive blocks
+                return
+            block = await self._read_exactly(BLOCK)
+            if block == bytes(BLOCK):
+                return
+            try:
+                info = tarfile.TarInfo.frombuf(block, "utf-8", "strict")
+            except tarfile.HeaderError as e:
+                raise ArchiveError(f"Broken archive: {e}") from None
+            if info.size < 0:
+                raise ArchiveError(f"Bad size {info.size}")
+            padding = -info.size % BLOCK
+            if info.type == tarfile.XHDTYPE:
+                pax = _pax_headers(await self._read_exactly(info.size))
+                await self._skip(padding)
+                continue
+            name = pax.get("path", info.name)
+            size = _pax_size(pax["size"]) if "size" in pax else info.size
+            padding = -size % BLOCK
+            pax = {}
+            if info.type not in tarfile.REGULAR_TYPES:
+                await self._skip(size + padding)
+                continue
+            self._remaining = size
+            yield name, self._member(size)
+            # the rest of the member the consumer didn't read
+            await self._skip(self._remaining + padding)
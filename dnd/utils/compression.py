@@ -0,0 +1,224 @@
+import os
+import zlib
+from mimetypes import guess_type
+from typing import Protocol
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# already compressed content
+SKIP_CONTENT_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "application/zip",
+    # campaign archives, mostly images
+    "application/x-tar",
+)
+
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes:
+        ...
+
+    def flush(self, final: bool = False) -> bytes:
+        ...
+
+
+class GZipCompressor:
+    def __init__(self, level: int):
+        # wbits=31 writes the gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self, final: bool = False) -> bytes:
+        return self._compressor.flush(
+            zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH
+        )
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self, final: bool = False) -> bytes:
+        if final:
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def accepted_encodings(headers: Headers) -> list[str]:
+    """Supported ``Accept-Encoding`` values, preferred first"""
+    encodings = {}
+    for item in headers.get("accept-encoding", "").split(","):
+        value, *params = (x.strip() for x in item.split(";"))
+        quality = 1.0
+        for param in params:
+            key, _, raw_quality = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(raw_quality)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            encodings[value.lower()] = quality
+    supported = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return sorted(
+        (x for x in supported if x in encodings),
+        key=lambda x: -encodings[x],
+    )
+
+
+class CompressionMiddleware:
+    """
+    Compress responses bigger than ``minimum_size`` with brotli (if
+    installed and accepted) or gzip. Streaming responses are compressed
+    chunk by chunk.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def get_compressor(self, encoding: str) -> Compressor:
+        if encoding == "br":
+            return BrotliCompressor(self.brotli_quality)
+        return GZipCompressor(self.gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            if encodings := accepted_encodings(Headers(scope=scope)):
+                responder = CompressionResponder(
+                    self.app,
+                    encoding=encodings[0],
+                    compressor=self.get_compressor(encodings[0]),
+                    minimum_size=self.minimum_size,
+                )
+                await responder(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+class CompressionResponder:
+    def __init__(
+        self,
+        app: ASGIApp,
+        encoding: str,
+        compressor: Compressor,
+        minimum_size: int,
+    ) -> None:
+        self.app = app
+        self.encoding = encoding
+        self.compressor = compressor
+        self.minimum_size = minimum_size
+        self.send: Send | None = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # postpone headers until the first body chunk
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = "content-encoding" in headers or headers.get(
+                "content-type", ""
+            ).startswith(SKIP_CONTENT_TYPES)
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.passthrough:
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        if not self.started:
+            self.started = True
+            if len(body) < self.minimum_size and not more_body:
+                await self.send(self.initial_message)
+                await self.send(message)
+                self.passthrough = True
+                return
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+            body = self.compressor.compress(body)
+            body += self.compressor.flush(final=not more_body)
+            if not more_body:
+                headers["Content-Length"] = str(len(body))
+            await self.send(self.initial_message)
+        else:
+            body = self.compressor.compress(body)
+            body += self.compressor.flush(final=not more_body)
+        message["body"] = body
+        await self.send(message)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    Serve ``<file>.br`` / ``<file>.gz`` next to the requested file when
+    the client accepts the encoding.
+    """
+
+    def file_response(
+        self,
+        full_path: os.PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        for encoding in accepted_encodings(Headers(scope=scope)):
+            path = f"{full_path}{PRECOMPRESSED_SUFFIXES[encoding]}"
+            try:
+                compressed_stat = os.stat(path)
+            except OSError:
+                continue
+            response = FileResponse(
+                path,
+                status_code=status_code,
+                stat_result=compressed_stat,
+                method=scope["method"],
+                media_type=guess_type(str(full_path))[0] or "text/plain",
+                headers={"Content-Encoding": encoding},
+            )
+            response.headers.add_vary_header("Accept-Encoding")
+            if self.is_not_modified(response.headers, Headers(scope=scope)):
+                return NotModifiedResponse(response.headers)
+            return response
+        return super().file_response(
+            full_path, stat_result, scope, status_code
+        )
@@ -1,27 +1,38 @@
 from datetime import datetime, timedelta
+from functools import cache
+from typing import TYPE_CHECKING
 
 from hashids import Hashids
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 
 from dnd.settings import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
 
 hashids = Hashids(salt=settings.SECRET_KEY, min_length=6)
 
 
+@cache
+def pwd_context() -> "CryptContext":
+    # passlib and jose are imported on the first login, not at startup
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
 class Hasher:
     @staticmethod
     def verify_password(plain_password: str, hashed_password: bytes) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+        return pwd_context().verify(plain_password, hashed_password)
 
     @staticmethod
     def get_password_hash(password: str) -> str:
-        return pwd_context.hash(password)
+        return pwd_context().hash(password)
 
     @staticmethod
     def decode_jwt(token) -> dict | None:
+        from jose import JWTError, jwt
+
         try:
             return jwt.decode(
                 token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
@@ -34,6 +45,8 @@ class Hasher:
         username: str,
         access_token_expire_minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES,
     ):
+        from jose import jwt
+
         access_token_expires = datetime.utcnow() + timedelta(
             minutes=access_token_expire_minutes,
         )
@@ -0,0 +1,134 @@
+"""
+Dice expressions: terms like ``8d6``, ``d%``, ``4d6kh3`` (keep the 3
+highest), ``2d20kl1`` (keep the lowest), ``d20adv``/``d20dis`` (two
+rolls, the better or the worse) and numbers, added or subtracted.
+
+A roll is drawn from the stream ``(seed, index)`` of the game set, so
+the log of expressions and indexes can be replayed by whoever has the
+seed. The dice of a term are drawn and summed with numpy at once, it's
+imported by the first roll: parsing doesn't need it.
+"""
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+MAX_TERMS = 20
+MAX_DICE = 100_000
+MAX_SIDES = 10_000
+# rolls of larger terms are summed only
+MAX_SHOWN = 100
+
+_TERM = re.compile(
+    r"([+-])" r"(?:(\d*)d(\d+|%)(?:(kh|kl|k)(\d+)|(adv|dis))?|(\d+))"
+)
+
+
+class DiceError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Dice:
+    count: int
+    sides: int
+    sign: int = 1
+    # the number of the kept dice, all by default
+    keep: int | None = None
+    highest: bool = True
+
+    def __str__(self) -> str:
+        text = f"{'-' if self.sign < 0 else '+'}{self.count}d{self.sides}"
+        if self.keep is not None:
+            text += f"{'kh' if self.highest else 'kl'}{self.keep}"
+        return text
+
+    def roll(self, rng: "np.random.Generator") -> tuple["np.ndarray", int]:
+        """The dice and the sum of the kept ones, signed"""
+        import numpy as np
+
+        values = rng.integers(1, self.sides + 1, size=self.count)
+        kept = values
+        if self.keep is not None:
+            kept = np.sort(values)
+            kept = kept[-self.keep :] if self.highest else kept[: self.keep]
+        return values, self.sign * int(kept.sum())
+
+
+@dataclass(frozen=True)
+class Expression:
+    dice: tuple[Dice, ...]
+    modifier: int = 0
+
+    def __str__(self) -> str:
+        text = "".join(map(str, self.dice))
+        if self.modifier:
+            text += f"{self.modifier:+d}"
+        return text.removeprefix("+")
+
+
+@dataclass
+class Roll:
+    total: int
+    # the dice of every term, ``None`` for the large ones
+    rolls: list[list[int] | None]
+
+
+def parse(text: str) -> Expression:
+    source = re.sub(r"\s*([+-])\s*", r"\1", text.strip().lower())
+    if not source:
+        raise DiceError("Nothing to roll")
+    if source[:1] not in ("+", "-"):
+        source = "+" + source
+    dice, modifier, position = [], 0, 0
+    while position < len(source):
+        match = _TERM.match(source, position)
+        if match is None:
+            raise DiceError(f"Unexpected {source[position:]!r}")
+        position = match.end()
+        sign, count, sides, keep, kept, advantage, number = match.groups()
+        sign = -1 if sign == "-" else 1
+        if number is not None:
+            modifier += sign * int(number)
+            continue
+        count = int(count) if count else 1
+        sides = 100 if sides == "%" else int(sides)
+        if count < 1:
+            raise DiceError("Roll at least one die")
+        if not 1 <= sides <= MAX_SIDES:
+            raise DiceError(f"Dice must have 1 to {MAX_SIDES} sides")
+        highest, keep_count = True, None
+        if advantage is not None:
+            if count != 1:
+                raise DiceError("Advantage is rolled with a single die")
+            count, keep_count, highest = 2, 1, advantage == "adv"
+        elif keep is not None:
+            keep_count, highest = int(kept), keep != "kl"
+            if not 1 <= keep_count <= count:
+                raise DiceError(f"Can't keep {keep_count} of {count} dice")
+        dice.append(Dice(count, sides, sign, keep_count, highest))
+    if len(dice) > MAX_TERMS:
+        raise DiceError(f"At most {MAX_TERMS} dice terms")
+    if sum(x.count for x in dice) > MAX_DICE:
+        raise DiceError(f"At most {MAX_DICE} dice")
+    return Expression(tuple(dice), modifier)
+
+
+def stream(seed: int, index: int) -> "np.random.Generator":
+    """The generator of the roll ``index``, independent of the others"""
+    import numpy as np
+
+    return np.random.Generator(
+        np.random.PCG64(np.random.SeedSequence(seed, spawn_key=(index,)))
+    )
+
+
+def roll(expression: Expression, rng: "np.random.Generator") -> Roll:
+    total, rolls = expression.modifier, []
+    for dice in expression.dice:
+        values, subtotal = dice.roll(rng)
+        total += subtotal
+        rolls.append(values.tolist() if dice.count <= MAX_SHOWN else None)
+    return Roll(total=total, rolls=rolls)
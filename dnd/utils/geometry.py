@@ -0,0 +1,103 @@
+"""
+Areas of effect on the board grid. The cell ``(x, y)`` is the square
+``[x, x + 1) x [y, y + 1)``, so its center is ``(x + 0.5, y + 0.5)``.
+A pawn at ``(x, y)`` covers ``size_x * size_y`` cells from there and is
+in an area if the center of any of its cells is. Shapes are tested on
+the cell centers of all pawns at once. numpy is imported on the first
+use, the service starts without it.
+"""
+import math
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    import numpy as np
+
+Point = tuple[float, float]
+# the mask of the cell centers ``xs, ys`` in the area
+Area = Callable[["np.ndarray", "np.ndarray"], "np.ndarray"]
+
+
+def circle(origin: Point, radius: float) -> Area:
+    def contains(xs: "np.ndarray", ys: "np.ndarray") -> "np.ndarray":
+        import numpy as np
+
+        return np.hypot(xs - origin[0], ys - origin[1]) <= radius
+
+    return contains
+
+
+def square(origin: Point, size: float) -> Area:
+    """Axis aligned square of the side ``size`` around ``origin``"""
+    half = size / 2
+
+    def contains(xs: "np.ndarray", ys: "np.ndarray") -> "np.ndarray":
+        import numpy as np
+
+        return (np.abs(xs - origin[0]) <= half) & (
+            np.abs(ys - origin[1]) <= half
+        )
+
+    return contains
+
+
+def _direction(origin: Point, towards: Point) -> Point:
+    dx, dy = towards[0] - origin[0], towards[1] - origin[1]
+    norm = math.hypot(dx, dy)
+    if not norm:
+        raise ValueError("The direction points to the origin")
+    return dx / norm, dy / norm
+
+
+def line(origin: Point, towards: Point, length: float, width: float) -> Area:
+    ux, uy = _direction(origin, towards)
+
+    def contains(xs: "np.ndarray", ys: "np.ndarray") -> "np.ndarray":
+        import numpy as np
+
+        dx, dy = xs - origin[0], ys - origin[1]
+        along = dx * ux + dy * uy
+        across = np.abs(dx * uy - dy * ux)
+        return (along >= 0) & (along <= length) & (across <= width / 2)
+
+    return contains
+
+
+def cone(origin: Point, towards: Point, length: float, angle: float) -> Area:
+    """Circular sector opening ``angle`` degrees"""
+    ux, uy = _direction(origin, towards)
+    cos_half = math.cos(math.radians(angle) / 2)
+
+    def contains(xs: "np.ndarray", ys: "np.ndarray") -> "np.ndarray":
+        import numpy as np
+
+        dx, dy = xs - origin[0], ys - origin[1]
+        distance = np.hypot(dx, dy)
+        return (
+            (distance > 0)
+            & (distance <= length)
+            & (dx * ux + dy * uy >= distance * cos_half)
+        )
+
+    return contains
+
+
+def pawns_in_area(
+    x: "np.ndarray",
+    y: "np.ndarray",
+    size_x: "np.ndarray",
+    size_y: "np.ndarray",
+    area: Area,
+) -> "np.ndarray":
+    """The mask of the pawns with a cell in the area, sizes are >= 1"""
+    import numpy as np
+
+    if not len(x):
+        return np.zeros(0, dtype=bool)
+    cells = size_x * size_y
+    pawn = np.repeat(np.arange(len(cells)), cells)
+    starts = np.cumsum(cells) - cells
+    # the index of the cell within its pawn, row by row
+    index = np.arange(len(pawn)) - starts[pawn]
+    xs = x[pawn] + index % size_x[pawn] + 0.5
+    ys = y[pawn] + index // size_x[pawn] + 0.5
+    return np.logical_or.reduceat(area(xs, ys), starts)
@@ -0,0 +1,183 @@
+"""
+Decoding of untrusted images in memory capped worker processes.
+
+The module is imported by spawned workers, keep its imports light.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from tempfile import mkstemp
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+
+class ImageRejected(ValueError):
+    """The image exceeds the decode budgets"""
+
+
+class ImageUnreadable(ValueError):
+    """The file isn't an image of a known format"""
+
+
+@dataclass(frozen=True)
+class DecodeLimits:
+    # pixels declared in the header, checked before decoding
+    max_pixels: int = 50_000_000
+    # bigger images are downscaled to fit the side
+    max_side: int = 8192
+    # memory of the decoded (possibly drafted) image
+    max_decoded_bytes: int = 256 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class EncodeOptions:
+    jpeg_quality: int = 50
+    webp_quality: int = 75
+    # None disables AVIF
+    avif_quality: int | None = None
+
+
+def _limit_worker(max_pixels: int, memory: int | None) -> None:
+    from PIL import Image
+
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    if memory and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+
+def _temporary_path(directory: Path) -> Path:
+    fd, path = mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    return Path(path)
+
+
+def encode_variants(
+    source: Path,
+    spool_directory: Path,
+    limits: DecodeLimits,
+    options: EncodeOptions,
+) -> tuple[int, int, dict[str, Path]]:
+    """
+    Encode the image into spooled files by format, preferred first.
+    Images with transparency fall back to PNG instead of JPEG.
+    """
+    # Pillow is imported by the workers only
+    from PIL import Image, UnidentifiedImageError
+
+    avif = options.avif_quality is not None
+    if avif:
+        try:
+            import pillow_avif  # noqa: F401 registers the AVIF plugin
+        except ImportError:  # pragma: no cover
+            avif = False
+
+    variants = {}
+    try:
+        # only the header is read here
+        im = Image.open(source)
+    except Image.DecompressionBombError as e:
+        raise ImageRejected(str(e))
+    except (UnidentifiedImageError, OSError) as e:
+        raise ImageUnreadable(str(e))
+    with im:
+        width, height = im.size
+        if width * height > limits.max_pixels:
+            raise ImageRejected(f"Image has {width}x{height} pixels")
+        scale = min(1.0, limits.max_side / max(width, height))
+        target = (max(1, int(width * scale)), max(1, int(height * scale)))
+        try:
+            # JPEG decodes straight to the reduced DCT scale
+            im.draft(None, target)
+            decoded = im.width * im.height * len(im.getbands())
+            if decoded > limits.max_decoded_bytes:
+                raise ImageRejected(f"Image needs {decoded} bytes to decode")
+            im.thumbnail(target, reducing_gap=2.0)
+
+            has_alpha = im.mode in ("RGBA", "LA", "PA") or (
+                im.mode == "P" and "transparency" in im.info
+            )
+            im = im.convert("RGBA" if has_alpha else "RGB")
+        except MemoryError:
+            # the worker hit its RLIMIT_AS
+            raise ImageRejected("Image needs too much memory to decode")
+        except (Image.DecompressionBombError, OSError) as e:
+            # truncated or corrupt data past the header
+            raise ImageUnreadable(str(e))
+        try:
+            if avif:
+                variants["avif"] = _temporary_path(spool_directory)
+                im.save(variants["avif"], "AVIF", quality=options.avif_quality)
+            variants["webp"] = _temporary_path(spool_directory)
+            im.save(variants["webp"], "WEBP", quality=options.webp_quality)
+            if has_alpha:
+                variants["png"] = _temporary_path(spool_directory)
+                im.save(variants["png"], "PNG", optimize=True)
+            else:
+                variants["jpeg"] = _temporary_path(spool_directory)
+                im.save(variants["jpeg"], "JPEG", quality=options.jpeg_quality)
+        except BaseException:
+            for path in variants.values():
+                path.unlink(missing_ok=True)
+            raise
+        return im.width, im.height, variants
+
+
+class ImageDecoder:
+    """
+    Pool of spawned workers with ``RLIMIT_AS`` set to ``memory`` bytes,
+    so a hostile image fails its own request instead of the service.
+    """
+
+    def __init__(
+        self,
+        spool_directory: Path,
+        limits: DecodeLimits,
+        options: EncodeOptions,
+        workers: int = 2,
+        memory: int | None = 1024 * 1024 * 1024,
+    ):
+        self.spool_directory = spool_directory
+        self.limits = limits
+        self.options = options
+        self.workers = workers
+        self.memory = memory
+        self._pool: ProcessPoolExecutor | None = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_limit_worker,
+                initargs=(self.limits.max_pixels, self.memory),
+            )
+        return self._pool
+
+    async def encode(self, source: Path) -> tuple[int, int, dict[str, Path]]:
+        self.spool_directory.mkdir(parents=True, exist_ok=True)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.pool,
+                encode_variants,
+                source,
+                self.spool_directory,
+                self.limits,
+                self.options,
+            )
+        except BrokenProcessPool:
+            # a worker was killed, start a fresh pool for the next image
+            self.close()
+            raise ImageRejected("Image decoding crashed")
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
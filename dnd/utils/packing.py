@@ -0,0 +1,266 @@
+"""
+Compact binary encoding of the board state.
+
+All numbers are little-endian. A frame is::
+
+    header   3s B B          magic ``DND``, version, kind
+    strings  H {H Ns}*       utf-8 strings table
+    colors   H {4B}*         RGBA colors table
+    users    H {H H H}*      username, full name, email (strings)
+    body                     depends on the kind
+
+Snapshot body (``KIND_SNAPSHOT``)::
+
+    H H H                    name, short url, owner (user index)
+    B [H H H H]              has map [name, len x, len y, image url]
+    H {H}*                   members (user indexes)
+    pawns
+
+Delta body (``KIND_DELTA``) holds ``pawns`` only. Pawns are::
+
+    I {H H H B B H H H H I}* name, user, color, flags, reserved,
+                             size x, size y, x, y, version
+
+``NULL`` (0xFFFF) marks a missing string. Flags are ``FLAG_*`` bits.
+"""
+import struct
+from typing import Any
+
+from dnd.database.schemas.pawns import PawnTypeEnum
+from dnd.models.game_set import GameSetModel
+from dnd.models.pawn import PawnModel
+
+MAGIC = b"DND"
+VERSION = 2
+
+KIND_SNAPSHOT = 1
+KIND_DELTA = 2
+
+NULL = 0xFFFF
+
+FLAG_VISIBLE = 1
+FLAG_STATIC = 1 << 1
+FLAG_X = 1 << 2
+FLAG_Y = 1 << 3
+
+_header = struct.Struct("<3sBB")
+_u8 = struct.Struct("<B")
+_u16 = struct.Struct("<H")
+_u32 = struct.Struct("<I")
+_color = struct.Struct("<4B")
+_user = struct.Struct("<HHH")
+_game_set = struct.Struct("<HHH")
+_map = struct.Struct("<HHHH")
+_pawn = struct.Struct("<HHHBBHHHHI")
+
+
+class _Tables:
+    def __init__(self):
+        self.strings: dict[str, int] = {}
+        self.colors: dict[tuple[int, int, int, int], int] = {}
+        self.users: dict[tuple[int, int, int], int] = {}
+
+    def string(self, value: str | None) -> int:
+        if value is None:
+            return NULL
+        return self.strings.setdefault(value, len(self.strings))
+
+    def color(self, value) -> int:
+        *rgb, alpha = value.as_rgb_tuple(alpha=True)
+        key = (*rgb, round(alpha * 255))
+        return self.colors.setdefault(key, len(self.colors))
+
+    def user(self, value) -> int:
+        key = (
+            self.string(value.username),
+            self.string(value.full_name),
+            self.string(getattr(value, "email", None)),
+        )
+        return self.users.setdefault(key, len(self.users))
+
+    def pack(self) -> bytes:
+        chunks = [_u16.pack(len(self.strings))]
+        for value in self.strings:
+            encoded = value.encode()
+            chunks.append(_u16.pack(len(encoded)))
+            chunks.append(encoded)
+        chunks.append(_u16.pack(len(self.colors)))
+        chunks.extend(_color.pack(*color) for color in self.colors)
+        chunks.append(_u16.pack(len(self.users)))
+        chunks.extend(_user.pack(*user) for user in self.users)
+        return b"".join(chunks)
+
+
+def _pack_pawns(tables: _Tables, pawns: list[PawnModel]) -> bytes:
+    chunks = [_u32.pack(len(pawns))]
+    for pawn in pawns:
+        meta = pawn.meta
+        flags = FLAG_VISIBLE if meta.visibility else 0
+        if meta.type is PawnTypeEnum.static:
+            flags |= FLAG_STATIC
+        if meta.x is not None:
+            flags |= FLAG_X
+        if meta.y is not None:
+            flags |= FLAG_Y
+        chunks.append(
+            _pawn.pack(
+                tables.string(pawn.name),
+                tables.user(pawn.user),
+                tables.color(meta.color),
+                flags,
+                0,
+                meta.size_x,
+                meta.size_y,
+                meta.x or 0,
+                meta.y or 0,
+                pawn.version,
+            )
+        )
+    return b"".join(chunks)
+
+
+def pack_game_set(game_set: GameSetModel) -> bytes:
+    tables = _Tables()
+    chunks = [
+        _game_set.pack(
+            tables.string(game_set.name),
+            tables.string(game_set.short_url),
+            tables.user(game_set.owner),
+        )
+    ]
+    if map_ := game_set.meta.map:
+        chunks.append(_u8.pack(1))
+        chunks.append(
+            _map.pack(
+                tables.string(map_.name),
+                map_.meta.len_x,
+                map_.meta.len_y,
+                tables.string(map_.meta.image_short_url),
+            )
+        )
+    else:
+        chunks.append(_u8.pack(0))
+    chunks.append(_u16.pack(len(game_set.users_in_game)))
+    chunks.extend(
+        _u16.pack(tables.user(member.user))
+        for member in game_set.users_in_game
+    )
+    chunks.append(_pack_pawns(tables, game_set.pawns))
+    header = _header.pack(MAGIC, VERSION, KIND_SNAPSHOT)
+    return header + tables.pack() + b"".join(chunks)
+
+
+def pack_pawns(pawns: list[PawnModel]) -> bytes:
+    tables = _Tables()
+    body = _pack_pawns(tables, pawns)
+    header = _header.pack(MAGIC, VERSION, KIND_DELTA)
+    return header + tables.pack() + body
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def read(self, fmt: struct.Struct) -> tuple:
+        res = fmt.unpack_from(self.data, self.offset)
+        self.offset += fmt.size
+        return res
+
+    def read_bytes(self, size: int) -> bytes:
+        res = self.data[self.offset : self.offset + size].tobytes()
+        self.offset += size
+        return res
+
+
+def _unpack_pawns(
+    reader: _Reader, strings: list, colors: list, users: list
+) -> list[dict[str, Any]]:
+    (count,) = reader.read(_u32)
+    pawns = []
+    for _ in range(count):
+        *record, version = reader.read(_pawn)
+        name, user, color, flags, _, size_x, size_y, x, y = record
+        pawns.append(
+            {
+                "name": strings[name],
+                "version": version,
+                "user": users[user],
+                "meta": {
+                    "visibility": bool(flags & FLAG_VISIBLE),
+                    "type": (
+                        PawnTypeEnum.static
+                        if flags & FLAG_STATIC
+                        else PawnTypeEnum.movable
+                    ).value,
+                    "size_x": size_x,
+                    "size_y": size_y,
+                    "x": x if flags & FLAG_X else None,
+                    "y": y if flags & FLAG_Y else None,
+                    "color": colors[color],
+                },
+            }
+        )
+    return pawns
+
+
+def unpack(data: bytes) -> dict[str, Any] | list[dict[str, Any]]:
+    """
+    Decode a frame into the same structure as the JSON responses:
+    a game set dict for snapshots and a list of pawns for deltas.
+    """
+    reader = _Reader(data)
+    magic, version, kind = reader.read(_header)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Unsupported frame")
+
+    def string(index: int) -> str | None:
+        return None if index == NULL else strings[index]
+
+    strings = []
+    for _ in range(reader.read(_u16)[0]):
+        (size,) = reader.read(_u16)
+        strings.append(reader.read_bytes(size).decode())
+    colors = []
+    for _ in range(reader.read(_u16)[0]):
+        r, g, b, a = reader.read(_color)
+        colors.append(
+            f"#{r:02x}{g:02x}{b:02x}" + (f"{a:02x}" if a != 255 else "")
+        )
+    users = []
+    for _ in range(reader.read(_u16)[0]):
+        username, full_name, email = reader.read(_user)
+        user = {"username": string(username), "full_name": string(full_name)}
+        if email != NULL:
+            user["email"] = strings[email]
+        users.append(user)
+
+    if kind == KIND_DELTA:
+        return _unpack_pawns(reader, strings, colors, users)
+    if kind != KIND_SNAPSHOT:
+        raise ValueError("Unsupported frame")
+
+    name, short_url, owner = reader.read(_game_set)
+    map_ = None
+    if reader.read(_u8)[0]:
+        map_name, len_x, len_y, image = reader.read(_map)
+        map_ = {
+            "name": strings[map_name],
+            "meta": {
+                "image_short_url": string(image),
+                "len_x": len_x,
+                "len_y": len_y,
+            },
+        }
+    members = [
+        {"user": users[reader.read(_u16)[0]]}
+        for _ in range(reader.read(_u16)[0])
+    ]
+    return {
+        "name": strings[name],
+        "short_url": strings[short_url],
+        "owner": users[owner],
+        "meta": {"map": map_},
+        "pawns": _unpack_pawns(reader, strings, colors, users),
+        "users_in_game": members,
+    }
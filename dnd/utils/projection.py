@@ -0,0 +1,95 @@
+from functools import lru_cache
+from typing import Optional, TypeAlias
+
+from pydantic import BaseModel, create_model
+from pydantic.fields import SHAPE_LIST, ModelField
+
+# nested field names, ``None`` means "the whole field"
+FieldsTree: TypeAlias = dict[str, Optional["FieldsTree"]]
+
+# projections by the model and the selected fields, every subset of the
+# fields would be a different model otherwise
+PROJECTIONS_CACHE_SIZE = 256
+
+
+def _is_model(field: ModelField) -> bool:
+    return isinstance(field.type_, type) and issubclass(field.type_, BaseModel)
+
+
+def parse_fields(model: type[BaseModel], fields: str) -> FieldsTree:
+    """
+    Parse ``fields`` query like ``short_url,pawns.name,pawns.meta.x``
+    into a tree of fields of the ``model``.
+    """
+    tree: FieldsTree = {}
+    for path in filter(None, (x.strip() for x in fields.split(","))):
+        current_model, node = model, tree
+        names = path.split(".")
+        for i, name in enumerate(names):
+            field = (current_model.__fields__ if current_model else {}).get(
+                name
+            )
+            if field is None:
+                raise ValueError(f"Unknown field {path!r}")
+            if i == len(names) - 1:
+                node[name] = None
+                break
+            if name in node and node[name] is None:
+                break
+            node = node.setdefault(name, {})
+            current_model = field.type_ if _is_model(field) else None
+    if not tree:
+        raise ValueError("Empty fields")
+    return tree
+
+
+def selects(tree: FieldsTree | None, *path: str) -> bool:
+    """Check that the ``path`` is included into the ``tree``"""
+    for name in path:
+        if tree is None:
+            return True
+        if name not in tree:
+            return False
+        tree = tree[name]
+    return True
+
+
+def _freeze(tree: FieldsTree | None) -> frozenset | None:
+    if tree is None:
+        return None
+    return frozenset((k, _freeze(v)) for k, v in tree.items())
+
+
+def project_model(model: type[BaseModel], tree: FieldsTree) -> type[BaseModel]:
+    """
+    Build (and cache) a copy of the ``model`` with only fields from the
+    ``tree``, so ``from_orm`` touches only selected attributes.
+    """
+    return _project(model, _freeze(tree))
+
+
+@lru_cache(maxsize=PROJECTIONS_CACHE_SIZE)
+def _project(model: type[BaseModel], selected: frozenset) -> type[BaseModel]:
+    subtrees = dict(selected)
+    fields = {}
+    # in the order of the model, whatever the order of the query
+    for name, field in model.__fields__.items():
+        if name not in subtrees:
+            continue
+        subtree = subtrees.pop(name)
+        annotation = field.outer_type_
+        if subtree is not None and _is_model(field):
+            annotation = _project(field.type_, subtree)
+            if field.shape == SHAPE_LIST:
+                annotation = list[annotation]
+        if field.allow_none:
+            annotation = Optional[annotation]
+        fields[name] = (annotation, ... if field.required else field.default)
+    if subtrees:
+        raise ValueError(f"Unknown fields {', '.join(sorted(subtrees))}")
+
+    return create_model(
+        f"{model.__name__}Projection",
+        __config__=model.__config__,
+        **fields,
+    )
@@ -0,0 +1,80 @@
+import hmac
+import time
+from datetime import datetime, timezone
+from hashlib import sha256
+from urllib.parse import quote, urlsplit
+
+SAFE = "-_.~"
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode(), sha256).digest()
+
+
+def presign_url(
+    method: str,
+    endpoint: str,
+    bucket: str,
+    key: str,
+    access_key: str,
+    secret_key: str,
+    region: str = "us-east-1",
+    expires: int = 3600,
+    query: dict[str, str] | None = None,
+    signed_at: float | None = None,
+) -> str:
+    """
+    AWS Signature V4 query string authentication for a path-style
+    S3 url (works with MinIO and other S3-compatible storages).
+    """
+    date = datetime.fromtimestamp(
+        time.time() if signed_at is None else signed_at, tz=timezone.utc
+    )
+    amz_date = date.strftime("%Y%m%dT%H%M%SZ")
+    datestamp = date.strftime("%Y%m%d")
+    scope = f"{datestamp}/{region}/s3/aws4_request"
+
+    split = urlsplit(endpoint)
+    # an empty bucket means the virtual-hosted style endpoint
+    path = "/" + "/".join(filter(None, (split.path.strip("/"), bucket, key)))
+    path = quote(path, safe="/" + SAFE)
+    params = {
+        **(query or {}),
+        "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+        "X-Amz-Credential": f"{access_key}/{scope}",
+        "X-Amz-Date": amz_date,
+        "X-Amz-Expires": str(expires),
+        "X-Amz-SignedHeaders": "host",
+    }
+    canonical_query = "&".join(
+        f"{quote(k, safe=SAFE)}={quote(v, safe=SAFE)}"
+        for k, v in sorted(params.items())
+    )
+    canonical_request = "\n".join(
+        (
+            method,
+            path,
+            canonical_query,
+            f"host:{split.netloc}\n",
+            "host",
+            "UNSIGNED-PAYLOAD",
+        )
+    )
+    string_to_sign = "\n".join(
+        (
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            sha256(canonical_request.encode()).hexdigest(),
+        )
+    )
+    signing_key = _hmac(f"AWS4{secret_key}".encode(), datestamp)
+    for part in (region, "s3", "aws4_request"):
+        signing_key = _hmac(signing_key, part)
+    signature = hmac.new(
+        signing_key, string_to_sign.encode(), sha256
+    ).hexdigest()
+    return (
+        f"{split.scheme}://{split.netloc}{path}"
+        f"?{canonical_query}&X-Amz-Signature={signature}"
+    )
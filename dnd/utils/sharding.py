@@ -0,0 +1,64 @@
+import re
+import zlib
+from dataclasses import dataclass
+
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+def shard_of(key: str, shards: int) -> int:
+    """
+    Shard of the key, the same as the one chosen by the ``hash`` of an
+    nginx upstream with ``shards`` servers of equal weight.
+    """
+    return ((zlib.crc32(key.encode()) >> 16) & 0x7FFF) % shards
+
+
+@dataclass(frozen=True)
+class Shard:
+    """Game sets owned by the worker ``index`` of ``count``"""
+
+    index: int = 0
+    count: int = 1
+
+    def owns(self, key: str) -> bool:
+        return self.count == 1 or shard_of(key, self.count) == self.index
+
+
+class ShardMiddleware:
+    """
+    Reject requests for game sets of other workers with 421, their board
+    state (websockets, pending moves) lives in the owner. The proxy in
+    front routes them by ``shard_of`` the short url, see
+    ``.conf/nginx/nginx-setup.conf``.
+    """
+
+    def __init__(self, app: ASGIApp, shard: Shard, prefix: str = ""):
+        self.app = app
+        self.shard = shard
+        self.pattern = re.compile(
+            rf"^{re.escape(prefix)}/(?:game_set/(?:join/)?|pawn/)"
+            r"(?P<key>[^/]+)"
+        )
+
+    def shard_key(self, path: str) -> str | None:
+        if match := self.pattern.match(path):
+            return match["key"]
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] in ("http", "websocket") and self.shard.count > 1:
+            key = self.shard_key(scope["path"])
+            if key is not None and not self.shard.owns(key):
+                if scope["type"] == "websocket":
+                    # closing before accepting is a 403 for the client
+                    await send({"type": "websocket.close", "code": 1008})
+                    return
+                response = PlainTextResponse(
+                    "Misdirected Request",
+                    status_code=421,
+                    headers={"X-Shard": str(shard_of(key, self.shard.count))},
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
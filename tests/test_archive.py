@@ -0,0 +1,159 @@
+import io
+import tarfile
+from typing import AsyncIterator
+
+import pytest
+
+from dnd.utils.archive import (
+    BLOCK,
+    END,
+    ArchiveError,
+    TarReader,
+    tar_bytes,
+    tar_member,
+)
+
+LONG_NAME = "pawns/" + "goblin" * 30 + ".csv"
+
+
+async def join(chunks: AsyncIterator[bytes]) -> bytes:
+    return b"".join([chunk async for chunk in chunks])
+
+
+async def split(data: bytes, size: int) -> AsyncIterator[bytes]:
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+async def read(
+    data: bytes, chunk_size: int = 100, max_size: int = 1 << 20
+) -> list[tuple[str, bytes]]:
+    reader = TarReader(split(data, chunk_size), max_size=max_size)
+    return [(name, await join(content)) async for name, content in reader]
+
+
+async def archive(*members: tuple[str, bytes]) -> bytes:
+    chunks = [
+        await join(tar_bytes(name, content)) for name, content in members
+    ]
+    return b"".join(chunks) + END
+
+
+def pax_member(records: bytes, name: str = "x", content: bytes = b"") -> bytes:
+    pax = tarfile.TarInfo("././@PaxHeader")
+    pax.type = tarfile.XHDTYPE
+    pax.size = len(records)
+    info = tarfile.TarInfo(name)
+    info.size = len(content)
+    return b"".join(
+        [
+            pax.tobuf(format=tarfile.USTAR_FORMAT),
+            records,
+            bytes(-len(records) % BLOCK),
+            info.tobuf(format=tarfile.USTAR_FORMAT),
+            content,
+            bytes(-len(content) % BLOCK),
+            END,
+        ]
+    )
+
+
+MEMBERS = [
+    ("manifest.json", b'{"name": "Lost Mine"}'),
+    ("empty", b""),
+    ("block", bytes(range(256)) * 2),
+    (LONG_NAME, "золото".encode() * 1000),
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, BLOCK, 100_000])
+async def test_round_trip(chunk_size: int):
+    data = await archive(*MEMBERS)
+
+    assert await read(data, chunk_size=chunk_size) == MEMBERS
+
+
+async def test_readable_by_tarfile():
+    data = await archive(*MEMBERS)
+
+    with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+        members = [(x.name, tar.extractfile(x).read()) for x in tar]
+
+    assert members == MEMBERS
+
+
+async def test_reads_tarfile_archives():
+    output = io.BytesIO()
+    with tarfile.open(fileobj=output, mode="w") as tar:
+        directory = tarfile.TarInfo("maps")
+        directory.type = tarfile.DIRTYPE
+        tar.addfile(directory)
+        for name, content in MEMBERS:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+
+    assert await read(output.getvalue()) == MEMBERS
+
+
+async def test_unread_members_are_skipped():
+    reader = TarReader(split(await archive(*MEMBERS), 100), max_size=1 << 20)
+
+    assert [name async for name, _ in reader] == [x[0] for x in MEMBERS]
+
+
+async def test_member_size_is_checked():
+    async def chunks():
+        yield b"short"
+
+    with pytest.raises(ArchiveError):
+        await join(tar_member("manifest.json", 10, chunks()))
+
+
+async def test_too_large():
+    data = await archive(*MEMBERS)
+
+    with pytest.raises(ArchiveError, match="too large"):
+        await read(data, max_size=len(data) // 2)
+
+
+async def test_truncated():
+    data = await archive(*MEMBERS)
+
+    with pytest.raises(ArchiveError, match="truncated"):
+        await read(data[: 3 * BLOCK + 10])
+
+
+async def test_broken_header():
+    data = await archive(*MEMBERS)
+
+    with pytest.raises(ArchiveError, match="Broken archive"):
+        await read(b"\x01" * BLOCK + data)
+
+
+async def test_pax_path_and_size():
+    data = pax_member(b"20 path=renamed.csv\n10 size=3\n", content=b"abc")
+
+    assert await read(data) == [("renamed.csv", b"abc")]
+
+
+@pytest.mark.parametrize(
+    "records",
+    [
+        # the length counts itself, a zero one would never advance
+        b"0 x=y\n",
+        b"3 \n",
+        b"x path=a\n",
+        b"-9 path=a\n",
+        b"99999999999999999999999 path=a\n",
+        b"99 path=a\n",
+        b"11 path=abc",
+        b"11 path=\xff\xfe\n",
+        b"11 size=-5\n",
+        b"11 size=1x\n",
+        b"11 size=\xd9\xa3\n",
+    ],
+)
+async def test_malformed_pax(records: bytes):
+    with pytest.raises(ArchiveError):
+        await read(pax_member(records))
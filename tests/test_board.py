@@ -0,0 +1,186 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from dnd.database.schemas.pawns import Pawn, PawnMeta
+from dnd.storages import board
+from dnd.storages.board import BoardHub, MoveBuffer
+
+
+class Database:
+    """Executed position writes, ``gate`` holds them while it's unset"""
+
+    def __init__(self):
+        self.writes: list[list[dict[str, Any]]] = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.down = False
+
+    def session(self):
+        return Session(self)
+
+
+class Session:
+    def __init__(self, database: Database):
+        self.database = database
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+    async def execute(self, statement, rows):
+        await self.database.gate.wait()
+        if self.database.down:
+            raise ConnectionError("database is unavailable")
+        self.database.writes.append(rows)
+
+    async def commit(self):
+        pass
+
+
+@pytest.fixture
+def database(monkeypatch) -> Database:
+    database = Database()
+    monkeypatch.setattr(board, "async_session", database.session)
+    return database
+
+
+def positions(writes: list[dict[str, Any]]) -> dict[int, tuple]:
+    return {x["meta_id"]: (x["new_x"], x["new_y"]) for x in writes}
+
+
+async def test_moves_are_coalesced(database: Database):
+    moves = MoveBuffer(delay=0.01)
+    for x in range(1, 10):
+        moves.put(1, (x, 1))
+    moves.put(2, (5, 5))
+
+    assert moves.get(1) == (9, 1)
+    await asyncio.sleep(0.05)
+
+    # a write per pawn after its drag stopped, with the last position
+    assert [positions(w) for w in database.writes] == [
+        {1: (9, 1)},
+        {2: (5, 5)},
+    ]
+    assert moves.get(1) is None
+
+
+async def test_moves_postpone_the_write(database: Database):
+    moves = MoveBuffer(delay=0.2)
+    for x in range(1, 5):
+        moves.put(1, (x, 1))
+        await asyncio.sleep(0.1)
+
+    # 0.4 seconds since the first move
+    assert database.writes == []
+    await asyncio.sleep(0.3)
+    assert positions(database.writes[0]) == {1: (4, 1)}
+
+
+async def test_flush_writes_everything_at_once(database: Database):
+    moves = MoveBuffer(delay=60)
+    moves.put(1, (1, 1))
+    moves.put(2, (2, 2))
+
+    assert await moves.flush() == 2
+    assert len(database.writes) == 1
+    assert positions(database.writes[0]) == {1: (1, 1), 2: (2, 2)}
+    assert not moves._timers
+    assert await moves.flush() == 0
+
+
+async def test_position_is_visible_while_written(database: Database):
+    moves = MoveBuffer(delay=60)
+    moves.put(1, (1, 1))
+    database.gate.clear()
+    write = asyncio.create_task(moves.flush())
+    await asyncio.sleep(0)
+
+    assert moves.get(1) == (1, 1)
+    # a move during the write is written after it
+    moves.put(1, (2, 2))
+    database.gate.set()
+    assert await write == 1
+    assert moves.get(1) == (2, 2)
+    assert await moves.flush() == 1
+    assert [positions(w) for w in database.writes] == [
+        {1: (1, 1)},
+        {1: (2, 2)},
+    ]
+
+
+async def test_failed_write_is_retried(database: Database):
+    moves = MoveBuffer(delay=60)
+    moves.put(1, (1, 1))
+    moves.put(2, (2, 2))
+    database.down = True
+
+    assert await moves.flush() == 0
+    assert moves.get(1) == (1, 1)
+    database.down = False
+    assert await moves.flush() == 2
+
+
+async def test_failed_write_keeps_newer_move(database: Database):
+    moves = MoveBuffer(delay=60)
+    moves.put(1, (1, 1))
+    database.down = True
+    database.gate.clear()
+    write = asyncio.create_task(moves.flush())
+    await asyncio.sleep(0)
+    moves.put(1, (2, 2))
+    database.gate.set()
+
+    assert await write == 0
+    assert moves.get(1) == (2, 2)
+
+
+async def test_discard(database: Database):
+    moves = MoveBuffer(delay=0.01)
+    moves.put(1, (1, 1))
+    moves.put(2, (2, 2))
+
+    moves.discard([1])
+    await asyncio.sleep(0.05)
+
+    assert [positions(w) for w in database.writes] == [{2: (2, 2)}]
+
+
+async def test_overlay(database: Database):
+    moves = MoveBuffer(delay=60)
+    moves.put(1, (7, 8))
+    moved = Pawn(name="goblin", meta=PawnMeta(id=1, x=1, y=1))
+    still = Pawn(name="chest", meta=PawnMeta(id=2, x=3, y=3))
+    without_meta = Pawn(name="ghost")
+
+    moves.overlay([moved, still, without_meta])
+
+    assert (moved.meta.x, moved.meta.y) == (7, 8)
+    assert (still.meta.x, still.meta.y) == (3, 3)
+    moves.discard([1])
+
+
+async def test_hub_audience_and_slow_clients():
+    hub = BoardHub(queue_size=2)
+    with hub.subscribe(1, user_id=10) as owner, hub.subscribe(1, 20) as player:
+        for i in range(3):
+            hub.publish(1, {"i": i})
+        hub.publish(1, {"hidden": True}, audience={10})
+        hub.publish(2, {"other": True})
+
+        assert [owner.get_nowait(), owner.get_nowait()] == [
+            {"i": 2},
+            {"hidden": True},
+        ]
+        # the oldest events are dropped for a slow client
+        assert [player.get_nowait(), player.get_nowait()] == [
+            {"i": 1},
+            {"i": 2},
+        ]
+        hub.close()
+        assert owner.get_nowait() is None
+    assert hub._subscribers == {}
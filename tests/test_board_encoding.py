@@ -0,0 +1,62 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from dnd.procedures.board import (
+    BOARD_MEDIA_TYPE,
+    VARY_ACCEPT,
+    BoardResponse,
+    accepts,
+    get_board_encoding,
+)
+from dnd.utils.packing import unpack
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, False),
+        ("application/json", False),
+        (BOARD_MEDIA_TYPE, True),
+        (f"application/json, {BOARD_MEDIA_TYPE};q=0.5", True),
+        (f"{BOARD_MEDIA_TYPE}; q=0", False),
+        (f"{BOARD_MEDIA_TYPE};q=nope", False),
+        (BOARD_MEDIA_TYPE.upper(), True),
+    ],
+)
+def test_accepts(accept: str | None, expected: bool):
+    assert accepts(accept, BOARD_MEDIA_TYPE) is expected
+
+
+@pytest.fixture
+def client() -> TestClient:
+    app = FastAPI()
+
+    @app.get("/model")
+    async def model(packed: bool = Depends(get_board_encoding)):
+        if packed:
+            return BoardResponse([])
+        return {"pawns": []}
+
+    @app.get("/projected")
+    async def projected(packed: bool = Depends(get_board_encoding)):
+        return JSONResponse({"pawns": []}, headers=VARY_ACCEPT)
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path", ["/model", "/projected"])
+def test_json_varies_by_accept(client: TestClient, path: str):
+    res = client.get(path)
+
+    assert res.json() == {"pawns": []}
+    assert res.headers["vary"] == "Accept"
+
+
+def test_packed_varies_by_accept(client: TestClient):
+    res = client.get("/model", headers={"Accept": BOARD_MEDIA_TYPE})
+
+    assert res.headers["content-type"] == BOARD_MEDIA_TYPE
+    assert res.headers["vary"] == "Accept"
+    assert unpack(res.content) == []
@@ -0,0 +1,61 @@
+import io
+
+import pytest
+
+from dnd.procedures.campaigns import _validate_pawns
+from dnd.utils.archive import ArchiveError
+
+HEADER = "name,username,version,visibility,type,size_x,size_y,x,y,color\n"
+
+
+def validate(rows: str) -> str:
+    target = io.BytesIO()
+    _validate_pawns(io.BytesIO((HEADER + rows).encode()), target)
+    return target.getvalue().decode()
+
+
+def test_rows_are_normalized_and_given_to_owner():
+    res = validate(
+        "goblin,alice,3,t,movable,5,5,10,20,red\n"
+        '"wall, north",bob,1,f,static,7,1,,,#00ff00\n'
+    )
+    assert res.splitlines() == [
+        HEADER.strip(),
+        "goblin,,3,t,movable,5,5,10,20,#f00",
+        '"wall, north",,1,f,static,7,1,,,#0f0',
+    ]
+
+
+@pytest.mark.parametrize(
+    "row",
+    [
+        # the size isn't in the glossary
+        "goblin,alice,1,t,movable,7,1,1,1,red",
+        "goblin,alice,1,t,flying,5,5,1,1,red",
+        "goblin,alice,1,t,movable,5,5,1,1,not-a-color",
+        # half of a position
+        "goblin,alice,1,t,movable,5,5,1,,red",
+        "goblin,alice,1,t,movable,5,5,0,1,red",
+        "goblin,alice,0,t,movable,5,5,1,1,red",
+        "goblin,alice,1,maybe,movable,5,5,1,1,red",
+        "," + "x" * 31 + ",1,t,movable,5,5,1,1,red",
+        "goblin,alice,1,t,movable,5,5,1,1",
+    ],
+)
+def test_invalid_rows(row: str):
+    with pytest.raises(ArchiveError, match="row 1"):
+        validate(row + "\n")
+
+
+def test_unexpected_columns():
+    target = io.BytesIO()
+    with pytest.raises(ArchiveError, match="columns"):
+        _validate_pawns(io.BytesIO(b"name,color\ngoblin,red\n"), target)
+
+
+def test_not_utf8():
+    source = io.BytesIO(
+        HEADER.encode() + b"gob\xfflin,,1,t,static,1,1,,,red\n"
+    )
+    with pytest.raises(ArchiveError, match="utf-8"):
+        _validate_pawns(source, io.BytesIO())
@@ -0,0 +1,118 @@
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.datastructures import Headers
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from dnd.utils.compression import (
+    BrotliCompressor,
+    CompressionMiddleware,
+    GZipCompressor,
+    accepted_encodings,
+    brotli,
+)
+
+TEXT = b"goblin " * 1000
+
+needs_brotli = pytest.mark.skipif(brotli is None, reason="brotli extra")
+
+
+def test_gzip_round_trip():
+    compressor = GZipCompressor(6)
+    data = compressor.compress(TEXT[:3000]) + compressor.flush()
+    data += compressor.compress(TEXT[3000:]) + compressor.flush(final=True)
+
+    assert gzip.decompress(data) == TEXT
+
+
+@needs_brotli
+def test_brotli_round_trip():
+    compressor = BrotliCompressor(4)
+    data = compressor.compress(TEXT[:3000]) + compressor.flush()
+    data += compressor.compress(TEXT[3000:]) + compressor.flush(final=True)
+
+    assert brotli.decompress(data) == TEXT
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("", []),
+        ("gzip", ["gzip"]),
+        pytest.param("gzip, deflate, br", ["br", "gzip"], marks=needs_brotli),
+        pytest.param(
+            "br;q=0.5, gzip;q=0.8", ["gzip", "br"], marks=needs_brotli
+        ),
+        ("br;q=0, gzip", ["gzip"]),
+        ("BR;q=oops, gzip", ["gzip"]),
+        ("identity, deflate", []),
+    ],
+)
+def test_accepted_encodings(header: str, expected: list[str]):
+    headers = Headers({"accept-encoding": header})
+
+    assert accepted_encodings(headers) == expected
+
+
+@pytest.fixture
+def client() -> TestClient:
+    async def text(request):
+        return Response(TEXT, media_type="text/plain")
+
+    async def small(request):
+        return Response(b"tiny", media_type="text/plain")
+
+    async def image(request):
+        return Response(TEXT, media_type="image/png")
+
+    async def stream(request):
+        async def chunks():
+            for _ in range(10):
+                yield TEXT[:700]
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    app = Starlette(
+        routes=[
+            Route("/text", text),
+            Route("/small", small),
+            Route("/image", image),
+            Route("/stream", stream),
+        ]
+    )
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+@needs_brotli
+def test_middleware_compresses(client: TestClient):
+    res = client.get("/text", headers={"Accept-Encoding": "br"})
+
+    assert res.headers["content-encoding"] == "br"
+    assert res.headers["vary"] == "Accept-Encoding"
+    assert int(res.headers["content-length"]) < len(TEXT)
+    assert res.content == TEXT
+
+
+def test_middleware_compresses_streams(client: TestClient):
+    res = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    assert res.headers["content-encoding"] == "gzip"
+    assert res.content == TEXT[:700] * 10
+
+
+@pytest.mark.parametrize("path", ["/small", "/image"])
+def test_middleware_skips(client: TestClient, path: str):
+    res = client.get(path, headers={"Accept-Encoding": "gzip, br"})
+
+    assert "content-encoding" not in res.headers
+
+
+def test_middleware_without_accepted_encodings(client: TestClient):
+    res = client.get("/text", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in res.headers
+    assert res.content == TEXT
@@ -0,0 +1,112 @@
+import pytest
+
+from dnd.utils.dice import (
+    MAX_DICE,
+    MAX_SHOWN,
+    Dice,
+    DiceError,
+    Expression,
+    parse,
+    roll,
+    stream,
+)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("d20", Expression((Dice(1, 20),))),
+        ("8d6", Expression((Dice(8, 6),))),
+        ("d%", Expression((Dice(1, 100),))),
+        ("4d6kh3 + 2", Expression((Dice(4, 6, keep=3),), 2)),
+        ("2d20kl1", Expression((Dice(2, 20, keep=1, highest=False),))),
+        ("4d6k3", Expression((Dice(4, 6, keep=3),))),
+        ("d20adv", Expression((Dice(2, 20, keep=1),))),
+        ("D20DIS", Expression((Dice(2, 20, keep=1, highest=False),))),
+        ("-1d4+3-1", Expression((Dice(1, 4, sign=-1),), 2)),
+        ("2d8 + 1d6 - 1", Expression((Dice(2, 8), Dice(1, 6)), -1)),
+        ("5", Expression((), 5)),
+    ],
+)
+def test_parse(text: str, expected: Expression):
+    assert parse(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text, normalized",
+    [
+        ("d20", "1d20"),
+        (" 4d6KH3 +2 ", "4d6kh3+2"),
+        ("d20adv-1", "2d20kh1-1"),
+        ("-d4", "-1d4"),
+        ("d%+0", "1d100"),
+    ],
+)
+def test_str(text: str, normalized: str):
+    assert str(parse(text)) == normalized
+    assert parse(normalized) == parse(text)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "   ",
+        "d",
+        "2d",
+        "1d6 2",
+        "0d6",
+        "1d0",
+        "1d10001",
+        "2d20adv",
+        "4d6kh5",
+        "4d6kh0",
+        "1d6x",
+        "+".join(["d4"] * 21),
+        f"{MAX_DICE + 1}d6",
+    ],
+)
+def test_parse_errors(text: str):
+    with pytest.raises(DiceError):
+        parse(text)
+
+
+def test_replay_is_deterministic():
+    expression = parse("4d6kh3+8d6-1d4+2")
+    first = [roll(expression, stream(1234, index)) for index in range(50)]
+    again = [roll(expression, stream(1234, index)) for index in range(50)]
+
+    assert first == again
+    # the streams of the indexes and of other seeds differ
+    assert len({x.total for x in first}) > 1
+    other = [roll(expression, stream(4321, index)) for index in range(50)]
+    assert other != first
+
+
+def test_roll():
+    result = roll(parse("4d6kh3+2"), stream(7, 0))
+    (dice,) = result.rolls
+
+    assert len(dice) == 4
+    assert all(1 <= x <= 6 for x in dice)
+    assert result.total == sum(sorted(dice)[1:]) + 2
+
+
+def test_roll_keeps_lowest():
+    result = roll(parse("d20dis"), stream(7, 1))
+
+    assert result.total == min(result.rolls[0])
+
+
+def test_roll_subtracts():
+    result = roll(parse("10-2d4"), stream(7, 2))
+
+    assert result.total == 10 - sum(result.rolls[0])
+
+
+def test_large_terms_are_summed_only():
+    result = roll(parse(f"{MAX_SHOWN + 1}d6+1d6"), stream(7, 3))
+
+    assert result.rolls[0] is None
+    assert len(result.rolls[1]) == 1
+    assert MAX_SHOWN + 2 <= result.total <= 6 * (MAX_SHOWN + 2)
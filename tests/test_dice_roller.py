@@ -0,0 +1,107 @@
+from typing import Any
+
+import pytest
+
+from dnd.storages.dice import DiceRoller, Stream
+from dnd.utils.dice import parse
+
+
+class Database:
+    """Appends of the rolls, failing while down or for broken game sets"""
+
+    def __init__(self):
+        self.down = False
+        self.broken: set[int] = set()
+        self.rows: list[tuple[Any, ...]] = []
+
+    async def append(self, records: list[tuple[Any, ...]]) -> None:
+        if self.down or self.broken & {x[0] for x in records}:
+            raise ConnectionError("database is unavailable")
+        self.rows.extend(records)
+
+
+@pytest.fixture
+def database(monkeypatch) -> Database:
+    database = Database()
+    monkeypatch.setattr(DiceRoller, "_append", staticmethod(database.append))
+    return database
+
+
+def roller(**kwargs) -> DiceRoller:
+    res = DiceRoller(delay=60, **kwargs)
+    # reserved blocks, no queries for the indexes
+    for game_set_id in (1, 2):
+        res._streams[game_set_id] = Stream(seed=game_set_id, next=1, end=1000)
+    return res
+
+
+async def roll(dice: DiceRoller, game_set_id: int, times: int = 1) -> None:
+    for _ in range(times):
+        await dice.roll(game_set_id, user_id=1, expression=parse("d20"))
+
+
+async def test_flush_writes_in_order(database: Database):
+    dice = roller()
+    await roll(dice, 1, 3)
+    await roll(dice, 2)
+
+    assert await dice.flush() == 4
+    assert [(x[0], x[1]) for x in database.rows] == [
+        (1, 1),
+        (1, 2),
+        (1, 3),
+        (2, 1),
+    ]
+    assert await dice.flush() == 0
+
+
+async def test_failed_batch_is_retried(database: Database):
+    dice = roller(max_retries=3)
+    await roll(dice, 1, 2)
+    database.down = True
+
+    assert await dice.flush() == 0
+    await roll(dice, 1)
+    database.down = False
+
+    assert await dice.flush() == 3
+    assert [x[1] for x in database.rows] == [1, 2, 3]
+    assert dice._failures == 0
+
+
+async def test_failing_game_set_is_dropped(database: Database):
+    dice = roller(max_retries=2)
+    await roll(dice, 1, 2)
+    await roll(dice, 2, 2)
+    database.broken = {1}
+
+    assert await dice.flush() == 0
+    assert await dice.flush() == 2
+    assert {x[0] for x in database.rows} == {2}
+    assert await dice.flush() == 0
+    assert dice._failures == 0
+
+
+async def test_oldest_pending_are_dropped(database: Database):
+    dice = roller(max_pending=10, batch_size=4, max_retries=100)
+    database.down = True
+    await roll(dice, 1, 10)
+    # the batch size triggers flushes, wait for them
+    await dice.close()
+    await roll(dice, 1)
+
+    # a batch is dropped at once
+    assert [x[1] for x in dice._records] == list(range(5, 12))
+    database.down = False
+    assert await dice.flush() == 7
+
+
+async def test_forget_drops_pending(database: Database):
+    dice = roller()
+    await roll(dice, 1, 2)
+    await roll(dice, 2)
+
+    await dice.forget(1)
+
+    assert await dice.flush() == 1
+    assert database.rows[0][0] == 2
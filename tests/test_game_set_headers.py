@@ -0,0 +1,146 @@
+from types import SimpleNamespace
+
+import pytest
+
+from dnd.database.schemas.game_sets import GameSet
+from dnd.storages import game_sets
+from dnd.storages.game_sets import GameSetHeader, GameSetHeaders
+from dnd.utils.crypto import hashids
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(game_sets.time, "monotonic", clock)
+    return clock
+
+
+class Rows:
+    """Header rows of the game sets by short url, counting the queries"""
+
+    def __init__(self, *ids: int):
+        self.rows = {hashids.encode(x): self.row(x) for x in ids}
+        self.queries = 0
+
+    @staticmethod
+    def row(id: int, map_id: int | None = None) -> SimpleNamespace:
+        return SimpleNamespace(
+            _mapping={
+                "id": id,
+                "short_url": hashids.encode(id),
+                "owner_id": 10,
+                "version": 1,
+                "map_id": map_id,
+                "map_len_x": 30 if map_id else None,
+                "map_len_y": 20 if map_id else None,
+            }
+        )
+
+    async def get_header(self, session, id: int, short_url: str):
+        self.queries += 1
+        row = self.rows.get(short_url)
+        return row if row and row._mapping["id"] == id else None
+
+
+@pytest.fixture
+def rows(monkeypatch: pytest.MonkeyPatch) -> Rows:
+    rows = Rows(1, 2, 3)
+    monkeypatch.setattr(GameSet, "get_header", rows.get_header)
+    return rows
+
+
+async def get(headers: GameSetHeaders, id: int) -> GameSetHeader | None:
+    return await headers.get(session=None, short_url=hashids.encode(id))
+
+
+def test_decode():
+    assert GameSetHeaders.decode(hashids.encode(42)) == 42
+    assert GameSetHeaders.decode(hashids.encode(1, 2)) is None
+    assert GameSetHeaders.decode("not a short url") is None
+    assert GameSetHeaders.decode("") is None
+
+
+async def test_junk_short_url_is_not_queried(rows: Rows, clock: Clock):
+    headers = GameSetHeaders()
+
+    assert await headers.get(session=None, short_url="!!!") is None
+    assert rows.queries == 0
+
+
+async def test_header_is_cached(rows: Rows, clock: Clock):
+    headers = GameSetHeaders()
+
+    header = await get(headers, 1)
+    assert header == GameSetHeader(
+        id=1, short_url=hashids.encode(1), owner_id=10, version=1
+    )
+    assert await get(headers, 1) is header
+    assert rows.queries == 1
+
+
+async def test_header_expires(rows: Rows, clock: Clock):
+    headers = GameSetHeaders(ttl=60)
+    await get(headers, 1)
+
+    clock.now += 59
+    await get(headers, 1)
+    assert rows.queries == 1
+
+    clock.now += 1
+    await get(headers, 1)
+    assert rows.queries == 2
+
+
+async def test_missing_game_set_is_forgotten(rows: Rows, clock: Clock):
+    headers = GameSetHeaders(ttl=60)
+    await get(headers, 1)
+
+    del rows.rows[hashids.encode(1)]
+    clock.now += 60
+
+    assert await get(headers, 1) is None
+    assert 1 not in headers._headers
+    assert await get(headers, 4) is None
+
+
+async def test_forget(rows: Rows, clock: Clock):
+    headers = GameSetHeaders()
+    await get(headers, 1)
+    await get(headers, 2)
+
+    headers.forget(1)
+    headers.forget(4)
+
+    assert list(headers._headers) == [2]
+
+
+async def test_forget_map(rows: Rows, clock: Clock):
+    rows.rows[hashids.encode(1)] = Rows.row(1, map_id=7)
+    rows.rows[hashids.encode(3)] = Rows.row(3, map_id=7)
+    headers = GameSetHeaders()
+    for x in (1, 2, 3):
+        await get(headers, x)
+
+    headers.forget_map(7)
+
+    assert list(headers._headers) == [2]
+    assert (await get(headers, 1)).map_len_x == 30
+
+
+async def test_least_recently_used_are_evicted(rows: Rows, clock: Clock):
+    headers = GameSetHeaders(max_size=2)
+    await get(headers, 1)
+    await get(headers, 2)
+    await get(headers, 1)
+
+    await get(headers, 3)
+
+    assert list(headers._headers) == [1, 3]
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from dnd.models.area import AreaRequestModel
+from dnd.utils.geometry import circle, cone, line, pawns_in_area, square
+
+
+def centers(*cells: tuple[int, int]) -> tuple[np.ndarray, np.ndarray]:
+    xs, ys = np.array(cells, dtype=float).T + 0.5
+    return xs, ys
+
+
+def test_circle():
+    xs, ys = centers((0, 0), (1, 0), (2, 0), (2, 2))
+
+    assert circle((0.5, 0.5), 1)(xs, ys).tolist() == [
+        True,
+        True,
+        False,
+        False,
+    ]
+
+
+def test_square():
+    xs, ys = centers((0, 0), (1, 1), (2, 2), (-1, 0))
+
+    assert square((1, 1), 2)(xs, ys).tolist() == [True, True, False, False]
+
+
+def test_line():
+    # east from the corner of the cell (0, 0), one cell wide
+    area = line((0, 0.5), (10, 0.5), length=3, width=1)
+    xs, ys = centers((0, 0), (2, 0), (3, 0), (1, 1), (-1, 0))
+
+    assert area(xs, ys).tolist() == [True, True, False, False, False]
+
+
+def test_diagonal_line():
+    area = line((0, 0), (1, 1), length=5, width=1)
+    xs, ys = centers((0, 0), (2, 2), (1, 0), (3, 0))
+
+    assert area(xs, ys).tolist() == [True, True, False, False]
+
+
+def test_cone():
+    # a 90 degrees cone opening north, y grows downwards
+    area = cone((0.5, 0), (0.5, 10), length=3, angle=90)
+    xs, ys = centers((0, 0), (0, 2), (2, 1), (1, 2), (0, 3), (0, -1))
+
+    assert area(xs, ys).tolist() == [True, True, False, True, False, False]
+
+
+def test_direction_must_differ_from_origin():
+    with pytest.raises(ValueError):
+        line((1, 1), (1, 1), length=3, width=1)
+    with pytest.raises(ValueError):
+        cone((1, 1), (1, 1), length=3, angle=53)
+
+
+def test_pawns_in_area():
+    x = np.array([0, 4, 10, 0])
+    y = np.array([0, 0, 10, 1])
+    size_x = np.array([1, 2, 1, 3])
+    size_y = np.array([1, 2, 1, 1])
+    # the cells (2..4, 0..2), only the last cell of the wide pawn is in
+    area = square((3.5, 1.5), 3)
+
+    assert pawns_in_area(x, y, size_x, size_y, area).tolist() == [
+        False,
+        True,
+        False,
+        True,
+    ]
+
+
+def test_large_pawn_in_area_by_its_last_cell():
+    inside = pawns_in_area(
+        np.array([0]),
+        np.array([0]),
+        np.array([3]),
+        np.array([3]),
+        circle((2.5, 2.5), 0.1),
+    )
+
+    assert inside.tolist() == [True]
+
+
+def test_no_pawns():
+    empty = np.zeros(0, dtype=np.int64)
+
+    inside = pawns_in_area(empty, empty, empty, empty, circle((0, 0), 1))
+
+    assert inside.tolist() == []
+
+
+def test_area_request():
+    query = AreaRequestModel.parse_obj(
+        {"shape": "line", "origin": [0, 0.5], "towards": [1, 0.5], "length": 2}
+    )
+    xs, ys = centers((1, 0), (2, 0))
+
+    assert query.__root__.area()(xs, ys).tolist() == [True, False]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        {"shape": "hexagon", "origin": [0, 0], "radius": 1},
+        {"shape": "circle", "origin": [0, 0], "radius": 0},
+        {"shape": "cone", "origin": [1, 1], "towards": [1, 1], "length": 3},
+    ],
+)
+def test_invalid_area_request(query: dict):
+    with pytest.raises(ValidationError):
+        AreaRequestModel.parse_obj(query)
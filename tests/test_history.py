@@ -0,0 +1,166 @@
+from typing import Any
+
+import pytest
+
+from dnd.database.schemas.history import BoardEventKind, BoardSnapshot
+from dnd.storages import history
+from dnd.storages.history import EventLog
+
+
+class Database:
+    """
+    Appends of the events, failing while down or for broken game sets,
+    and the snapshots made
+    """
+
+    def __init__(self):
+        self.down = False
+        self.broken: set[int] = set()
+        self.rows: list[tuple[Any, ...]] = []
+        self.snapshots: list[tuple[int, int]] = []
+        self.snapshots_down = False
+
+    async def append(self, records: list[tuple[Any, ...]]) -> None:
+        if self.down or self.broken & {x[0] for x in records}:
+            raise ConnectionError("database is unavailable")
+        self.rows.extend(records)
+
+    async def replay(self, session, game_set_id: int, at=None):
+        rows = [x for x in self.rows if x[0] == game_set_id]
+        return len(rows), {x[1]: (x[3], x[4]) for x in rows}
+
+    async def create_snapshot(self, session, game_set_id: int, **kwargs):
+        if self.snapshots_down:
+            raise ConnectionError("database is unavailable")
+        self.snapshots.append((game_set_id, kwargs["event_id"]))
+
+    def session(self):
+        return Session()
+
+
+class Session:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+    async def commit(self):
+        pass
+
+
+@pytest.fixture
+def database(monkeypatch) -> Database:
+    database = Database()
+    monkeypatch.setattr(EventLog, "_append", staticmethod(database.append))
+    monkeypatch.setattr(EventLog, "_replay", staticmethod(database.replay))
+    monkeypatch.setattr(BoardSnapshot, "create", database.create_snapshot)
+    monkeypatch.setattr(history, "async_session", database.session)
+    return database
+
+
+async def record(log: EventLog, game_set_id: int, times: int = 1) -> None:
+    for x in range(times):
+        log.record(game_set_id, 1, BoardEventKind.move, (x, 0))
+
+
+async def test_flush_writes_in_order(database: Database):
+    log = EventLog(delay=60)
+    await record(log, 1, 3)
+    await record(log, 2)
+
+    assert await log.flush() == 4
+    assert [(x[0], x[3]) for x in database.rows] == [
+        (1, 0),
+        (1, 1),
+        (1, 2),
+        (2, 0),
+    ]
+    assert await log.flush() == 0
+
+
+async def test_failed_batch_is_retried(database: Database):
+    log = EventLog(delay=60, max_retries=3)
+    await record(log, 1, 2)
+    database.down = True
+
+    assert await log.flush() == 0
+    log.record(1, 1, BoardEventKind.remove)
+    database.down = False
+
+    assert await log.flush() == 3
+    assert [x[2] for x in database.rows] == ["move", "move", "remove"]
+    assert log._failures == 0
+
+
+async def test_failing_game_set_is_dropped(database: Database):
+    log = EventLog(delay=60, max_retries=2)
+    await record(log, 1, 2)
+    await record(log, 2, 2)
+    database.broken = {1}
+
+    assert await log.flush() == 0
+    assert await log.flush() == 2
+    assert {x[0] for x in database.rows} == {2}
+    assert await log.flush() == 0
+    assert log._failures == 0
+
+
+async def test_oldest_pending_are_dropped(database: Database):
+    log = EventLog(delay=60, max_pending=10, batch_size=4, max_retries=100)
+    database.down = True
+    await record(log, 1, 10)
+    # the batch size triggers flushes, wait for them
+    await log.close()
+    await record(log, 2)
+
+    # a batch is dropped at once
+    assert [(x[0], x[3]) for x in log._records] == [
+        *((1, x) for x in range(4, 10)),
+        (2, 0),
+    ]
+    database.down = False
+    assert await log.flush() == 7
+
+
+async def test_snapshot_every(database: Database):
+    log = EventLog(delay=60, snapshot_every=3)
+    await record(log, 1, 2)
+    await record(log, 2, 1)
+    await log.flush()
+    assert database.snapshots == []
+
+    await record(log, 1)
+    await log.flush()
+
+    assert database.snapshots == [(1, 3)]
+    assert log._since_snapshot == {2: 1}
+
+
+async def test_failed_snapshot_is_retried(database: Database):
+    log = EventLog(delay=60, snapshot_every=2)
+    database.snapshots_down = True
+    await record(log, 1, 2)
+    await log.flush()
+    assert database.snapshots == []
+
+    database.snapshots_down = False
+    await record(log, 1)
+    await log.flush()
+
+    assert database.snapshots == [(1, 3)]
+    assert not log._since_snapshot
+
+
+async def test_forget_drops_pending(database: Database):
+    log = EventLog(delay=60, snapshot_every=2)
+    await record(log, 1)
+    await log.flush()
+    await record(log, 1)
+    await record(log, 2)
+
+    await log.forget(1)
+
+    assert await log.flush() == 1
+    assert database.rows[-1][0] == 2
+    assert 1 not in log._since_snapshot
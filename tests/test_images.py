@@ -0,0 +1,169 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from dnd.database.schemas.images import Image
+from dnd.storages import images
+from dnd.storages.images import (
+    ImageCollector,
+    ImageFormats,
+    LocalImageBackend,
+    image_key,
+)
+
+
+@pytest.fixture
+def backend(tmp_path: Path) -> LocalImageBackend:
+    return LocalImageBackend(directory=tmp_path)
+
+
+async def put(backend: LocalImageBackend, short_url: str, fmt: str) -> Path:
+    path = backend.temporary_path()
+    path.write_bytes(f"{short_url}.{fmt}".encode())
+    await backend.put(short_url, path, fmt)
+    return path
+
+
+async def read(backend: LocalImageBackend, short_url: str, fmt: str) -> bytes:
+    async with backend.open(short_url, fmt) as (size, chunks):
+        data = b"".join([chunk async for chunk in chunks])
+    assert size == len(data)
+    return data
+
+
+def test_image_key():
+    key = image_key("a1B2")
+
+    assert key.endswith("/a1B2")
+    shard, sub, _ = key.split("/")
+    assert len(shard) == len(sub) == 2
+    assert image_key("a1B2", "webp") == f"{key}.webp"
+    # spread over the shards
+    assert len({image_key(str(i)).split("/")[0] for i in range(100)}) > 30
+
+
+async def test_put_open_remove(backend: LocalImageBackend):
+    spooled = await put(backend, "a1B2", "webp")
+    await put(backend, "a1B2", "jpeg")
+
+    assert not spooled.exists()
+    assert await backend.exists("a1B2")
+    assert await read(backend, "a1B2", "webp") == b"a1B2.webp"
+    assert await read(backend, "a1B2", "jpeg") == b"a1B2.jpeg"
+
+    await backend.remove("a1B2")
+
+    assert not await backend.exists("a1B2")
+    assert not (backend.directory / image_key("a1B2", "webp")).exists()
+
+
+async def test_stale(backend: LocalImageBackend):
+    await put(backend, "old", "webp")
+    await put(backend, "old", "jpeg")
+    await put(backend, "new", "jpeg")
+    hour_ago = time.time() - 60 * 60
+    for fmt in ("webp", "jpeg"):
+        path = backend.directory / image_key("old", fmt)
+        os.utime(path, (hour_ago, hour_ago))
+
+    assert await backend.stale(time.time() - 60) == ["old"]
+
+
+def test_relayout(backend: LocalImageBackend):
+    (backend.directory / "flat").write_bytes(b"image")
+    (backend.directory / ".hidden").write_bytes(b"")
+
+    assert backend.relayout() == 1
+    assert (backend.directory / image_key("flat")).read_bytes() == b"image"
+    assert (backend.directory / ".hidden").exists()
+    assert backend.relayout() == 0
+
+
+class Rows:
+    """The images table, rows with a zero refcount are unused"""
+
+    def __init__(self, refcounts: dict[str, int]):
+        self.refcounts = refcounts
+
+    async def delete_unused(self, session, grace, limit: int = 2):
+        unused = [k for k, v in self.refcounts.items() if v <= 0][:limit]
+        for short_url in unused:
+            del self.refcounts[short_url]
+        return unused
+
+    async def existing(self, session, short_urls):
+        return set(short_urls) & self.refcounts.keys()
+
+    async def get_formats(self, session, short_url):
+        return ["webp", "jpeg"] if short_url in self.refcounts else None
+
+
+class Session:
+    commits = 0
+
+    async def commit(self):
+        self.commits += 1
+
+
+@pytest.fixture
+def rows(monkeypatch) -> Rows:
+    rows = Rows({"used": 1, "unused1": 0, "unused2": 0, "unused3": -1})
+    for name in ("delete_unused", "existing", "get_formats"):
+        monkeypatch.setattr(Image, name, getattr(rows, name))
+    return rows
+
+
+async def test_collect_removes_unused(backend: LocalImageBackend, rows: Rows):
+    for short_url in list(rows.refcounts):
+        await put(backend, short_url, "jpeg")
+    formats = ImageFormats()
+    formats._cache["unused1"] = ["jpeg"]
+    session = Session()
+
+    collector = ImageCollector(backend=backend, formats=formats)
+
+    assert await collector.collect(session=session) == 3
+    # a commit by batch, the rows stay locked till the files are removed
+    assert session.commits == 2
+    assert list(rows.refcounts) == ["used"]
+    assert await backend.exists("used")
+    assert not await backend.exists("unused3")
+    assert "unused1" not in formats._cache
+
+
+async def test_sweep_removes_files_without_rows(
+    backend: LocalImageBackend, rows: Rows
+):
+    await put(backend, "used", "jpeg")
+    await put(backend, "rolled-back", "jpeg")
+    collector = ImageCollector(
+        backend=backend, formats=ImageFormats(), grace=-60
+    )
+
+    assert await collector.sweep(session=Session()) == 1
+    assert await backend.exists("used")
+    assert not await backend.exists("rolled-back")
+
+
+class Sessions:
+    async def __aenter__(self):
+        return Session()
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+
+async def test_formats_are_cached(monkeypatch, rows: Rows):
+    monkeypatch.setattr(images, "async_session", Sessions)
+    formats = ImageFormats(size=1)
+
+    assert await formats.get("used") == ["webp", "jpeg"]
+    rows.refcounts.clear()
+    assert await formats.get("used") == ["webp", "jpeg"]
+    assert await formats.get("other") is None
+    rows.refcounts["other"] = 1
+    assert await formats.get("other") == ["webp", "jpeg"]
+    # the least recently used is evicted
+    assert list(formats._cache) == ["other"]
@@ -0,0 +1,65 @@
+import io
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from dnd.utils.imaging import (
+    DecodeLimits,
+    EncodeOptions,
+    ImageRejected,
+    ImageUnreadable,
+    encode_variants,
+)
+
+
+def image_file(path: Path, fmt: str, mode: str = "RGB", size=(64, 48)) -> Path:
+    buffer = io.BytesIO()
+    Image.effect_noise(size, 64).convert(mode).save(buffer, fmt)
+    path.write_bytes(buffer.getvalue())
+    return path
+
+
+def encode(source: Path, limits: DecodeLimits = DecodeLimits()):
+    return encode_variants(source, source.parent, limits, EncodeOptions())
+
+
+def test_variants(tmp_path: Path):
+    width, height, variants = encode(image_file(tmp_path / "a", "PNG"))
+    assert (width, height) == (64, 48)
+    assert list(variants) == ["webp", "jpeg"]
+    with Image.open(variants["jpeg"]) as im:
+        assert im.size == (64, 48)
+
+
+def test_transparent_falls_back_to_png(tmp_path: Path):
+    _, _, variants = encode(image_file(tmp_path / "a", "PNG", mode="RGBA"))
+    assert list(variants) == ["webp", "png"]
+
+
+def test_downscaled(tmp_path: Path):
+    width, height, _ = encode(
+        image_file(tmp_path / "a", "JPEG", size=(400, 100)),
+        DecodeLimits(max_side=100),
+    )
+    assert (width, height) == (100, 25)
+
+
+def test_too_many_pixels(tmp_path: Path):
+    with pytest.raises(ImageRejected):
+        encode(image_file(tmp_path / "a", "PNG"), DecodeLimits(max_pixels=100))
+
+
+def test_not_an_image(tmp_path: Path):
+    source = tmp_path / "a"
+    source.write_bytes(b"not an image")
+    with pytest.raises(ImageUnreadable):
+        encode(source)
+
+
+@pytest.mark.parametrize("fmt", ["PNG", "JPEG"])
+def test_truncated(tmp_path: Path, fmt: str):
+    source = image_file(tmp_path / "a", fmt)
+    source.write_bytes(source.read_bytes()[:200])
+    with pytest.raises(ImageUnreadable):
+        encode(source)
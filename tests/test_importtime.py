@@ -0,0 +1,16 @@
+import os
+
+import pytest
+
+from benchmarks.importtime import check
+
+
+def test_lazy_imports():
+    assert check(repeat=1, budgets=False) == []
+
+
+@pytest.mark.benchmark
+def test_import_time_budgets():
+    scale = float(os.environ.get("IMPORT_TIME_SCALE", 1.0))
+
+    assert check(repeat=3, scale=scale) == []
@@ -0,0 +1,215 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from dnd.database.schemas.initiative import Initiative
+from dnd.storages import initiative
+from dnd.storages.initiative import Combatant, Encounter, InitiativeTracker
+
+
+class Database:
+    """Initiative rows by game set, ``down`` fails the writes"""
+
+    def __init__(self):
+        self.rows: dict[int, dict[str, Any]] = {}
+        self.queries = 0
+        self.down = False
+
+    async def get_by_game_set_id(self, session, game_set_id: int):
+        self.queries += 1
+        row = self.rows.get(game_set_id)
+        return SimpleNamespace(**row) if row else None
+
+    async def save(self, session, rows: list[dict[str, Any]]) -> None:
+        if self.down:
+            raise ConnectionError("database is unavailable")
+        self.rows.update((x["game_set_id"], x) for x in rows)
+
+    async def delete_many(self, session, game_set_ids: list[int]) -> None:
+        if self.down:
+            raise ConnectionError("database is unavailable")
+        for game_set_id in game_set_ids:
+            self.rows.pop(game_set_id, None)
+
+    def session(self):
+        return Session()
+
+
+class Session:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+    async def commit(self):
+        pass
+
+
+@pytest.fixture
+def database(monkeypatch) -> Database:
+    database = Database()
+    for name in ("get_by_game_set_id", "save", "delete_many"):
+        monkeypatch.setattr(Initiative, name, getattr(database, name))
+    monkeypatch.setattr(initiative, "async_session", database.session)
+    return database
+
+
+@pytest.fixture
+def events(monkeypatch) -> list[tuple[int, dict[str, Any]]]:
+    events = []
+    monkeypatch.setattr(
+        initiative.board_hub,
+        "publish",
+        lambda game_set_id, event: events.append((game_set_id, event)),
+    )
+    return events
+
+
+def combatants(*initiatives: int) -> list[Combatant]:
+    return [
+        Combatant(pawn_id=x, name=f"pawn {x}", user_id=10, initiative=y)
+        for x, y in enumerate(initiatives, start=1)
+    ]
+
+
+def order(encounter: Encounter) -> list[int]:
+    return [x.pawn_id for x in encounter.combatants]
+
+
+async def test_start_orders_by_initiative(database: Database, events):
+    tracker = InitiativeTracker(delay=60)
+
+    encounter = tracker.start(1, combatants(5, 20, 5, 12))
+
+    # ties keep the given order
+    assert order(encounter) == [2, 4, 1, 3]
+    assert encounter.active.pawn_id == 2
+    assert events == [
+        (1, {"type": "turn", "pawn": "pawn 2", "round": 1, "deadline": None})
+    ]
+
+
+async def test_advance_wraps_to_next_round(database: Database, events):
+    tracker = InitiativeTracker(delay=60)
+    tracker.start(1, combatants(3, 2))
+
+    assert tracker.advance(1).active.pawn_id == 2
+    encounter = tracker.advance(1)
+
+    assert (encounter.active.pawn_id, encounter.round) == (1, 2)
+    assert [x[1]["pawn"] for x in events] == ["pawn 1", "pawn 2", "pawn 1"]
+    assert tracker.advance(2) is None
+
+
+@pytest.mark.parametrize(
+    "pawn_id, active",
+    [
+        # before the active pawn
+        (1, 2),
+        # the active pawn, the next one takes the turn
+        (2, 3),
+        # after the active pawn
+        (3, 2),
+    ],
+)
+async def test_remove_pawn(database: Database, events, pawn_id, active):
+    tracker = InitiativeTracker(delay=60)
+    tracker.start(1, combatants(3, 2, 1))
+    tracker.advance(1)
+
+    tracker.remove_pawn(1, pawn_id)
+
+    encounter = await tracker.get(session=None, game_set_id=1)
+    assert encounter.active.pawn_id == active
+    assert pawn_id not in order(encounter)
+
+
+async def test_removing_last_pawn_ends(database: Database, events):
+    tracker = InitiativeTracker(delay=60)
+    tracker.start(1, combatants(3))
+
+    tracker.remove_pawn(1, 1)
+
+    assert await tracker.get(session=None, game_set_id=1) is None
+    assert events[-1] == (1, {"type": "turn", "pawn": None})
+    assert database.queries == 0
+
+
+async def test_turn_expires(database: Database, events):
+    tracker = InitiativeTracker(delay=60)
+    encounter = tracker.start(1, combatants(3, 2), turn_seconds=0.01)
+    assert encounter.deadline is not None
+
+    async with asyncio.timeout(1):
+        while len(events) < 3:
+            await asyncio.sleep(0.01)
+
+    # every turn gets its deadline
+    assert [x[1]["pawn"] for x in events[:3]] == ["pawn 1", "pawn 2", "pawn 1"]
+    assert events[2][1]["round"] == 2
+    tracker.end(1)
+    assert not tracker._turn_timers
+
+
+async def test_absent_encounters_are_remembered(database: Database):
+    tracker = InitiativeTracker(delay=60, max_absent=2)
+
+    for game_set_id in (1, 1, 2, 3, 1):
+        assert await tracker.get(session=None, game_set_id=game_set_id) is None
+
+    # 1 was evicted by 3
+    assert database.queries == 4
+
+
+async def test_encounter_is_loaded(database: Database, events):
+    tracker = InitiativeTracker(delay=60)
+    tracker.start(1, combatants(3, 2))
+    tracker.advance(1)
+    await tracker.flush()
+
+    loaded = await InitiativeTracker().get(session=None, game_set_id=1)
+
+    assert order(loaded) == [1, 2]
+    assert (loaded.turn, loaded.round) == (1, 1)
+
+
+async def test_flush_saves_and_deletes(database: Database, events):
+    tracker = InitiativeTracker(delay=60)
+    tracker.start(1, combatants(3))
+    tracker.start(2, combatants(3))
+    assert await tracker.flush() == 2
+
+    tracker.end(1)
+    tracker.rename_pawn(2, 1, "goblin")
+
+    assert await tracker.flush() == 2
+    assert list(database.rows) == [2]
+    assert database.rows[2]["entries"][0]["name"] == "goblin"
+    assert await tracker.flush() == 0
+
+
+async def test_failed_flush_is_retried(database: Database, events):
+    tracker = InitiativeTracker(delay=60)
+    tracker.start(1, combatants(3))
+    database.down = True
+
+    assert await tracker.flush() == 0
+    database.down = False
+
+    assert await tracker.close() is None
+    assert list(database.rows) == [1]
+
+
+async def test_forget_drops_without_writing(database: Database, events):
+    tracker = InitiativeTracker(delay=60)
+    tracker.start(1, combatants(3), turn_seconds=60)
+
+    tracker.forget(1)
+
+    assert await tracker.flush() == 0
+    assert not tracker._turn_timers
+    assert await tracker.get(session=None, game_set_id=1) is None
+    assert database.queries == 0
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import signal
+
+import pytest
+
+from dnd import lifecycle
+from dnd.database.schemas.game_sets import GameSet
+from dnd.lifecycle import Shutdown, warm_up
+from dnd.routes.health import is_serving
+from dnd.settings import settings
+from dnd.storages.game_sets import GameSetHeader
+from dnd.utils.sharding import Shard
+
+SHORT_URLS = [f"g{i}" for i in range(10)]
+
+
+class Session:
+    def __init__(self, database: "Database"):
+        self.database = database
+
+    async def __aenter__(self):
+        self.database.open += 1
+        self.database.peak = max(self.database.peak, self.database.open)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.database.open -= 1
+
+    async def execute(self, statement):
+        # the connection is held till the session ends
+        await asyncio.sleep(0.01)
+
+
+class Database:
+    def __init__(self):
+        self.open = 0
+        self.peak = 0
+        self.read: list[str] = []
+        self.encounters: list[int] = []
+        self.down = False
+
+    def session(self) -> Session:
+        return Session(self)
+
+    async def get_active_short_urls(self, session, limit):
+        if self.down:
+            raise ConnectionError("database is unavailable")
+        return SHORT_URLS[:limit]
+
+    async def get_header(self, session, short_url):
+        return GameSetHeader(
+            id=int(short_url[1:]), short_url=short_url, owner_id=1, version=1
+        )
+
+    async def get_encounter(self, session, game_set_id):
+        self.encounters.append(game_set_id)
+
+    async def get_by_short_url(self, session, short_url, options):
+        self.read.append(short_url)
+
+
+@pytest.fixture
+def database(monkeypatch) -> Database:
+    database = Database()
+    monkeypatch.setattr(lifecycle, "async_session", database.session)
+    monkeypatch.setattr(
+        GameSet, "get_active_short_urls", database.get_active_short_urls
+    )
+    monkeypatch.setattr(GameSet, "get_by_short_url", database.get_by_short_url)
+    monkeypatch.setattr(lifecycle.game_set_headers, "get", database.get_header)
+    monkeypatch.setattr(lifecycle.initiative, "get", database.get_encounter)
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 3)
+    monkeypatch.setattr(settings, "WARM_UP_GAME_SETS", 100)
+    return database
+
+
+async def test_warm_up_reads_game_sets_of_the_shard(database: Database):
+    shard = Shard(index=1, count=2)
+
+    await warm_up(shard)
+
+    owned = [x for x in SHORT_URLS if shard.owns(x)]
+    assert 0 < len(owned) < len(SHORT_URLS)
+    assert sorted(database.read) == sorted(owned)
+    assert sorted(database.encounters) == sorted(int(x[1:]) for x in owned)
+    # a session for the list, then one per pooled connection at once
+    assert database.peak == settings.DB_POOL_SIZE
+
+
+async def test_warm_up_failure_starts_cold(database: Database):
+    database.down = True
+
+    await warm_up()
+
+    assert database.read == []
+
+
+async def test_shutdown_drains_before_closing_sockets(monkeypatch):
+    closed = []
+    monkeypatch.setattr(lifecycle.board_hub, "close", lambda: closed.append(1))
+    shutdown = Shutdown(drain_delay=0.05)
+    monkeypatch.setattr(lifecycle, "shutdown", shutdown)
+    monkeypatch.setattr("dnd.routes.health.shutdown", shutdown)
+    loop = asyncio.get_running_loop()
+    try:
+        waiting = asyncio.create_task(shutdown.wait())
+        await asyncio.sleep(0.01)
+        assert await is_serving() == {"is_serving": "OK"}
+
+        os.kill(os.getpid(), signal.SIGTERM)
+        await asyncio.sleep(0.02)
+
+        # health checks fail while the load balancer takes it out
+        assert shutdown.draining
+        assert await is_serving() is False
+        assert closed == []
+        await asyncio.wait_for(waiting, 1)
+        assert closed == [1]
+    finally:
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.remove_signal_handler(sig)
@@ -0,0 +1,106 @@
+import pytest
+
+from dnd.database.schemas.game_sets import GameSet
+from dnd.database.schemas.users import UserInGameset
+from dnd.storages.members import MembershipIndex
+
+
+class Rows:
+    """``UserInGameset`` rows, counting the EXISTS queries"""
+
+    def __init__(self, members: set[tuple[int, int]]):
+        self.members = members
+        self.queries = 0
+
+    async def has_member(self, session, id: int, user_id: int) -> bool:
+        self.queries += 1
+        return (id, user_id) in self.members
+
+
+@pytest.fixture
+def rows(monkeypatch) -> Rows:
+    rows = Rows({(1, 20), (1, 30), (2, 20)})
+    monkeypatch.setattr(GameSet, "has_member", rows.has_member)
+    return rows
+
+
+def game_set(id: int, owner_id: int, *user_ids: int) -> GameSet:
+    return GameSet(
+        id=id,
+        owner_id=owner_id,
+        users_in_game=[UserInGameset(user_id=x) for x in user_ids],
+    )
+
+
+async def is_member(index: MembershipIndex, game_set_id: int, user_id: int):
+    return await index.is_member(
+        session=None, game_set_id=game_set_id, user_id=user_id
+    )
+
+
+async def test_checked_members_are_remembered(rows: Rows):
+    index = MembershipIndex()
+
+    assert await is_member(index, 1, 20)
+    assert await is_member(index, 1, 20)
+    assert rows.queries == 1
+    # strangers are checked every time, they may join in another worker
+    assert not await is_member(index, 1, 40)
+    assert not await is_member(index, 1, 40)
+    assert rows.queries == 3
+
+
+async def test_loaded_game_set_is_complete(rows: Rows):
+    index = MembershipIndex()
+
+    index.load(game_set(1, 10, 20, 30))
+
+    assert await is_member(index, 1, 10)
+    assert await is_member(index, 1, 30)
+    assert not await is_member(index, 1, 40)
+    assert rows.queries == 0
+
+
+async def test_game_set_without_loaded_members_is_skipped(rows: Rows):
+    index = MembershipIndex()
+
+    index.load(GameSet(id=1, owner_id=10))
+
+    assert not await is_member(index, 1, 40)
+    assert rows.queries == 1
+
+
+async def test_join_during_load_is_kept(rows: Rows):
+    index = MembershipIndex()
+    # read before the join committed
+    loaded = game_set(1, 10, 20)
+    index.add(game_set_id=1, user_id=30)
+
+    index.load(loaded)
+
+    assert await is_member(index, 1, 30)
+    assert rows.queries == 0
+
+
+async def test_forget(rows: Rows):
+    index = MembershipIndex()
+    index.load(game_set(1, 10, 20))
+    index.load(game_set(2, 10, 20))
+
+    index.forget(1)
+
+    assert await is_member(index, 1, 20)
+    assert rows.queries == 1
+    assert not await is_member(index, 1, 10)
+    assert await is_member(index, 2, 10)
+
+
+async def test_least_recently_used_are_evicted(rows: Rows):
+    index = MembershipIndex(max_game_sets=2)
+    index.load(game_set(1, 10))
+    index.load(game_set(2, 10))
+    assert await is_member(index, 1, 10)
+
+    index.load(game_set(3, 10))
+
+    assert list(index._members) == [1, 3]
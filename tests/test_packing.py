@@ -0,0 +1,141 @@
+import pytest
+from colour import Color
+
+from dnd.database.schemas.game_sets import GameSet, GameSetMeta
+from dnd.database.schemas.maps import Map, MapMeta
+from dnd.database.schemas.pawns import Pawn, PawnMeta, PawnTypeEnum
+from dnd.database.schemas.users import User, UserInGameset
+from dnd.models.game_set import GameSetModel
+from dnd.utils.packing import pack_game_set, pack_pawns, unpack
+
+
+@pytest.fixture
+def game_set() -> GameSetModel:
+    owner = User(
+        username="master", email="master@dnd", full_name="Game Master"
+    )
+    player = User(username="player", email="player@dnd", full_name=None)
+    return GameSetModel.from_orm(
+        GameSet(
+            name="Lost Mine",
+            short_url="l0st",
+            version=3,
+            owner=owner,
+            meta=GameSetMeta(
+                map=Map(
+                    name="cave",
+                    meta=MapMeta(len_x=40, len_y=30, image_short_url="1mg"),
+                )
+            ),
+            pawns=[
+                Pawn(
+                    name="goblin",
+                    version=4,
+                    user=owner,
+                    meta=PawnMeta(
+                        visibility=False,
+                        type=PawnTypeEnum.movable,
+                        size_x=2,
+                        size_y=2,
+                        x=0,
+                        y=7,
+                        _color=Color("#1a2b3c"),
+                    ),
+                ),
+                Pawn(
+                    name="chest",
+                    version=1,
+                    user=player,
+                    meta=PawnMeta(
+                        visibility=True,
+                        type=PawnTypeEnum.static,
+                        size_x=1,
+                        size_y=1,
+                        x=None,
+                        y=None,
+                        _color=Color("white"),
+                    ),
+                ),
+            ],
+            users_in_game=[UserInGameset(user=player)],
+        )
+    )
+
+
+def test_snapshot_round_trip(game_set: GameSetModel):
+    data = unpack(pack_game_set(game_set))
+
+    assert data["name"] == "Lost Mine"
+    assert data["short_url"] == "l0st"
+    assert data["owner"] == {"username": "master", "full_name": "Game Master"}
+    assert data["meta"]["map"] == {
+        "name": "cave",
+        "meta": {"image_short_url": "1mg", "len_x": 40, "len_y": 30},
+    }
+    assert [x["user"]["username"] for x in data["users_in_game"]] == ["player"]
+    assert data["pawns"] == [
+        {
+            "name": "goblin",
+            "version": 4,
+            "user": {
+                "username": "master",
+                "full_name": "Game Master",
+                "email": "master@dnd",
+            },
+            "meta": {
+                "visibility": False,
+                "type": "movable",
+                "size_x": 2,
+                "size_y": 2,
+                "x": 0,
+                "y": 7,
+                "color": "#1a2b3c",
+            },
+        },
+        {
+            "name": "chest",
+            "version": 1,
+            "user": {
+                "username": "player",
+                "full_name": None,
+                "email": "player@dnd",
+            },
+            "meta": {
+                "visibility": True,
+                "type": "static",
+                "size_x": 1,
+                "size_y": 1,
+                "x": None,
+                "y": None,
+                "color": "#ffffff",
+            },
+        },
+    ]
+
+
+def test_snapshot_without_map(game_set: GameSetModel):
+    game_set.meta.map = None
+
+    assert unpack(pack_game_set(game_set))["meta"] == {"map": None}
+
+
+def test_delta_round_trip(game_set: GameSetModel):
+    pawns = unpack(pack_pawns(game_set.pawns))
+
+    assert [x["name"] for x in pawns] == ["goblin", "chest"]
+    assert pawns == unpack(pack_game_set(game_set))["pawns"]
+
+
+def test_strings_are_shared(game_set: GameSetModel):
+    single = pack_pawns(game_set.pawns[:1])
+    twice = pack_pawns([game_set.pawns[0]] * 2)
+
+    # a pawn record only, the strings, colors and users are indexed
+    assert len(twice) - len(single) == 20
+
+
+def test_unsupported_frame():
+    with pytest.raises(ValueError):
+        unpack(b"XYZ\x01\x01")
+    with pytest.raises(ValueError):
+        unpack(b"DND\x01\x01")
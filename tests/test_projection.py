@@ -0,0 +1,72 @@
+import pytest
+
+from dnd.models.game_set import GameSetModel
+from dnd.models.pawn import PawnModel
+from dnd.utils.projection import parse_fields, project_model, selects
+
+
+def test_parse_fields():
+    tree = parse_fields(
+        GameSetModel, "short_url, pawns.name,pawns.meta.x,pawns.meta.y"
+    )
+
+    assert tree == {
+        "short_url": None,
+        "pawns": {"name": None, "meta": {"x": None, "y": None}},
+    }
+
+
+def test_whole_field_wins():
+    tree = parse_fields(GameSetModel, "pawns,pawns.name,owner.username,owner")
+
+    assert tree == {"pawns": None, "owner": None}
+
+
+@pytest.mark.parametrize(
+    "fields",
+    ["secret", "pawns.secret", "short_url.x", "pawns.meta.x.y", "", " , "],
+)
+def test_parse_unknown_fields(fields: str):
+    with pytest.raises(ValueError):
+        parse_fields(GameSetModel, fields)
+
+
+def test_selects():
+    tree = parse_fields(GameSetModel, "pawns.meta.x,owner")
+
+    assert selects(tree, "pawns", "meta")
+    assert selects(tree, "owner", "username")
+    assert not selects(tree, "pawns", "user")
+    assert selects(None, "pawns")
+
+
+def test_project_nested_fields():
+    tree = parse_fields(GameSetModel, "pawns.meta.x,short_url,pawns.name")
+    projection = project_model(GameSetModel, tree)
+    pawn = projection.__fields__["pawns"].type_
+
+    # in the order of the model
+    assert list(projection.__fields__) == ["short_url", "pawns"]
+    assert list(pawn.__fields__) == ["name", "meta"]
+    assert list(pawn.__fields__["meta"].type_.__fields__) == ["x"]
+
+
+def test_project_unknown_fields():
+    with pytest.raises(ValueError):
+        project_model(PawnModel, {"name": None, "secret": None})
+
+
+def test_projections_are_reused():
+    first = project_model(
+        GameSetModel, parse_fields(GameSetModel, "short_url,pawns.name")
+    )
+    again = project_model(
+        GameSetModel, parse_fields(GameSetModel, "pawns.name, short_url")
+    )
+    other = project_model(GameSetModel, parse_fields(GameSetModel, "name"))
+
+    assert first is again
+    assert other is not first
+    assert project_model(PawnModel, {"name": None}) is (
+        first.__fields__["pawns"].type_
+    )
@@ -0,0 +1,100 @@
+import os
+import socket
+import ssl
+from pathlib import Path
+
+import pytest
+
+from dnd.server import reuse_port, self_signed_certificate, server_config
+from dnd.settings import settings
+from dnd.utils.sharding import Shard
+
+
+@pytest.fixture
+def profile(monkeypatch, tmp_path: Path):
+    monkeypatch.setattr(settings, "BIND", "127.0.0.1:8080")
+    monkeypatch.setattr(settings, "SHARD_PORT", 8100)
+    monkeypatch.setattr(settings, "SERVER_CERTFILE", None)
+    monkeypatch.setattr(settings, "SERVER_KEYFILE", None)
+    monkeypatch.setattr(settings, "SERVER_SELF_SIGNED", False)
+    monkeypatch.setattr(settings, "SERVER_SELF_SIGNED_DIR", tmp_path)
+
+    def set_profile(name: str, self_signed: bool = False) -> None:
+        monkeypatch.setattr(settings, "SERVER_PROFILE", name)
+        monkeypatch.setattr(settings, "SERVER_SELF_SIGNED", self_signed)
+
+    return set_profile
+
+
+def test_http1(profile):
+    profile("http1")
+
+    config = server_config(Shard())
+
+    assert config.bind == ["127.0.0.1:8080"]
+    assert config.alpn_protocols == ["http/1.1"]
+    assert config.certfile is None
+    assert config.quic_bind == []
+
+
+def test_http2_cleartext(profile):
+    profile("http2")
+
+    config = server_config(Shard())
+
+    # h2c with prior knowledge or an upgrade, h2 once TLS is set up
+    assert config.alpn_protocols == ["h2", "http/1.1"]
+    assert config.h2_max_concurrent_streams == settings.SERVER_H2_MAX_STREAMS
+    assert config.keep_alive_timeout == settings.SERVER_KEEP_ALIVE_TIMEOUT
+
+
+def test_http3_needs_tls(profile):
+    profile("http3")
+
+    with pytest.raises(ValueError):
+        server_config(Shard())
+
+
+def test_http3_with_self_signed_certificate(profile, tmp_path: Path):
+    profile("http3", self_signed=True)
+
+    config = server_config(Shard())
+
+    assert config.quic_bind == ["127.0.0.1:8080"]
+    assert config.certfile == str(tmp_path / "cert.pem")
+    ssl.create_default_context().load_cert_chain(
+        config.certfile, config.keyfile
+    )
+
+
+def test_http3_without_quic_for_several_workers(profile, monkeypatch):
+    profile("http3", self_signed=True)
+    monkeypatch.setattr(settings, "BIND", "127.0.0.1:0")
+
+    config = server_config(Shard(index=2, count=4))
+
+    assert config.quic_bind == []
+    shared, own = config.bind
+    assert shared.startswith("fd://")
+    assert own == "127.0.0.1:8102"
+    os.close(int(shared.removeprefix("fd://")))
+
+
+def test_self_signed_certificate_is_created_once(tmp_path: Path):
+    certfile, keyfile = self_signed_certificate(tmp_path)
+    created = certfile.read_bytes()
+
+    assert self_signed_certificate(tmp_path) == (certfile, keyfile)
+    assert certfile.read_bytes() == created
+
+
+def test_reuse_port_shares_the_port():
+    first = reuse_port("127.0.0.1:0")
+    fd = int(first.removeprefix("fd://"))
+    sock = socket.socket(fileno=fd)
+    port = sock.getsockname()[1]
+    try:
+        second = reuse_port(f"127.0.0.1:{port}")
+        os.close(int(second.removeprefix("fd://")))
+    finally:
+        sock.close()
@@ -0,0 +1,105 @@
+import re
+import zlib
+from pathlib import Path
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from dnd.settings import settings
+from dnd.utils.sharding import Shard, ShardMiddleware, shard_of
+
+NGINX_CONF = Path(__file__).parent.parent / ".conf/nginx/nginx-setup.conf"
+KEYS = [f"g{i:03}" for i in range(200)] + ["", "aB3xYz", "ёжик"]
+
+
+def nginx_hash_peer(key: str, peers: int) -> int:
+    """
+    The first try of ``ngx_http_upstream_get_hash_peer``: the crc32 of
+    the key, its bits 16-30 modulo the total weight of the peers
+    """
+    crc = zlib.crc32(key.encode()) & 0xFFFFFFFF
+    return ((crc >> 16) & 0x7FFF) % peers
+
+
+def test_crc32_check_value():
+    # the nginx crc32 is the standard one (ngx_crc32_table256)
+    assert zlib.crc32(b"123456789") == 0xCBF43926
+    assert shard_of("123456789", 4) == (0x4BF4 % 4)
+
+
+@pytest.mark.parametrize("shards", [1, 2, 3, 4, 7])
+def test_shard_of_matches_nginx_hash(shards: int):
+    assert [shard_of(x, shards) for x in KEYS] == [
+        nginx_hash_peer(x, shards) for x in KEYS
+    ]
+
+
+def test_shards_are_spread():
+    owners = [shard_of(x, 4) for x in KEYS]
+
+    assert all(owners.count(i) > 20 for i in range(4))
+
+
+def test_nginx_routes_like_the_workers():
+    conf = NGINX_CONF.read_text()
+    upstream = re.search(r"upstream api_shards \{(.*?)\}", conf, re.S)[1]
+    ports = [int(x) for x in re.findall(r"server \S+:(\d+);", upstream)]
+
+    # non-consistent hash over the shard ports in worker order
+    assert "hash $game_set;" in upstream
+    assert ports == [settings.SHARD_PORT + i for i in range(len(ports))]
+
+    location = re.search(r"~(\^/api/v1/\S+) \$key;", conf)[1]
+    nginx = re.compile(location.replace("?<key>", "?P<key>"))
+    middleware = ShardMiddleware(app=None, shard=Shard(), prefix="/api/v1")
+    for path in (
+        "/api/v1/game_set/aB3/",
+        "/api/v1/game_set/join/aB3/",
+        "/api/v1/game_set/aB3/board",
+        "/api/v1/pawn/aB3/goblin",
+        "/api/v1/map/aB3",
+        "/api/v1/game_set/",
+    ):
+        match = nginx.match(path)
+        assert middleware.shard_key(path) == (match and match["key"])
+
+
+@pytest.fixture
+def client() -> TestClient:
+    async def ok(request):
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/api/v1/{path:path}", ok)])
+    return TestClient(
+        ShardMiddleware(app, shard=Shard(index=1, count=3), prefix="/api/v1")
+    )
+
+
+def test_middleware_serves_owned_game_sets(client: TestClient):
+    owned = next(x for x in KEYS if shard_of(x, 3) == 1)
+
+    assert client.get(f"/api/v1/game_set/{owned}/").text == "ok"
+    assert client.get("/api/v1/users/me").text == "ok"
+
+
+def test_middleware_rejects_other_game_sets(client: TestClient):
+    other = next(x for x in KEYS if shard_of(x, 3) == 2)
+
+    res = client.get(f"/api/v1/pawn/{other}/goblin")
+
+    assert res.status_code == 421
+    assert res.headers["x-shard"] == "2"
+
+
+def test_middleware_closes_other_websockets(client: TestClient):
+    other = next(x for x in KEYS if shard_of(x, 3) == 0)
+
+    with pytest.raises(WebSocketDisconnect) as e:
+        with client.websocket_connect(f"/api/v1/game_set/{other}/board"):
+            pass
+
+    assert e.value.code == 1008
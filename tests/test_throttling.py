@@ -0,0 +1,83 @@
+import pytest
+
+from dnd.storages import throttling
+from dnd.storages.throttling import MemoryRateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(throttling.time, "monotonic", clock)
+    return clock
+
+
+async def takes(limiter: MemoryRateLimiter, key: str, count: int) -> int:
+    allowed = 0
+    for _ in range(count):
+        allowed += await limiter.take(key, rate=2.0, capacity=5)
+    return allowed
+
+
+async def test_burst(clock: Clock):
+    limiter = MemoryRateLimiter()
+
+    assert await takes(limiter, "move:1", 10) == 5
+
+
+async def test_refill(clock: Clock):
+    limiter = MemoryRateLimiter()
+    await takes(limiter, "move:1", 5)
+
+    clock.now += 1
+    assert await takes(limiter, "move:1", 5) == 2
+    clock.now += 0.25
+    assert await takes(limiter, "move:1", 1) == 0
+    clock.now += 0.25
+    assert await takes(limiter, "move:1", 1) == 1
+
+
+async def test_refill_up_to_capacity(clock: Clock):
+    limiter = MemoryRateLimiter()
+    await takes(limiter, "move:1", 5)
+
+    clock.now += 3600
+    assert await takes(limiter, "move:1", 10) == 5
+
+
+async def test_keys_are_independent(clock: Clock):
+    limiter = MemoryRateLimiter()
+    await takes(limiter, "move:1", 5)
+
+    assert await takes(limiter, "move:2", 5) == 5
+
+
+async def test_prune_forgets_refilled_buckets(clock: Clock):
+    limiter = MemoryRateLimiter(max_keys=2)
+    await takes(limiter, "move:1", 1)
+    await takes(limiter, "move:2", 5)
+    # the first bucket is full again, the second one is still empty
+    clock.now += 1
+    await takes(limiter, "move:3", 1)
+
+    assert set(limiter._buckets) == {"move:2", "move:3"}
+    assert await takes(limiter, "move:2", 5) == 2
+
+
+async def test_least_recently_used_is_forgotten(clock: Clock):
+    limiter = MemoryRateLimiter(max_keys=2)
+    await takes(limiter, "move:1", 5)
+    await takes(limiter, "move:2", 5)
+    await takes(limiter, "move:1", 1)
+    # no bucket is refilled, the limit still holds
+    await takes(limiter, "move:3", 1)
+
+    assert list(limiter._buckets) == ["move:1", "move:3"]
+    assert await takes(limiter, "move:1", 1) == 0
@@ -0,0 +1,90 @@
+import io
+from hashlib import blake2b
+from pathlib import Path
+
+import pytest
+from fastapi import APIRouter, FastAPI, File, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+from dnd.procedures.maps import UploadRoute, spool_upload
+
+IMAGE = bytes(range(256)) * 100
+
+
+def test_spool_upload_hashes_while_copying(tmp_path: Path):
+    spool = tmp_path / "spool"
+    file = io.BytesIO(IMAGE)
+    file.seek(100)
+
+    digest = spool_upload(file, spool, chunk_size=1000, max_size=len(IMAGE))
+
+    assert spool.read_bytes() == IMAGE
+    assert digest == blake2b(IMAGE, digest_size=16).hexdigest()
+
+
+def test_spool_upload_checks_size_first(tmp_path: Path):
+    spool = tmp_path / "spool"
+
+    with pytest.raises(HTTPException) as e:
+        spool_upload(io.BytesIO(IMAGE), spool, 1000, max_size=len(IMAGE) - 1)
+
+    assert e.value.status_code == 413
+    assert not spool.exists()
+
+
+class SmallUploadRoute(UploadRoute):
+    max_size = 4096
+
+
+@pytest.fixture
+def client() -> TestClient:
+    router = APIRouter(route_class=SmallUploadRoute)
+
+    @router.post("/upload")
+    async def upload(image: UploadFile = File(...)):
+        return {"size": len(await image.read())}
+
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_upload_within_limit(client: TestClient):
+    res = client.post("/upload", files={"image": ("map.jpg", IMAGE[:1000])})
+
+    assert res.status_code == 200
+    assert res.json() == {"size": 1000}
+
+
+def test_upload_over_content_length(client: TestClient):
+    res = client.post("/upload", files={"image": ("map.jpg", IMAGE)})
+
+    assert res.status_code == 413
+
+
+def test_upload_over_limit_without_content_length(client: TestClient):
+    def chunks():
+        for start in range(0, len(IMAGE), 1000):
+            yield IMAGE[start : start + 1000]
+
+    # a chunked body, the size is only known while receiving it
+    res = client.post(
+        "/upload",
+        content=chunks(),
+        headers={"Content-Type": "multipart/form-data; boundary=x"},
+    )
+
+    assert res.status_code == 413
+
+
+def test_upload_with_broken_content_length(client: TestClient):
+    res = client.post(
+        "/upload",
+        content=b"--x--\r\n",
+        headers={
+            "Content-Type": "multipart/form-data; boundary=x",
+            "Content-Length": "-1",
+        },
+    )
+
+    assert res.status_code == 413
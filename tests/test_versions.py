@@ -0,0 +1,146 @@
+import pytest
+from colour import Color
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from dnd.database.schemas.game_sets import GameSet
+from dnd.database.schemas.pawns import Pawn, PawnMeta, PawnTypeEnum
+from dnd.database.schemas.users import User
+from dnd.procedures import pawn as procedures
+from dnd.procedures.pawn import place_pawn
+from dnd.storages.game_sets import GameSetHeader
+
+GAME_SET = GameSetHeader(id=1, short_url="l0st", owner_id=1, version=1)
+
+
+class Result:
+    def scalar_one_or_none(self):
+        return 5
+
+
+class Session:
+    """Compiles the executed statements instead of running them"""
+
+    def __init__(self):
+        self.statements: list[str] = []
+
+    async def execute(self, statement):
+        compiled = statement.compile(
+            dialect=postgresql.dialect(),
+            compile_kwargs={"literal_binds": True},
+        )
+        self.statements.append(" ".join(str(compiled).split()))
+        return Result()
+
+
+async def test_pawn_update_compares_and_swaps():
+    session = Session()
+
+    assert (
+        await Pawn.update(
+            session=session, game_set_id=1, name="goblin", version=3, user_id=2
+        )
+        == 5
+    )
+    statement = session.statements[0]
+    assert "SET version=(pawns.version + 1)" in statement
+    assert "pawns.version = 3" in statement
+    assert "pawns.user_id = 2" in statement
+    assert statement.endswith("RETURNING pawns.id")
+
+
+async def test_pawn_update_without_version():
+    session = Session()
+
+    await Pawn.update(
+        session=session, game_set_id=1, name="goblin", new_name="orc"
+    )
+
+    statement = session.statements[0]
+    # the last write wins, the version is increased anyway
+    assert "pawns.version =" not in statement
+    assert "version=(pawns.version + 1)" in statement
+    assert "name='orc'" in statement
+
+
+async def test_game_set_update_returns_new_version():
+    session = Session()
+
+    await GameSet.update(session=session, id=1, name="Lost Mine", version=2)
+
+    statement = session.statements[0]
+    assert "game_sets.version = 2" in statement
+    assert statement.endswith("RETURNING game_sets.version")
+
+
+@pytest.fixture
+def goblin(monkeypatch) -> Pawn:
+    pawn = Pawn(
+        id=7,
+        name="goblin",
+        version=4,
+        user_id=1,
+        user=User(username="master", email="master@dnd", full_name=None),
+        meta=PawnMeta(
+            id=9,
+            visibility=True,
+            type=PawnTypeEnum.movable,
+            size_x=1,
+            size_y=1,
+            x=1,
+            y=1,
+            _color=Color("red"),
+        ),
+    )
+
+    async def get_by_name_and_game_set_id(session, game_set_id, name, options):
+        return pawn
+
+    async def no_encounter(session, game_set_id):
+        return None
+
+    monkeypatch.setattr(
+        Pawn, "get_by_name_and_game_set_id", get_by_name_and_game_set_id
+    )
+    monkeypatch.setattr(procedures.initiative, "get", no_encounter)
+    return pawn
+
+
+async def test_stale_move_is_a_conflict(goblin: Pawn):
+    with pytest.raises(HTTPException) as e:
+        await place_pawn(
+            session=None,
+            game_set=GAME_SET,
+            user_id=1,
+            pawn_name="goblin",
+            new_position=(5, 5),
+            version=3,
+        )
+
+    assert e.value.status_code == 409
+    assert e.value.detail["msg"] == "Version conflict"
+    current = e.value.detail["current"]
+    assert current["version"] == 4
+    assert (current["meta"]["x"], current["meta"]["y"]) == (1, 1)
+
+
+async def test_move_keeps_the_version(goblin: Pawn, monkeypatch):
+    recorded = []
+    monkeypatch.setattr(
+        procedures.event_log, "record", lambda *args: recorded.append(args)
+    )
+
+    pawn = await place_pawn(
+        session=None,
+        game_set=GAME_SET,
+        user_id=1,
+        pawn_name="goblin",
+        new_position=(5, 5),
+        version=4,
+    )
+
+    assert pawn.version == 4
+    assert (pawn.meta.x, pawn.meta.y) == (5, 5)
+    assert procedures.move_buffer.get(9) == (5, 5)
+    assert len(recorded) == 1
+    procedures.move_buffer.discard([9])